@@ -1,19 +1,56 @@
 # app/__init__.py
 
+import os
+
 from flask import Flask
 from config import Config
-from app.models import db
+from app.models import db, add_missing_columns, add_missing_indexes, init_db
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    # 📦 Initialize extensions
-    db.init_app(app)
+    # 📦 Initialize extensions (SQLite: WAL + pooled engine; Postgres via DATABASE_URL)
+    init_db(app)
 
     # 🔗 Register all route blueprints
     with app.app_context():
         from app.routes import register_blueprints
         register_blueprints(app)
 
+        # 🗄️ Schema + agent startup (same as app/main.py)
+        from app.state import load_agent
+        db.create_all()
+        add_missing_columns()
+        add_missing_indexes()
+        load_agent()
+
+    # ✍️ Group commit for onboarding upserts and decision logs
+    from app.utils.group_commit import group_commit
+    group_commit.start(app)
+
+    # 📈 Rolling sensor aggregates (flushed to sensor_aggregates in the background)
+    from app.utils.sensor_stream import sensor_aggregator
+    sensor_aggregator.start(app)
+
+    # 📬 Push receipts (dead-token pruning)
+    if os.getenv("KEYRD_RECEIPTS", "1") == "1":
+        from app.utils.push_dispatcher import dispatcher
+        from app.utils.push_receipts import receipt_tracker
+        receipt_tracker.start(app, dispatcher)
+
+    # 🧵 Job workers (0 → run them separately with scripts/run_job_workers.py)
+    workers = int(os.getenv("KEYRD_JOB_WORKERS", "4"))
+    if workers > 0:
+        from app.utils.job_queue import WorkerPool, job_queue
+        app.extensions["job_workers"] = WorkerPool(job_queue, app, workers=workers)
+        app.extensions["job_workers"].start()
+
+    # ⏰ Wake-time campaigns (enable in exactly one process)
+    if os.getenv("KEYRD_SCHEDULER", "0") == "1":
+        from app.utils.campaign_scheduler import CampaignScheduler
+        from app.utils.push_dispatcher import dispatcher
+        app.extensions["campaign_scheduler"] = CampaignScheduler(app, dispatcher)
+        app.extensions["campaign_scheduler"].start()
+
     return app
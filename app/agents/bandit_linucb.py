@@ -2,16 +2,47 @@ import os
 import pickle
 import numpy as np
 
+from app.agents.linucb_snapshot import is_snapshot, read_snapshot, write_snapshot
+
+
+def ucb_scores(theta, A_inv, alpha, context_vector):
+    """UCB score of every arm for one context, computed in a single batched pass."""
+    x = np.asarray(context_vector, dtype=np.float64).reshape(-1)
+    mean = theta @ x
+    variance = np.einsum("i,kij,j->k", x, A_inv, x)
+    return mean + alpha * np.sqrt(variance)
+
+
+def ucb_select_batch(theta, A_inv, alpha, contexts, chunk_size=8192):
+    """Best arm per row of an (n, d) context matrix, scored in chunks."""
+    arms = np.empty(contexts.shape[0], dtype=np.int64)
+    for start in range(0, contexts.shape[0], chunk_size):
+        X = contexts[start:start + chunk_size]
+        mean = X @ theta.T
+        variance = np.einsum("nkj,nj->nk", np.einsum("ni,kij->nkj", X, A_inv), X)
+        arms[start:start + chunk_size] = np.argmax(mean + alpha * np.sqrt(variance), axis=1)
+    return arms
+
+
 class LinUCB:
-    def __init__(self, num_arms: int, context_dim: int = 5, alpha: float = 0.1):
+    def __init__(self, num_arms: int, context_dim: int = 5, alpha: float = 0.1, refresh_every: int = 500):
         self.num_arms = num_arms
         self.context_dim = context_dim
         self.alpha = alpha
+        # Full re-inversion cadence (per arm) to bound Sherman–Morrison drift
+        self.refresh_every = refresh_every
 
         print(f"[LinUCB INIT] num_arms={num_arms}, context_dim={context_dim}, alpha={alpha}")
 
-        self.A = [np.identity(context_dim) for _ in range(num_arms)]
-        self.b = [np.zeros((context_dim, 1)) for _ in range(num_arms)]
+        # Stacked per-arm state: A/A_inv are (num_arms, d, d), b/theta are (num_arms, d)
+        self.A = np.tile(np.identity(context_dim), (num_arms, 1, 1))
+        self.b = np.zeros((num_arms, context_dim))
+
+        # Cached per-arm inverse, theta and rank-one updates since the last full inversion
+        self.A_inv = self.A.copy()
+        self.theta = np.zeros((num_arms, context_dim))
+        self.updates_since_refresh = np.zeros(num_arms, dtype=np.int64)
+        self.update_count = 0
 
 
     def select_action(self, context_vector):
@@ -20,16 +51,30 @@ class LinUCB:
                 f"[LinUCB Error] Context vector shape mismatch: expected {self.context_dim}, got {context_vector.shape[0]}"
             )
 
-        context = context_vector.reshape(-1, 1)
-        p_values = []
+        return int(np.argmax(self.scores(context_vector)))
 
-        for a in range(self.num_arms):
-            A_inv = np.linalg.inv(self.A[a])
-            theta = A_inv @ self.b[a]
-            p = (theta.T @ context)[0, 0] + self.alpha * np.sqrt(context.T @ A_inv @ context)[0, 0]
-            p_values.append(p)
+    def scores(self, context_vector):
+        """UCB score of every arm for one context."""
+        return ucb_scores(self.theta, self.A_inv, self.alpha, context_vector)
 
-        return int(np.argmax(p_values))
+    def select_actions(self, contexts, chunk_size=8192):
+        """
+        Vectorized arm selection for a matrix of contexts.
+
+        Args:
+            contexts (np.ndarray): (n, context_dim) matrix, one row per user.
+            chunk_size (int): Rows scored per pass, bounds the (chunk, num_arms, d) scratch array.
+
+        Returns:
+            np.ndarray: (n,) int array of selected arms.
+        """
+        contexts = np.asarray(contexts, dtype=np.float64)
+        if contexts.ndim != 2 or contexts.shape[1] != self.context_dim:
+            raise ValueError(
+                f"[LinUCB Error] Context matrix shape mismatch: expected (n, {self.context_dim}), got {contexts.shape}"
+            )
+
+        return ucb_select_batch(self.theta, self.A_inv, self.alpha, contexts, chunk_size)
 
     def update(self, chosen_arm, reward, context_vector):
         if context_vector.shape[0] != self.context_dim:
@@ -37,30 +82,113 @@ class LinUCB:
                 f"[LinUCB Error] Context vector shape mismatch during update: expected {self.context_dim}, got {context_vector.shape[0]}"
             )
 
-        context = context_vector.reshape(-1, 1)
-        self.A[chosen_arm] += context @ context.T
-        self.b[chosen_arm] += reward * context
+        x = np.asarray(context_vector, dtype=np.float64).reshape(-1)
+        self.update_count += 1
+        self.A[chosen_arm] += np.outer(x, x)
+        self.b[chosen_arm] += reward * x
+
+        self.updates_since_refresh[chosen_arm] += 1
+        if self.updates_since_refresh[chosen_arm] >= self.refresh_every:
+            self._refresh_arm(chosen_arm)
+            return
+
+        # Sherman–Morrison: (A + xxᵀ)⁻¹ = A⁻¹ − (A⁻¹x)(A⁻¹x)ᵀ / (1 + xᵀA⁻¹x)
+        A_inv = self.A_inv[chosen_arm]
+        A_inv_x = A_inv @ x
+        A_inv -= np.outer(A_inv_x, A_inv_x) / (1.0 + x @ A_inv_x)
+        self.theta[chosen_arm] = A_inv @ self.b[chosen_arm]
+
+    def update_batch(self, chosen_arms, rewards, contexts):
+        """
+        Mini-batch update: one summed XᵀX / Xᵀr step per touched arm.
+
+        Args:
+            chosen_arms (array-like): (n,) arm index per observation.
+            rewards (array-like): (n,) observed rewards.
+            contexts (np.ndarray): (n, context_dim) logged contexts.
+        """
+        chosen_arms = np.asarray(chosen_arms, dtype=np.int64).reshape(-1)
+        rewards = np.asarray(rewards, dtype=np.float64).reshape(-1)
+        contexts = np.asarray(contexts, dtype=np.float64)
+        if contexts.ndim != 2 or contexts.shape[1] != self.context_dim:
+            raise ValueError(
+                f"[LinUCB Error] Context matrix shape mismatch during update: expected (n, {self.context_dim}), got {contexts.shape}"
+            )
+        if not (chosen_arms.shape[0] == rewards.shape[0] == contexts.shape[0]):
+            raise ValueError("[LinUCB Error] chosen_arms, rewards and contexts must have the same length")
+
+        self.update_count += chosen_arms.shape[0]
+        for arm in np.unique(chosen_arms):
+            mask = chosen_arms == arm
+            X = contexts[mask]
+            self.A[arm] += X.T @ X
+            self.b[arm] += X.T @ rewards[mask]
+            # A batch is a rank-k change, so re-invert the touched arm instead of k rank-one steps
+            self._refresh_arm(arm)
+
+    def _refresh_arm(self, arm):
+        """Recompute an arm's inverse and theta from A and b to discard accumulated rounding error."""
+        self.A_inv[arm] = np.linalg.inv(self.A[arm])
+        self.theta[arm] = self.A_inv[arm] @ self.b[arm]
+        self.updates_since_refresh[arm] = 0
+
+    def refresh(self):
+        """Full re-inversion of every arm (batched)."""
+        # Written in place so arrays backed by external buffers (shared memory, memmap) stay bound
+        self.A_inv[...] = np.linalg.inv(self.A)
+        self.theta[...] = np.einsum("kij,kj->ki", self.A_inv, self.b)
+        self.updates_since_refresh[:] = 0
+
+    def export_state(self):
+        """Copy of the model state in the layout expected by write_snapshot."""
+        return {
+            "A": self.A.copy(),
+            "b": self.b.copy(),
+            "A_inv": self.A_inv.copy(),
+            "theta": self.theta.copy(),
+            "alpha": self.alpha,
+            "update_count": self.update_count,
+        }
 
     def save(self, filepath):
-        with open(filepath, "wb") as f:
-            pickle.dump({
-                'A': self.A,
-                'b': self.b,
-                'num_arms': self.num_arms,
-                'context_dim': self.context_dim,
-                'alpha': self.alpha
-            }, f)
+        write_snapshot(filepath, self.export_state())
 
     def load(self, filepath):
+        if not is_snapshot(filepath):
+            self._load_legacy_pickle(filepath)
+            return
+
+        self.load_state(read_snapshot(filepath))
+
+    def load_state(self, state):
+        """Adopt a state dict (export_state / read_snapshot layout); its shape replaces the current one."""
+        self.num_arms, self.context_dim = state["b"].shape
+        self.alpha = state["alpha"]
+        self.update_count = state["update_count"]
+        # Copy out of the memmap; stored inverses are used as-is, no re-inversion needed
+        self.A = np.array(state["A"])
+        self.b = np.array(state["b"])
+        self.A_inv = np.array(state["A_inv"])
+        self.theta = np.array(state["theta"])
+        self.updates_since_refresh = np.zeros(self.num_arms, dtype=np.int64)
+
+    def _load_legacy_pickle(self, filepath):
+        """Read models saved before the binary snapshot format."""
         with open(filepath, "rb") as f:
             state = pickle.load(f)
-            self.A = state['A']
-            self.b = state['b']
             self.num_arms = state['num_arms']
             self.context_dim = state['context_dim']
             self.alpha = state['alpha']
+            # Older snapshots hold lists of (d, d) / (d, 1) arrays; stack them either way
+            self.A = np.asarray(state['A'], dtype=np.float64).reshape(self.num_arms, self.context_dim, self.context_dim)
+            self.b = np.asarray(state['b'], dtype=np.float64).reshape(self.num_arms, self.context_dim)
+        self.A_inv = np.empty_like(self.A)
+        self.theta = np.empty_like(self.b)
+        self.updates_since_refresh = np.zeros(self.num_arms, dtype=np.int64)
+        self.update_count = 0
+        self.refresh()
 
-def load_model_or_initialize(num_arms=5, context_dim=26, alpha=0.1, filepath="instance/linucb_model.pkl"):
+def load_model_or_initialize(num_arms=5, context_dim=26, alpha=0.1, filepath="instance/linucb_model.bin"):
     model = LinUCB(num_arms, context_dim, alpha)
     if os.path.exists(filepath):
         try:
@@ -1,8 +1,14 @@
 import os
+import pickle
+import threading
+
+import numpy as np
+
 from app.agents.bandit_linucb import LinUCB
+from app.agents.linucb_snapshot import HEADER_DTYPE, MAGIC, is_snapshot
 
 # Default path for persisted model
-DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "../../instance/linucb_model.pkl")
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "../../instance/linucb_model.bin")
 
 def save_linucb_model(agent: LinUCB, filepath: str = DEFAULT_MODEL_PATH):
     """
@@ -10,7 +16,7 @@ def save_linucb_model(agent: LinUCB, filepath: str = DEFAULT_MODEL_PATH):
 
     Args:
         agent (LinUCB): The LinUCB agent instance to persist.
-        filepath (str): Destination file path for the model (pickle format).
+        filepath (str): Destination file path for the model (binary snapshot, written atomically).
     """
     try:
         agent.save(filepath)
@@ -24,10 +30,145 @@ def load_linucb_model(agent: LinUCB, filepath: str = DEFAULT_MODEL_PATH):
 
     Args:
         agent (LinUCB): The LinUCB agent to restore.
-        filepath (str): Path to the persisted model file.
+        filepath (str): Path to the persisted model file (binary snapshot or legacy pickle).
     """
     try:
         agent.load(filepath)
         print(f"[LinUCB Load] Model loaded from: {filepath}")
     except Exception as e:
         print(f"[LinUCB Load Error] {e}")
+
+def stored_context_dim(filepath: str = DEFAULT_MODEL_PATH):
+    """
+    Context length a persisted model was trained with, read from the snapshot
+    header (legacy pickles are unpickled). Lets startup detect a model saved
+    under an older feature layout before loading it.
+
+    Returns:
+        int | None: context_dim, or None if the file can't be read.
+    """
+    try:
+        if is_snapshot(filepath):
+            header = np.fromfile(filepath, dtype=HEADER_DTYPE, count=1)
+            if header.shape[0] == 1 and header.tobytes()[:len(MAGIC)] == MAGIC:
+                return int(header["context_dim"][0])
+            return None
+        with open(filepath, "rb") as f:
+            return int(pickle.load(f)["context_dim"])
+    except Exception as e:
+        print(f"[LinUCB Load Error] {e}")
+        return None
+
+
+def retired_model_path(filepath: str, version: int) -> str:
+    """Where a snapshot of an older feature layout is kept: linucb_model.bin → linucb_model.v1.bin."""
+    root, ext = os.path.splitext(filepath)
+    return f"{root}.v{version}{ext}"
+
+
+def extend_linucb_state(state: dict, context_dim: int) -> dict:
+    """
+    Embed a model trained on the first k context features into a wider
+    layout whose extra features are appended after them. Per arm:
+    A → blockdiag(A, I), b → [b, 0], A_inv → blockdiag(A_inv, I), so scores
+    on the old features are unchanged and the new ones start from the prior.
+
+    Args:
+        state (dict): export_state / read_snapshot layout with k <= context_dim.
+        context_dim (int): Width of the new layout.
+
+    Returns:
+        dict: State in the new layout (alpha and update_count kept).
+    """
+    num_arms, k = state["b"].shape
+    if k > context_dim:
+        raise ValueError(f"[LinUCB] Cannot extend context_dim {k} to {context_dim}")
+    A = np.tile(np.identity(context_dim), (num_arms, 1, 1))
+    A_inv = A.copy()
+    b = np.zeros((num_arms, context_dim))
+    A[:, :k, :k] = state["A"]
+    A_inv[:, :k, :k] = state["A_inv"]
+    b[:, :k] = state["b"]
+    return {
+        "A": A,
+        "b": b,
+        "A_inv": A_inv,
+        "theta": np.einsum("kij,kj->ki", A_inv, b),
+        "alpha": float(state["alpha"]),
+        "update_count": int(state["update_count"]),
+    }
+
+
+class SnapshotWriter:
+    """
+    Background thread that snapshots an agent after every `every` updates
+    (or on request), so request handlers never wait on disk I/O.
+
+    Args:
+        agent: Any agent exposing export_state()/save() (LinUCB or a wrapper).
+        filepath (str): Snapshot destination.
+        every (int): Updates between automatic snapshots.
+        journal (RewardJournal): If set, snapshots compact the reward journal.
+        interval (float | None): With a journal, also compact every `interval`
+            seconds while it holds records (other workers' rewards never
+            reach this process's update count).
+    """
+
+    def __init__(self, agent, filepath: str = DEFAULT_MODEL_PATH, every: int = 100, journal=None,
+                 interval: float = None):
+        self.agent = agent
+        self.filepath = filepath
+        self.every = every
+        self.journal = journal
+        self.interval = interval
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="linucb-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = True):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if flush:
+            self._write()
+
+    def notify(self, n_updates: int = 1):
+        """Count applied updates; wakes the writer once `every` have accumulated."""
+        with self._lock:
+            self._pending += n_updates
+            due = self._pending >= self.every
+        if due:
+            self._wake.set()
+
+    def request(self):
+        """Ask for a snapshot as soon as possible without waiting for it."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            woke = self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if woke or (self.journal is not None and self.journal.has_records()):
+                self._write()
+
+    def _write(self):
+        with self._lock:
+            self._pending = 0
+        if self.journal is None:
+            save_linucb_model(self.agent, self.filepath)
+            return
+        try:
+            self.journal.compact(self.agent, self.filepath)
+        except Exception as e:
+            print(f"[LinUCB Save Error] {e}")
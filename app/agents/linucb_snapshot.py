@@ -0,0 +1,108 @@
+import os
+import tempfile
+
+import numpy as np
+
+# Binary LinUCB snapshot format
+#
+#   [64-byte header][A: k·d·d][b: k·d][A_inv: k·d·d][theta: k·d]
+#
+# All blocks are little-endian float64, C order. A_inv/theta are stored so a
+# restart can memmap the file and serve selections without re-inverting.
+# journal_generation is the first reward-journal generation NOT folded into
+# the snapshot (see reward_journal.py).
+MAGIC = b"KRDLUCB\0"
+FORMAT_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("num_arms", "<u4"),
+    ("context_dim", "<u4"),
+    ("_pad", "<u4"),
+    ("alpha", "<f8"),
+    ("update_count", "<i8"),
+    ("journal_generation", "<i8"),
+    ("_reserved", "<u1", (16,)),
+])
+HEADER_SIZE = HEADER_DTYPE.itemsize  # 64
+
+
+def is_snapshot(filepath):
+    """True if the file starts with the binary snapshot magic (vs. a legacy pickle)."""
+    with open(filepath, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_snapshot(filepath, state):
+    """
+    Atomically write a snapshot: the file is written and fsync'd under a
+    temporary name in the same directory, then renamed over the target.
+
+    Args:
+        filepath (str): Destination path.
+        state (dict): A, b, A_inv, theta arrays plus alpha and update_count.
+    """
+    A = np.ascontiguousarray(state["A"], dtype="<f8")
+    num_arms, context_dim = A.shape[0], A.shape[1]
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["num_arms"] = num_arms
+    header["context_dim"] = context_dim
+    header["alpha"] = state["alpha"]
+    header["update_count"] = state.get("update_count", 0)
+    header["journal_generation"] = state.get("journal_generation", 0)
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".linucb-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.tobytes())
+            for block in (A, state["b"], state["A_inv"], state["theta"]):
+                f.write(np.ascontiguousarray(block, dtype="<f8").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_snapshot(filepath):
+    """
+    Memory-map a snapshot without copying its blocks.
+
+    Returns:
+        dict: num_arms, context_dim, alpha, update_count, journal_generation and read-only
+        np.memmap views A, b, A_inv, theta.
+    """
+    header = np.fromfile(filepath, dtype=HEADER_DTYPE, count=1)
+    if header.shape[0] != 1 or header.tobytes()[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"[LinUCB Snapshot] {filepath} is not a LinUCB snapshot")
+    if header["version"][0] != FORMAT_VERSION:
+        raise ValueError(f"[LinUCB Snapshot] Unsupported snapshot version {header['version'][0]}")
+
+    k = int(header["num_arms"][0])
+    d = int(header["context_dim"][0])
+    expected = HEADER_SIZE + 8 * (2 * k * d * d + 2 * k * d)
+    if os.path.getsize(filepath) != expected:
+        raise ValueError(f"[LinUCB Snapshot] {filepath} is truncated or corrupt")
+
+    offset = HEADER_SIZE
+    blocks = {}
+    for name, shape in (("A", (k, d, d)), ("b", (k, d)), ("A_inv", (k, d, d)), ("theta", (k, d))):
+        blocks[name] = np.memmap(filepath, dtype="<f8", mode="r", offset=offset, shape=shape)
+        offset += 8 * int(np.prod(shape))
+
+    return {
+        "num_arms": k,
+        "context_dim": d,
+        "alpha": float(header["alpha"][0]),
+        "update_count": int(header["update_count"][0]),
+        "journal_generation": int(header["journal_generation"][0]),
+        **blocks,
+    }
@@ -0,0 +1,492 @@
+import fcntl
+import glob
+import os
+import re
+import tempfile
+import threading
+import uuid
+
+import numpy as np
+
+from app.agents.linucb_snapshot import write_snapshot
+
+# Append-only reward journal (write-ahead log)
+#
+#   rewards.<generation>.<writer>.wal = [32-byte header][record][record]...
+#
+# Each record is fixed width (arm, reward, context), so a file is replayed with
+# a single np.fromfile. A torn record at the tail (crash mid-append) is ignored.
+# Compaction rotates to a new generation, snapshots the model tagged with that
+# generation, and deletes older files: a snapshot therefore contains exactly
+# the journal generations below its journal_generation.
+#
+# Every worker process appends to its own segment (one file per process and
+# generation, so a crash can only tear the tail of its own file). Appends and
+# their agent updates run under a shared flock on <directory>/.gate; the one
+# process holding the directory's ownership flock (lock()) compacts under an
+# exclusive one, so it sees every record appended so far and no segment grows
+# while it snapshots. The gate file also stores the current generation:
+# writers read it on every append and move to a new segment after a rotation.
+# Files named rewards.<generation>.wal (before per-process segments) are
+# still replayed and compacted.
+MAGIC = b"KRDRWAL\0"
+FORMAT_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("context_dim", "<u4"),
+    ("generation", "<i8"),
+    ("_reserved", "<u1", (8,)),
+])
+HEADER_SIZE = HEADER_DTYPE.itemsize  # 32
+
+FILE_PATTERN = re.compile(r"rewards\.(\d+)(?:\.[0-9a-f]+)?\.wal$")
+
+GENERATION_DTYPE = np.dtype("<i8")
+
+
+def record_dtype(context_dim):
+    return np.dtype([
+        ("arm", "<i4"),
+        ("_pad", "<i4"),
+        ("reward", "<f8"),
+        ("context", "<f8", (context_dim,)),
+    ])
+
+
+class RewardJournal:
+    """
+    Write-ahead log for agent updates with group-committed fsyncs.
+
+    - apply()/apply_batch() append the record(s) to this process's segment,
+      update the agent, then wait for the background flusher's next fsync,
+      which covers every append made since the previous one (one fsync per
+      flush_interval, not per request). Every process may append.
+    - compact() folds every process's segments into a model snapshot (owner only).
+    - replay() re-applies journaled rewards on top of the last snapshot.
+
+    With a per-process agent, the owner applies the other processes' records
+    to its own agent when it compacts, so the snapshot holds every
+    acknowledged reward. With shared_agent (SharedLinUCB) every writer
+    updated the same model, so they are already in it.
+
+    Args:
+        directory (str): Where rewards.<generation>.<writer>.wal files live.
+        context_dim (int): Context length; fixes the record width.
+        flush_interval (float): Seconds between group fsyncs.
+        shared_agent (bool): All processes update one agent.
+    """
+
+    def __init__(self, directory: str, context_dim: int, flush_interval: float = 0.005,
+                 shared_agent: bool = False):
+        self.directory = directory
+        self.context_dim = context_dim
+        self.flush_interval = flush_interval
+        self.shared_agent = shared_agent
+        self.record_dtype = record_dtype(context_dim)
+        os.makedirs(directory, exist_ok=True)
+
+        # First generation not covered by the snapshot; new segments are never numbered below it
+        self.floor = 0
+        self.generation = None
+        self._file = None
+        self._lock_file = None
+        self._own = set()      # segments this process created (their records are in its agent)
+        self._applied = {}     # other segments' path → records already applied to the agent
+        self._gate = _UpdateGate()
+        self._process_gate = _ProcessGate(os.path.join(directory, ".gate"))
+        self._io_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._durable_cond = threading.Condition(threading.Lock())
+        self._written = 0
+        self._durable = 0
+        self._flusher = None
+        self._stop = threading.Event()
+
+    # ───── Ownership ─────
+    def lock(self) -> bool:
+        """
+        Take the exclusive flock on the journal directory, held until the
+        process exits (the kernel releases it if the process dies). Only the
+        owner compacts; every process may append.
+
+        Returns:
+            bool: True if this process owns the journal, False if another does.
+        """
+        if self._lock_file is None:
+            lock_file = open(os.path.join(self.directory, ".lock"), "a+")
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        return True
+
+    @property
+    def owned(self) -> bool:
+        return self._lock_file is not None
+
+    # ───── Update Path ─────
+    def apply(self, agent, chosen_arm, reward, context_vector):
+        """Journal one reward, apply it to the agent, and return once it is durable."""
+        x = np.asarray(context_vector, dtype=np.float64).reshape(-1)
+        records = np.zeros(1, dtype=self.record_dtype)
+        records["arm"] = chosen_arm
+        records["reward"] = reward
+        records["context"] = x
+
+        with self._gate.shared(), self._process_gate.shared():
+            ticket = self._append(records)
+            agent.update(int(chosen_arm), float(reward), x)
+        self._wait_durable(ticket)
+
+    def apply_batch(self, agent, chosen_arms, rewards, contexts):
+        """Journal a batch in one append, apply it as one mini-batch update, wait for durability."""
+        contexts = np.asarray(contexts, dtype=np.float64)
+        records = np.zeros(contexts.shape[0], dtype=self.record_dtype)
+        records["arm"] = chosen_arms
+        records["reward"] = rewards
+        records["context"] = contexts
+
+        with self._gate.shared(), self._process_gate.shared():
+            ticket = self._append(records)
+            agent.update_batch(chosen_arms, rewards, contexts)
+        self._wait_durable(ticket)
+
+    def _append(self, records):
+        """Append to this process's segment for the current generation; caller holds both gates shared."""
+        current = self._current_generation()
+        if self._file is None or self.generation != current:
+            self._rotate(current)
+        with self._io_lock:
+            self._file.write(records.tobytes())
+            self._written += 1
+            ticket = self._written
+        self._start_flusher()
+        return ticket
+
+    def _rotate(self, generation):
+        with self._sync_lock, self._io_lock:
+            if self._file is not None and self.generation == generation:
+                return  # another thread already moved on
+            self._close_segment()
+            self._open(generation)
+
+    # ───── Group Commit ─────
+    def _start_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._durable_cond:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._stop.clear()
+                    self._flusher = threading.Thread(target=self._flush_loop, name="reward-journal", daemon=True)
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.sync()
+
+    def sync(self):
+        """Fsync everything appended so far."""
+        with self._sync_lock:
+            with self._io_lock:
+                if self._file is None or self._written == self._durable:
+                    return
+                target = self._written
+                fd = self._file.fileno()
+            # fsync outside the io lock so appends keep flowing; _sync_lock keeps fd open
+            os.fsync(fd)
+            self._mark_durable(target)
+
+    def _mark_durable(self, target):
+        with self._durable_cond:
+            self._durable = max(self._durable, target)
+            self._durable_cond.notify_all()
+
+    def _wait_durable(self, ticket):
+        with self._durable_cond:
+            self._durable_cond.wait_for(lambda: self._durable >= ticket)
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.sync()
+        with self._sync_lock, self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ───── Files ─────
+    def _path(self, generation, writer):
+        return os.path.join(self.directory, f"rewards.{generation:08d}.{writer}.wal")
+
+    def _files(self):
+        """(generation, path) of every journal file, oldest generation first."""
+        found = []
+        for path in glob.glob(os.path.join(self.directory, "rewards.*.wal")):
+            match = FILE_PATTERN.search(os.path.basename(path))
+            if match:
+                found.append((int(match.group(1)), path))
+        return sorted(found)
+
+    def generations(self):
+        return sorted({generation for generation, _ in self._files()})
+
+    def has_records(self):
+        """True if any journal file holds records (i.e. compaction has something to fold)."""
+        for _, path in self._files():
+            try:
+                if os.path.getsize(path) > HEADER_SIZE:
+                    return True
+            except FileNotFoundError:
+                continue
+        return False
+
+    def _current_generation(self):
+        """Generation new appends go to: the last one compaction published, never below floor."""
+        published = self._process_gate.read_generation()
+        if published is None:
+            published = max(self.generations(), default=self.floor)
+        return max(published, self.floor)
+
+    def _next_generation(self):
+        existing = self.generations()
+        published = self._process_gate.read_generation()
+        return max(existing + [self.floor, -1 if published is None else published]) + 1
+
+    def _open(self, generation):
+        """Start this process's segment for `generation`; caller holds _sync_lock and _io_lock."""
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MAGIC
+        header["version"] = FORMAT_VERSION
+        header["context_dim"] = self.context_dim
+        header["generation"] = generation
+
+        # Header written under a temporary name, then renamed: readers never see a headerless segment
+        path = self._path(generation, uuid.uuid4().hex[:12])
+        fd, tmp_path = tempfile.mkstemp(prefix=".rewards-", suffix=".tmp", dir=self.directory)
+        try:
+            os.write(fd, header.tobytes())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.rename(tmp_path, path)
+        # Unbuffered: every append is one write() straight to the file
+        self._file = open(path, "ab", buffering=0)
+        if not self.owned:
+            self._own.clear()  # only the owner (which compacts) needs its older segments
+        self._own.add(path)
+        self.generation = generation
+
+    def _close_segment(self):
+        """Fsync and close the current segment; caller holds _sync_lock and _io_lock."""
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+            # Every ticket issued so far was in that file, now fsync'd
+            self._mark_durable(self._written)
+
+    def _read_header(self, path):
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if header.shape[0] != 1 or header.tobytes()[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"[RewardJournal] {path} is not a reward journal")
+        return header
+
+    def _read_records(self, path, start: int = 0):
+        header = self._read_header(path)
+        if int(header["context_dim"][0]) != self.context_dim:
+            raise ValueError(
+                f"[RewardJournal] {path} has context_dim {header['context_dim'][0]}, expected {self.context_dim}"
+            )
+        # Whole records only: a torn tail from a crash mid-append is dropped
+        count = (os.path.getsize(path) - HEADER_SIZE) // self.record_dtype.itemsize
+        if count <= start:
+            return np.zeros(0, dtype=self.record_dtype)
+        return np.fromfile(path, dtype=self.record_dtype, count=count - start,
+                           offset=HEADER_SIZE + start * self.record_dtype.itemsize)
+
+    def _current_layout(self, path):
+        """True if path holds records of this context_dim (False if another layout or gone)."""
+        try:
+            stored_dim = int(self._read_header(path)["context_dim"][0])
+        except FileNotFoundError:
+            return False  # compacted away by the owner
+        if stored_dim != self.context_dim:
+            print(f"[RewardJournal] Skipping {path}: context_dim {stored_dim}, expected {self.context_dim}")
+            return False
+        return True
+
+    # ───── Recovery ─────
+    def replay(self, agent, from_generation: int = 0, chunk_size: int = 65536):
+        """
+        Re-apply journaled rewards (every process's segments) from
+        generations >= from_generation, and start numbering new generations
+        there. Generations written under another context_dim (an older
+        feature layout) are skipped; the next compaction deletes them.
+
+        Returns:
+            int: Number of records replayed.
+        """
+        self.floor = max(self.floor, from_generation)
+        replayed = 0
+        # Exclusive: no segment is mid-append while it is read
+        with self._gate.exclusive(), self._process_gate.exclusive():
+            for generation, path in self._files():
+                if generation < from_generation or not self._current_layout(path):
+                    continue
+                try:
+                    records = self._read_records(path)
+                except FileNotFoundError:
+                    continue
+                for start in range(0, records.shape[0], chunk_size):
+                    chunk = records[start:start + chunk_size]
+                    agent.update_batch(chunk["arm"], chunk["reward"], chunk["context"])
+                self._applied[path] = records.shape[0]
+                replayed += records.shape[0]
+        print(f"[RewardJournal] Replayed {replayed} rewards from {self.directory}")
+        return replayed
+
+    def _apply_others(self, agent, below: int):
+        """Apply other processes' records (generations < below) not yet in this agent; caller holds the gates."""
+        applied = 0
+        for generation, path in self._files():
+            if generation < self.floor or generation >= below or path in self._own:
+                continue
+            if not self._current_layout(path):
+                continue
+            records = self._read_records(path, start=self._applied.get(path, 0))
+            if records.shape[0]:
+                agent.update_batch(records["arm"], records["reward"], records["context"])
+                self._applied[path] = self._applied.get(path, 0) + records.shape[0]
+                applied += records.shape[0]
+        return applied
+
+    def compact(self, agent, snapshot_path: str):
+        """
+        Fold the journal into a snapshot: while every process's updates are
+        paused, publish a new generation, bring in the other processes'
+        records (per-process agents), and snapshot the agent tagged with that
+        generation; then delete the older journal files. Only the owner
+        (lock()) may compact.
+        """
+        if not self.owned:
+            raise RuntimeError(f"[RewardJournal] {self.directory} is not locked by this process; call lock() first")
+        with self._gate.exclusive(), self._process_gate.exclusive():
+            with self._sync_lock, self._io_lock:
+                self._close_segment()
+                generation = self._next_generation()
+                self._process_gate.publish_generation(generation)
+            absorbed = 0 if self.shared_agent else self._apply_others(agent, generation)
+            state = agent.export_state()
+
+        state["journal_generation"] = generation
+        write_snapshot(snapshot_path, state)
+
+        for old, path in self._files():
+            if old < generation:
+                os.remove(path)
+                self._own.discard(path)
+                self._applied.pop(path, None)
+        self.floor = generation
+        print(f"[RewardJournal] Compacted into {snapshot_path} (generation {generation}, "
+              f"{absorbed} rewards from other workers)")
+
+
+class _ProcessGate:
+    """
+    Shared/exclusive flock on one file, across processes. Each thread locks
+    through its own open file (flock belongs to the open file, so threads
+    sharing one would release each other's holds). The file's first 8 bytes
+    hold the current journal generation.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _file(self):
+        f = getattr(self._local, "file", None)
+        # Reopened after fork: a child sharing the parent's open file would share its locks
+        if f is None or self._local.pid != os.getpid():
+            f = self._local.file = os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644), "r+b", buffering=0)
+            self._local.pid = os.getpid()
+        return f
+
+    def shared(self):
+        return _FlockHold(self._file(), fcntl.LOCK_SH)
+
+    def exclusive(self):
+        return _FlockHold(self._file(), fcntl.LOCK_EX)
+
+    def read_generation(self):
+        """Generation published by the last compaction, or None (caller holds the gate)."""
+        raw = os.pread(self._file().fileno(), GENERATION_DTYPE.itemsize, 0)
+        if len(raw) < GENERATION_DTYPE.itemsize:
+            return None
+        return int(np.frombuffer(raw, dtype=GENERATION_DTYPE)[0])
+
+    def publish_generation(self, generation):
+        """Store the current generation durably (caller holds the gate exclusively)."""
+        fd = self._file().fileno()
+        os.pwrite(fd, np.array([generation], dtype=GENERATION_DTYPE).tobytes(), 0)
+        os.fsync(fd)
+
+
+class _FlockHold:
+    def __init__(self, f, mode):
+        self.f = f
+        self.mode = mode
+
+    def __enter__(self):
+        fcntl.flock(self.f.fileno(), self.mode)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+
+
+class _UpdateGate:
+    """Many concurrent updaters (shared) or one compactor (exclusive)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._active = 0
+        self._exclusive = False
+
+    def shared(self):
+        return _GateHold(self, exclusive=False)
+
+    def exclusive(self):
+        return _GateHold(self, exclusive=True)
+
+    def _acquire(self, exclusive):
+        with self._cond:
+            if exclusive:
+                self._cond.wait_for(lambda: not self._exclusive)
+                self._exclusive = True
+                self._cond.wait_for(lambda: self._active == 0)
+            else:
+                self._cond.wait_for(lambda: not self._exclusive)
+                self._active += 1
+
+    def _release(self, exclusive):
+        with self._cond:
+            if exclusive:
+                self._exclusive = False
+            else:
+                self._active -= 1
+            self._cond.notify_all()
+
+
+class _GateHold:
+    def __init__(self, gate, exclusive):
+        self.gate = gate
+        self.exclusive = exclusive
+
+    def __enter__(self):
+        self.gate._acquire(self.exclusive)
+
+    def __exit__(self, *exc):
+        self.gate._release(self.exclusive)
@@ -0,0 +1,278 @@
+import fcntl
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.agents.bandit_linucb import LinUCB, ucb_scores, ucb_select_batch
+from app.agents.linucb_snapshot import write_snapshot
+from app.agents.threadsafe_linucb import Snapshot
+
+# Segment layout version, bumped whenever the block order below changes
+LAYOUT_VERSION = 1
+
+# Header: 8 int64 slots → [seq, layout_version, num_arms, context_dim, alpha (float64 bits), update_count, 0, 0]
+HEADER_SLOTS = 8
+SEQ, VERSION, NUM_ARMS, CONTEXT_DIM, ALPHA, UPDATE_COUNT = range(6)
+
+# Reader retries on an odd sequence before suspecting a writer died mid-update
+MAX_READ_SPINS = 10_000
+
+DEFAULT_SEGMENT_PATH = os.getenv(
+    "KEYRD_AGENT_SEGMENT",
+    "/dev/shm/keyrd_linucb.seg" if os.path.isdir("/dev/shm") else os.path.join(
+        os.path.dirname(__file__), "../../instance/keyrd_linucb.seg"
+    ),
+)
+
+
+def segment_size(num_arms, context_dim):
+    """Bytes needed for header + A, A_inv (k·d·d) + b, theta (k·d) + update counters (k)."""
+    k, d = num_arms, context_dim
+    return 8 * (HEADER_SLOTS + 2 * k * d * d + 2 * k * d + k)
+
+
+class SharedLinUCB:
+    """
+    LinUCB whose state lives in one memory-mapped segment shared by every
+    gunicorn worker on the host.
+
+    - All workers map the same file (tmpfs under /dev/shm by default), so the
+      model exists once and every update is visible to every worker.
+    - Writers serialize on an flock'd sidecar file (plus a thread lock inside
+      the process) and bump a sequence counter before and after mutating.
+    - Readers score directly against the mapped arrays and retry if the
+      sequence counter moved (seqlock), so selections never block on writers.
+    """
+
+    def __init__(self, num_arms: int, context_dim: int, alpha: float = 0.1,
+                 path: str = DEFAULT_SEGMENT_PATH, refresh_every: int = 500):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._thread_lock = threading.Lock()
+        self._lock_file = open(path + ".lock", "a+")
+
+        with self._write_lock():
+            fresh = not os.path.exists(path) or os.path.getsize(path) != segment_size(num_arms, context_dim)
+            if fresh:
+                with open(path, "wb") as f:
+                    f.truncate(segment_size(num_arms, context_dim))
+            self._map(num_arms, context_dim)
+
+            # True when this process created the segment (nothing learned yet)
+            self.fresh = fresh or self._header[VERSION] != LAYOUT_VERSION
+            if self.fresh:
+                self._initialize(alpha)
+                print(f"[SharedLinUCB] Initialized segment at {path}")
+            else:
+                print(f"[SharedLinUCB] Attached to existing segment at {path}")
+                self._repair_torn_write()
+
+        # Local LinUCB bound to the mapped arrays: reuses the update maths in place
+        self.agent = LinUCB.__new__(LinUCB)
+        self.agent.num_arms = num_arms
+        self.agent.context_dim = context_dim
+        self.agent.alpha = self.alpha
+        self.agent.refresh_every = refresh_every
+        self.agent.A, self.agent.b = self._A, self._b
+        self.agent.A_inv, self.agent.theta = self._A_inv, self._theta
+        self.agent.updates_since_refresh = self._updates
+        self.agent.update_count = 0  # authoritative count lives in the segment header
+
+    # ───── Segment Mapping ─────
+    def _map(self, num_arms, context_dim):
+        k, d = num_arms, context_dim
+        self._mm = np.memmap(self.path, dtype=np.uint8, mode="r+", shape=(segment_size(k, d),))
+
+        offset = 0
+
+        def block(dtype, shape):
+            nonlocal offset
+            count = int(np.prod(shape))
+            view = np.ndarray(shape, dtype=dtype, buffer=self._mm, offset=offset)
+            offset += 8 * count
+            return view
+
+        self._header = block(np.int64, (HEADER_SLOTS,))
+        self._alpha = np.ndarray((1,), dtype=np.float64, buffer=self._mm, offset=8 * ALPHA)
+        self._A = block(np.float64, (k, d, d))
+        self._b = block(np.float64, (k, d))
+        self._A_inv = block(np.float64, (k, d, d))
+        self._theta = block(np.float64, (k, d))
+        self._updates = block(np.int64, (k,))
+        self.num_arms, self.context_dim = k, d
+
+    def _initialize(self, alpha):
+        self._header[:] = 0
+        self._header[VERSION] = LAYOUT_VERSION
+        self._header[NUM_ARMS] = self.num_arms
+        self._header[CONTEXT_DIM] = self.context_dim
+        self._alpha[0] = alpha
+        self._A[...] = np.identity(self.context_dim)
+        self._b[...] = 0.0
+        self._A_inv[...] = np.identity(self.context_dim)
+        self._theta[...] = 0.0
+        self._updates[...] = 0
+        self._mm.flush()
+
+    @property
+    def alpha(self):
+        return float(self._alpha[0])
+
+    # ───── Write Coordination ─────
+    def _write_lock(self):
+        return _SegmentWriteLock(self._thread_lock, self._lock_file)
+
+    def _begin_write(self):
+        self._header[SEQ] += 1  # odd → write in progress
+
+    def _end_write(self):
+        self._header[SEQ] += 1  # even → stable
+
+    def _repair_torn_write(self):
+        """
+        Caller holds the write lock. An odd sequence here means a writer was
+        killed mid-update (the kernel released its flock): A/b may hold a
+        partial rank-one step and A_inv/theta are stale. Rebuild the derived
+        blocks from A and b and mark the segment stable again.
+        """
+        if not self._header[SEQ] & 1:
+            return
+        self._A[...] = (self._A + self._A.transpose(0, 2, 1)) / 2  # a torn outer product can break symmetry
+        self._A_inv[...] = np.linalg.inv(self._A)
+        self._theta[...] = np.einsum("kij,kj->ki", self._A_inv, self._b)
+        self._updates[...] = 0
+        self._header[SEQ] += 1
+        self._mm.flush()
+        print(f"[SharedLinUCB] Repaired segment {self.path} after an interrupted write")
+
+    def _read(self, fn):
+        """Run fn against the mapped arrays, retrying if a writer intervened."""
+        spins = 0
+        while True:
+            seq = int(self._header[SEQ])
+            if seq & 1:
+                spins += 1
+                if spins >= MAX_READ_SPINS:
+                    # A live writer holds the flock (we wait for it); a dead one doesn't
+                    with self._write_lock():
+                        self._repair_torn_write()
+                    spins = 0
+                else:
+                    time.sleep(0)
+                continue
+            with np.errstate(invalid="ignore"):
+                result = fn()
+            if int(self._header[SEQ]) == seq:
+                return result
+
+    # ───── Read Path ─────
+    def snapshot(self) -> Snapshot:
+        return self._read(lambda: Snapshot(self._theta.copy(), self._A_inv.copy(), self.alpha))
+
+    def scores(self, context_vector):
+        x = self._as_context(context_vector)
+        return self._read(lambda: ucb_scores(self._theta, self._A_inv, self.alpha, x))
+
+    def select_action(self, context_vector):
+        return int(np.argmax(self.scores(context_vector)))
+
+    def select_actions(self, contexts, chunk_size=8192):
+        contexts = np.asarray(contexts, dtype=np.float64)
+        if contexts.ndim != 2 or contexts.shape[1] != self.context_dim:
+            raise ValueError(
+                f"[LinUCB Error] Context matrix shape mismatch: expected (n, {self.context_dim}), got {contexts.shape}"
+            )
+        return self._read(lambda: ucb_select_batch(self._theta, self._A_inv, self.alpha, contexts, chunk_size))
+
+    # ───── Write Path ─────
+    def update(self, chosen_arm, reward, context_vector):
+        x = self._as_context(context_vector)
+        with self._write_lock():
+            self._begin_write()
+            try:
+                self.agent.update(int(chosen_arm), float(reward), x)
+                self._header[UPDATE_COUNT] += 1
+            finally:
+                self._end_write()
+
+    def update_batch(self, chosen_arms, rewards, contexts):
+        with self._write_lock():
+            self._begin_write()
+            try:
+                before = self.agent.update_count
+                self.agent.update_batch(chosen_arms, rewards, contexts)
+                self._header[UPDATE_COUNT] += self.agent.update_count - before
+            finally:
+                self._end_write()
+
+    def export_state(self):
+        """Consistent copy of the full model, taken without blocking writers."""
+        return self._read(lambda: {
+            "A": self._A.copy(),
+            "b": self._b.copy(),
+            "A_inv": self._A_inv.copy(),
+            "theta": self._theta.copy(),
+            "alpha": self.alpha,
+            "update_count": int(self._header[UPDATE_COUNT]),
+        })
+
+    def save(self, filepath):
+        write_snapshot(filepath, self.export_state())
+
+    def load(self, filepath):
+        """Load a saved model into the segment; shapes must match the mapped layout."""
+        staged = LinUCB(self.num_arms, self.context_dim, self.alpha)
+        staged.load(filepath)
+        self._install(staged)
+
+    def load_state(self, state):
+        """Load a state dict (export_state layout) into the segment; shapes must match."""
+        staged = LinUCB(self.num_arms, self.context_dim, self.alpha)
+        staged.load_state(state)
+        self._install(staged)
+
+    def _install(self, staged):
+        if (staged.num_arms, staged.context_dim) != (self.num_arms, self.context_dim):
+            raise ValueError(
+                f"[SharedLinUCB] Saved model is {staged.num_arms}x{staged.context_dim}, "
+                f"segment is {self.num_arms}x{self.context_dim}"
+            )
+        with self._write_lock():
+            self._begin_write()
+            try:
+                self._A[...] = staged.A
+                self._b[...] = staged.b
+                self._A_inv[...] = staged.A_inv
+                self._theta[...] = staged.theta
+                self._updates[...] = 0
+                self._header[UPDATE_COUNT] = staged.update_count
+                self._alpha[0] = staged.alpha
+                self.agent.alpha = staged.alpha
+            finally:
+                self._end_write()
+
+    def _as_context(self, context_vector):
+        x = np.asarray(context_vector, dtype=np.float64).reshape(-1)
+        if x.shape[0] != self.context_dim:
+            raise ValueError(
+                f"[LinUCB Error] Context vector shape mismatch: expected {self.context_dim}, got {x.shape[0]}"
+            )
+        return x
+
+
+class _SegmentWriteLock:
+    """Thread lock within the process + exclusive flock across processes."""
+
+    def __init__(self, thread_lock, lock_file):
+        self.thread_lock = thread_lock
+        self.lock_file = lock_file
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+        self.thread_lock.release()
@@ -0,0 +1,143 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from app.agents.bandit_linucb import LinUCB, ucb_scores, ucb_select_batch
+from app.agents.linucb_snapshot import write_snapshot
+
+# Immutable view of the model that selections read from
+Snapshot = namedtuple("Snapshot", ["theta", "A_inv", "alpha"])
+
+
+class ThreadSafeLinUCB:
+    """
+    Thread-safe wrapper around a shared LinUCB agent.
+
+    - Updates to an arm run under that arm's lock, so feedback for different
+      arms proceeds in parallel.
+    - After each update the arm's new inverse/theta are published into a fresh
+      snapshot (copy-on-write); selections read the current snapshot reference
+      and never wait on writers.
+    - Logged contexts (float32 blob views or legacy JSON lists) are converted to
+      float64 arrays once, at the boundary, so callers can pass NudgeLog.context directly.
+    """
+
+    def __init__(self, agent: LinUCB):
+        self.agent = agent
+        self._arm_locks = [threading.Lock() for _ in range(agent.num_arms)]
+        self._publish_lock = threading.Lock()
+        self._snapshot = self._full_snapshot()
+
+    # ───── Read Path ─────
+    @property
+    def num_arms(self):
+        return self.agent.num_arms
+
+    @property
+    def context_dim(self):
+        return self.agent.context_dim
+
+    def snapshot(self) -> Snapshot:
+        return self._snapshot
+
+    def scores(self, context_vector):
+        snap = self._snapshot
+        return ucb_scores(snap.theta, snap.A_inv, snap.alpha, self._as_context(context_vector))
+
+    def select_action(self, context_vector):
+        return int(np.argmax(self.scores(context_vector)))
+
+    def select_actions(self, contexts, chunk_size=8192):
+        contexts = np.asarray(contexts, dtype=np.float64)
+        if contexts.ndim != 2 or contexts.shape[1] != self.context_dim:
+            raise ValueError(
+                f"[LinUCB Error] Context matrix shape mismatch: expected (n, {self.context_dim}), got {contexts.shape}"
+            )
+        snap = self._snapshot
+        return ucb_select_batch(snap.theta, snap.A_inv, snap.alpha, contexts, chunk_size)
+
+    # ───── Write Path ─────
+    def update(self, chosen_arm, reward, context_vector):
+        chosen_arm = int(chosen_arm)
+        x = self._as_context(context_vector)
+        with self._arm_locks[chosen_arm]:
+            self.agent.update(chosen_arm, float(reward), x)
+            self._publish([chosen_arm])
+
+    def update_batch(self, chosen_arms, rewards, contexts):
+        chosen_arms = np.asarray(chosen_arms, dtype=np.int64).reshape(-1)
+        rewards = np.asarray(rewards, dtype=np.float64).reshape(-1)
+        contexts = np.asarray(contexts, dtype=np.float64)
+        arms = sorted(set(chosen_arms.tolist()))
+
+        # Lock touched arms in index order so concurrent batches can't deadlock
+        for arm in arms:
+            self._arm_locks[arm].acquire()
+        try:
+            self.agent.update_batch(chosen_arms, rewards, contexts)
+            self._publish(arms)
+        finally:
+            for arm in reversed(arms):
+                self._arm_locks[arm].release()
+
+    def export_state(self):
+        """Consistent copy of the full model; writers pause only for the copy."""
+        with self._all_arms():
+            return self.agent.export_state()
+
+    def save(self, filepath):
+        # Disk I/O happens outside the locks
+        write_snapshot(filepath, self.export_state())
+
+    def load(self, filepath):
+        with self._all_arms():
+            self.agent.load(filepath)
+            with self._publish_lock:
+                self._snapshot = self._full_snapshot()
+
+    def load_state(self, state):
+        with self._all_arms():
+            self.agent.load_state(state)
+            with self._publish_lock:
+                self._snapshot = self._full_snapshot()
+
+    # ───── Internals ─────
+    def _as_context(self, context_vector):
+        x = np.asarray(context_vector, dtype=np.float64).reshape(-1)
+        if x.shape[0] != self.context_dim:
+            raise ValueError(
+                f"[LinUCB Error] Context vector shape mismatch: expected {self.context_dim}, got {x.shape[0]}"
+            )
+        return x
+
+    def _full_snapshot(self):
+        return Snapshot(self.agent.theta.copy(), self.agent.A_inv.copy(), self.agent.alpha)
+
+    def _publish(self, arms):
+        """Copy the given arms' fresh state into a new snapshot; caller holds their arm locks."""
+        with self._publish_lock:
+            prev = self._snapshot
+            theta = prev.theta.copy()
+            A_inv = prev.A_inv.copy()
+            theta[arms] = self.agent.theta[arms]
+            A_inv[arms] = self.agent.A_inv[arms]
+            self._snapshot = Snapshot(theta, A_inv, prev.alpha)
+
+    def _all_arms(self):
+        return _LockAll(self._arm_locks)
+
+
+class _LockAll:
+    """Context manager acquiring every arm lock in index order."""
+
+    def __init__(self, locks):
+        self.locks = locks
+
+    def __enter__(self):
+        for lock in self.locks:
+            lock.acquire()
+
+    def __exit__(self, *exc):
+        for lock in reversed(self.locks):
+            lock.release()
@@ -4,9 +4,16 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 import os
 
+from config import database_uri
 from app.routes import register_blueprints
 from app.state import load_agent
-from app.models import db  # ✅ Critical: use shared db instance from models.py
+from app.models import db, add_missing_columns, add_missing_indexes, init_db  # ✅ Critical: use shared db instance from models.py
+from app.utils.push_dispatcher import dispatcher
+from app.utils.push_receipts import receipt_tracker
+from app.utils.campaign_scheduler import CampaignScheduler
+from app.utils.job_queue import WorkerPool, job_queue
+from app.utils.group_commit import group_commit
+from app.utils.sensor_stream import sensor_aggregator
 
 
 def create_app():
@@ -14,13 +21,11 @@ def create_app():
     app = Flask(__name__, instance_relative_config=True)
 
     # ───── Config Setup ─────
-    basedir = os.path.abspath(os.path.dirname(__file__))
-    db_path = os.path.join(basedir, "..", "instance", "keyrd.db")
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri()
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-    # ───── Extensions Init ─────
-    db.init_app(app)
+    # ───── Extensions Init (SQLite: WAL + pooled engine; Postgres via DATABASE_URL) ─────
+    init_db(app)
 
     # ───── Register Routes ─────
     register_blueprints(app)
@@ -28,6 +33,29 @@ def create_app():
     # ───── App Context Setup ─────
     with app.app_context():
         db.create_all()
+        add_missing_columns()
+        add_missing_indexes()
         load_agent()
 
+    # ───── Group Commit (onboarding upserts, decision logs) ─────
+    group_commit.start(app)
+
+    # ───── Sensor Aggregates (flushed to sensor_aggregates in the background) ─────
+    sensor_aggregator.start(app)
+
+    # ───── Push Receipts (dead-token pruning) ─────
+    if os.getenv("KEYRD_RECEIPTS", "1") == "1":
+        receipt_tracker.start(app, dispatcher)
+
+    # ───── Job Workers (0 → run them separately with scripts/run_job_workers.py) ─────
+    workers = int(os.getenv("KEYRD_JOB_WORKERS", "4"))
+    if workers > 0:
+        app.extensions["job_workers"] = WorkerPool(job_queue, app, workers=workers)
+        app.extensions["job_workers"].start()
+
+    # ───── Wake-Time Campaigns (enable in exactly one process) ─────
+    if os.getenv("KEYRD_SCHEDULER", "0") == "1":
+        app.extensions["campaign_scheduler"] = CampaignScheduler(app, dispatcher)
+        app.extensions["campaign_scheduler"].start()
+
     return app
@@ -1,9 +1,15 @@
 # app/models.py
 
+import os
+
+import numpy as np
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy import JSON, event, inspect, text
+from sqlalchemy.engine import make_url
 from datetime import datetime
 
+from app.utils.context_codec import FEATURE_VERSION, pack_context, unpack_context
+
 # ───── Shared DB Instance ─────
 db = SQLAlchemy()
 
@@ -14,6 +20,8 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     device_token = db.Column(db.String(256), nullable=True)
+    # Set when the push service reports the token dead (uninstalled app); cleared on re-registration
+    device_token_invalid_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Static onboarding inputs
@@ -28,6 +36,10 @@ class User(db.Model):
     sleep_time = db.Column(db.Time)
     work_hours = db.Column(db.String(50))
     zip_code = db.Column(db.String(10))
+    timezone = db.Column(db.String(64))  # IANA name, e.g. "America/Chicago"; NULL → KEYRD_DEFAULT_TZ or no campaign
+
+    # Precomputed static context (packed float32), refreshed whenever the fields above change
+    static_context = db.Column(db.LargeBinary, nullable=True)
 
     # Relationship to nudge logs
     logs = db.relationship("NudgeLog", backref="user", lazy=True)
@@ -44,9 +56,217 @@ class NudgeLog(db.Model):
     nudge_id = db.Column(db.Integer, nullable=True)
     goal = db.Column(db.String(256), nullable=True)
     message = db.Column(db.String(512), nullable=True)
-    context_vector = db.Column(JSON, nullable=True)
+    context_vector = db.Column(JSON, nullable=True)  # legacy JSON list; migrated into context_blob
+    context_blob = db.Column(db.LargeBinary, nullable=True)  # packed float32 (context_codec)
+    context_version = db.Column(db.SmallInteger, nullable=True)  # FEATURE_VERSION the blob was logged under
     reward = db.Column(db.Float, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Feedback looks up the newest pending log per (user, nudge). Partial index:
+        # only unrewarded rows are indexed, so it stays small as history grows.
+        db.Index(
+            "ix_nudge_logs_pending",
+            "user_id", "nudge_id", "timestamp",
+            sqlite_where=text("reward IS NULL"),
+            postgresql_where=text("reward IS NULL"),
+        ),
+        # Campaign scheduler rebuilds look up each user's latest campaign send
+        db.Index("ix_nudge_logs_goal_time", "goal", "timestamp"),
+    )
+
+    @property
+    def context(self):
+        """Logged context as a float32 array (zero-copy view over the blob), or None."""
+        if self.context_blob is not None:
+            return unpack_context(self.context_blob)
+        if self.context_vector is not None:
+            return np.asarray(self.context_vector, dtype=np.float32)
+        return None
+
+    @context.setter
+    def context(self, vector):
+        self.context_blob = pack_context(vector)
+        self.context_version = FEATURE_VERSION
+
+    @property
+    def context_is_current(self):
+        """True if the logged context matches the current feature layout (legacy JSON rows are version 1)."""
+        return (1 if self.context_version is None else self.context_version) == FEATURE_VERSION
+
     def __repr__(self):
         return f"<NudgeLog user_id={self.user_id} timestamp={self.timestamp}>"
+
+# ───── Sensor Aggregates Table ─────
+class SensorAggregate(db.Model):
+    """
+    Last flushed rolling sensor aggregates per user (app/utils/sensor_stream.py).
+    Column names match the fields encode_sensor_data reads; NULL → unknown.
+    """
+    __tablename__ = "sensor_aggregates"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    steps_today = db.Column(db.Integer, nullable=True)
+    steps_last_hour = db.Column(db.Integer, nullable=True)
+    sedentary_minutes = db.Column(db.Integer, nullable=True)
+    heart_rate = db.Column(db.Float, nullable=True)
+    resting_hr = db.Column(db.Float, nullable=True)
+    max_hr = db.Column(db.Float, nullable=True)
+    total_sleep_minutes = db.Column(db.Integer, nullable=True)
+    sleep_efficiency = db.Column(db.Float, nullable=True)
+    steps_through = db.Column(db.Float, nullable=True)  # newest step sample (epoch s) counted into steps_today
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<SensorAggregate user_id={self.user_id} updated_at={self.updated_at}>"
+
+# ───── Check-In Tables ─────
+class CheckIn(db.Model):
+    """One daily self-report; every field is a 1–5 rating (encode_checkin.CHECKIN_FIELDS)."""
+    __tablename__ = "checkins"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    mood = db.Column(db.SmallInteger, nullable=False)
+    stress_level = db.Column(db.SmallInteger, nullable=False)
+    hunger = db.Column(db.SmallInteger, nullable=False)
+    cravings = db.Column(db.SmallInteger, nullable=False)
+    energy_level = db.Column(db.SmallInteger, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_checkins_user_created", "user_id", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<CheckIn user_id={self.user_id} created_at={self.created_at}>"
+
+
+class CheckInState(db.Model):
+    """
+    Latest check-in per user plus its exponentially-decayed running trend,
+    updated in the same transaction as each CheckIn insert (app/utils/checkins.py)
+    so readers never scan the history.
+    """
+    __tablename__ = "checkin_state"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    mood = db.Column(db.SmallInteger, nullable=False)
+    stress_level = db.Column(db.SmallInteger, nullable=False)
+    hunger = db.Column(db.SmallInteger, nullable=False)
+    cravings = db.Column(db.SmallInteger, nullable=False)
+    energy_level = db.Column(db.SmallInteger, nullable=False)
+    trend = db.Column(db.LargeBinary, nullable=False)  # packed float64 (checkins.TREND_SIZE)
+    checkin_count = db.Column(db.Integer, nullable=False, default=0)
+    last_checkin_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<CheckInState user_id={self.user_id} checkins={self.checkin_count}>"
+
+
+# ───── Engine Profile ─────
+# SQLite (default): WAL so readers never block the writer, NORMAL sync (durable
+# across app crashes; an OS crash can lose the last commits, never corrupt),
+# a busy timeout instead of immediate "database is locked", and mmap'd reads.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("KEYRD_SQLITE_BUSY_TIMEOUT", "30000")),
+    "mmap_size": int(os.getenv("KEYRD_SQLITE_MMAP", str(256 * 1024 * 1024))),
+    "cache_size": -64000,  # KiB → 64 MB page cache per connection
+    "temp_store": "MEMORY",
+}
+
+# Pool sized for gunicorn threads + job workers in one process
+DB_POOL_SIZE = int(os.getenv("KEYRD_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("KEYRD_DB_MAX_OVERFLOW", "20"))
+
+
+def engine_options(uri: str) -> dict:
+    """
+    create_engine() keyword arguments for uri (SQLALCHEMY_ENGINE_OPTIONS).
+
+    Args:
+        uri (str): SQLAlchemy database URL.
+
+    Returns:
+        dict: Engine options for the URL's backend.
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return {}  # single-connection in-memory DB: pooling/WAL don't apply
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": 30,
+            "connect_args": {
+                "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+                "check_same_thread": False,  # pooled connections move between threads
+                "cached_statements": 256,    # per-connection prepared statement cache
+            },
+        }
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,   # drop connections the server closed while idle
+        "pool_recycle": 1800,
+    }
+
+
+def tune_engine(engine):
+    """Apply SQLITE_PRAGMAS to every new connection of a file-backed SQLite engine (no-op otherwise)."""
+    if engine.dialect.name != "sqlite" or engine.url.database in (None, "", ":memory:"):
+        return
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def init_db(app):
+    """db.init_app with the engine profile for the app's DATABASE_URI."""
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(uri))
+    db.init_app(app)
+    with app.app_context():
+        tune_engine(db.engine)
+
+
+# ───── Additive Schema Upgrades ─────
+def add_missing_columns():
+    """
+    db.create_all() only creates missing tables. Add any nullable columns that
+    were introduced after a table was first created (existing SQLite dev DBs).
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=db.engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+                print(f"[models.py] Added column {table.name}.{column.name}")
+
+
+def add_missing_indexes():
+    """db.create_all() skips indexes on tables that already exist; create any that are missing."""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in present:
+                index.create(db.engine)
+                print(f"[models.py] Created index {index.name} on {table.name}")
@@ -10,9 +10,15 @@ def register_blueprints(app):
     from .push import push_bp
     from .device_token import device_token_bp
     from .test_push import test_push_bp
+    from .jobs import jobs_bp
+    from .sensor import sensor_bp
+    from .checkin import checkin_bp
 
     app.register_blueprint(onboarding_bp)
     app.register_blueprint(feedback_bp)
     app.register_blueprint(push_bp)
     app.register_blueprint(device_token_bp)
     app.register_blueprint(test_push_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(sensor_bp)
+    app.register_blueprint(checkin_bp)
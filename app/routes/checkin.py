@@ -0,0 +1,59 @@
+# app/routes/checkin.py
+
+import time
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+
+from app.models import db, User
+from app.utils.checkins import TREND_FIELDS, record_checkin, trend_columns
+from app.utils.context_vector import checkin_trend_cache
+from app.utils.encoders.encode_checkin import CHECKIN_FIELDS
+from app.utils.group_commit import group_commit
+
+checkin_bp = Blueprint("checkin", __name__)
+
+
+@checkin_bp.route("/checkin", methods=["POST"])
+def checkin():
+    """
+    Stores a daily check-in and folds it into the user's decayed trend
+    (checkin_state) in the same group-committed transaction; later pushes read
+    the trend from cache or one checkin_state row, never the history.
+
+    Expected JSON:
+    {
+        "email": "user@example.com",
+        "mood": 4,
+        "stress_level": 2,
+        "hunger": 3,
+        "cravings": 2,
+        "energy_level": 4
+    }
+    """
+    try:
+        data = request.get_json(force=True)
+        email = data.get("email")
+        values = [data.get(field) for field in CHECKIN_FIELDS]
+
+        valid = all(type(v) is int and 1 <= v <= 5 for v in values)
+        if not email or not valid:
+            return jsonify({"error": f"Missing or invalid fields: email, {', '.join(CHECKIN_FIELDS)} (int 1–5)"}), 400
+
+        user_id = db.session.query(User.id).filter_by(email=email).scalar()
+        if user_id is None:
+            return jsonify({"error": "User not found"}), 404
+
+        # 🧮 Check-in + trend update in the next group commit; wait until durable
+        trend, count = group_commit.write(record_checkin, user_id, values, datetime.utcnow())
+        checkin_trend_cache.put(user_id, trend)
+
+        features = trend_columns([trend], time.time())
+        return jsonify({
+            "user_id": user_id,
+            "checkins": count,
+            **{name: round(float(features[name][0]), 4) for name in TREND_FIELDS},
+        }), 201
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -2,6 +2,7 @@
 
 from flask import Blueprint, request, jsonify
 from ..models import db, User
+from ..utils.push_receipts import receipt_tracker
 
 device_token_bp = Blueprint("device_token", __name__)
 
@@ -30,7 +31,9 @@ def register_token():
             return jsonify({"error": "User not found"}), 404
 
         user.device_token = token
+        user.device_token_invalid_at = None
         db.session.commit()
+        receipt_tracker.revive(token)
 
         return jsonify({"status": "Device token registered", "email": email})
 
@@ -1,9 +1,13 @@
 # app/routes/feedback.py
 
+from collections import defaultdict
+
+import numpy as np
 from flask import Blueprint, request, jsonify
 
 from app.models import db, User, NudgeLog
-from app.state import agent
+from app.state import apply_reward, apply_rewards
+from app.utils.context_codec import unpack_contexts
 
 feedback_bp = Blueprint("feedback", __name__)
 
@@ -48,10 +52,110 @@ def feedback():
         log.reward = reward
         db.session.commit()
 
-        # Update RL model
-        agent.update(arm, log.context_vector, reward)
+        # Update RL model (journaled, then applied as update(arm, reward, context));
+        # contexts logged under an older feature layout don't fit the current model
+        context = log.context
+        if context is not None and log.context_is_current:
+            apply_reward(arm, reward, context)
 
         return jsonify({"status": "agent updated", "nudge_id": arm, "reward": reward})
 
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+@feedback_bp.route("/feedback/batch", methods=["POST"])
+def feedback_batch():
+    """
+    Logs a burst of rewards (e.g. uploaded by a client coming back online).
+    Pending logs are matched in one query, written in one transaction, and
+    the agent receives one summed update per arm. Items whose log has no
+    context under the current feature layout get status "stored_only": the
+    reward is saved but the agent isn't updated.
+
+    Expected JSON:
+    {
+        "feedback": [
+            {"email": "user@example.com", "nudge_id": 2, "reward": 1.0},
+            ...
+        ]
+    }
+    """
+    try:
+        data = request.get_json(force=True)
+        items = data.get("feedback")
+
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "'feedback' must be a non-empty list"}), 400
+
+        for item in items:
+            if not (
+                isinstance(item, dict)
+                and item.get("email")
+                and isinstance(item.get("nudge_id"), int)
+                and isinstance(item.get("reward"), (int, float))
+            ):
+                return jsonify({"error": "Each feedback item needs email, nudge_id (int), reward (float)"}), 400
+
+        emails = {item["email"] for item in items}
+        user_ids = dict(
+            db.session.query(User.email, User.id).filter(User.email.in_(emails)).all()
+        )
+
+        # All candidate pending logs in one query, newest first per (user, nudge)
+        pending = defaultdict(list)
+        if user_ids:
+            logs = (
+                NudgeLog.query.filter(
+                    NudgeLog.user_id.in_(user_ids.values()),
+                    NudgeLog.nudge_id.in_({item["nudge_id"] for item in items}),
+                    NudgeLog.reward.is_(None),
+                )
+                .order_by(NudgeLog.timestamp.desc())
+                .all()
+            )
+            for log in logs:
+                pending[(log.user_id, log.nudge_id)].append(log)
+
+        results = []
+        arms, rewards, applied = [], [], []
+        for item in items:
+            user_id = user_ids.get(item["email"])
+            queue = pending.get((user_id, item["nudge_id"]))
+            if user_id is None:
+                results.append({"email": item["email"], "nudge_id": item["nudge_id"], "status": "user not found"})
+                continue
+            if not queue:
+                results.append({"email": item["email"], "nudge_id": item["nudge_id"], "status": "no pending log"})
+                continue
+
+            log = queue.pop(0)
+            log.reward = item["reward"]
+            # Contexts logged under an older feature layout (or not at all) don't fit
+            # the current model: the reward is stored but the agent isn't updated
+            if (log.context_blob is None and log.context_vector is None) or not log.context_is_current:
+                results.append({"email": item["email"], "nudge_id": item["nudge_id"], "status": "stored_only"})
+                continue
+            results.append({"email": item["email"], "nudge_id": item["nudge_id"], "status": "applied"})
+            arms.append(log.nudge_id)
+            rewards.append(item["reward"])
+            applied.append(log)
+
+        # Read contexts before the commit expires the logs (one reload per row otherwise)
+        if arms:
+            if all(log.context_blob is not None for log in applied):
+                contexts = unpack_contexts(log.context_blob for log in applied)
+            else:
+                contexts = np.stack([log.context for log in applied])
+
+        db.session.commit()
+
+        # Update RL model once per arm
+        if arms:
+            apply_rewards(arms, rewards, contexts)
+
+        return jsonify({"status": "agent updated", "applied": len(arms), "results": results})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
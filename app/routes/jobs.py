@@ -0,0 +1,38 @@
+# app/routes/jobs.py
+
+from flask import Blueprint, request, jsonify
+from app.utils.job_queue import job_queue
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+# ───── Helper: Enqueue + 202 ─────
+def enqueue_job(kind, payload, **extra):
+    """
+    Persist a job and build the 202 response. A client-supplied Idempotency-Key
+    header makes retried requests return the original job instead of a new one.
+    """
+    job_id, created = job_queue.enqueue(kind, payload, idempotency_key=request.headers.get("Idempotency-Key"))
+    return jsonify({
+        **extra,
+        "job_id": job_id,
+        "status": "queued" if created else "duplicate",
+        "status_url": f"/jobs/{job_id}",
+    }), 202
+
+
+# ───── Route: Job Status ─────
+@jobs_bp.route("/jobs/<int:job_id>", methods=["GET"])
+def job_status(job_id):
+    """Status of a queued job (queued, running, done, or dead)."""
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(status), 200
+
+
+# ───── Route: Queue Depth (Debug Only) ─────
+@jobs_bp.route("/jobs", methods=["GET"])
+def job_counts():
+    """Job counts per status, including dead letters."""
+    return jsonify(job_queue.counts()), 200
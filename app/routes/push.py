@@ -1,11 +1,11 @@
 # keyrd_mvp/app/routes/push.py
 
 from flask import Blueprint, request, jsonify
-from app.models import db, User, NudgeLog
-from app.utils.context_vector import build_context_vector
+from app.models import db, User
+from app.routes.jobs import enqueue_job
+from app.utils.job_handlers import PUSH_BATCH, PUSH_NUDGE
 from app.utils.push import send_push_notification
-from app.state import agent as linucb, save_agent
-import numpy as np
+from app.utils.push_receipts import receipt_tracker
 
 push_bp = Blueprint("push", __name__)
 
@@ -19,43 +19,44 @@ def parse_json(force=True):
 # ───── Route: Send Personalized Nudge ─────
 @push_bp.route("/push", methods=["POST"])
 def push():
-    """Select and send a personalized nudge to the user via push notification."""
+    """
+    Queue selection, delivery and logging of a personalized nudge for a user.
+    Returns 202 with a job id; the work runs on the job worker pool.
+    """
     try:
         data = parse_json()
         user_id = data.get("user_id")
-        if not user_id:
+        if not isinstance(user_id, int):
             return jsonify({"error": "Missing 'user_id' in request body"}), 400
-
-        user = User.query.get(user_id)
-        if not user:
+        if db.session.get(User, user_id) is None:
             return jsonify({"error": f"User with id {user_id} not found"}), 404
 
-        context = build_context_vector(user.id)
-        nudge_id = linucb.select_action(context)
-
-        title = "Today’s Nudge"
-        body = f"Try Nudge #{nudge_id + 1} today!"
+        return enqueue_job(PUSH_NUDGE, {"user_id": user_id}, user_id=user_id)
 
-        status_code, push_response = send_push_notification(
-            user.device_token, title, body
-        )
-
-        db.session.add(NudgeLog(
-            user_id=user.id,
-            nudge_id=nudge_id,
-            context_vector=context.tolist()
-        ))
-        db.session.commit()
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
-        save_agent()
+# ───── Route: Batch Nudge Selection ─────
+@push_bp.route("/push/batch", methods=["POST"])
+def push_batch():
+    """
+    Queue nudges for many users as one job (one vectorized agent pass, one
+    logging transaction, batched pushes). Returns 202 with a job id.
+
+    Expected JSON:
+    {
+        "user_ids": [1, 2, 3]
+    }
+    """
+    try:
+        data = parse_json()
+        user_ids = data.get("user_ids")
+        if not isinstance(user_ids, list) or not user_ids or not all(isinstance(u, int) for u in user_ids):
+            return jsonify({"error": "'user_ids' must be a non-empty list of ints"}), 400
 
-        return jsonify({
-            "user_id": user.id,
-            "nudge_id": nudge_id,
-            "message": body,
-            "push_status": status_code,
-            "push_response": push_response
-        }), 200
+        return enqueue_job(PUSH_BATCH, {"user_ids": user_ids}, users=len(user_ids))
 
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 400
@@ -79,7 +80,9 @@ def register_push_token():
             return jsonify({"error": f"User {user_id} not found"}), 404
 
         user.device_token = device_token
+        user.device_token_invalid_at = None
         db.session.commit()
+        receipt_tracker.revive(device_token)
 
         return jsonify({"message": "Device token registered successfully"}), 200
 
@@ -120,6 +123,12 @@ def test_push():
     except Exception as e:
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
+# ───── Route: Push Delivery Metrics ─────
+@push_bp.route("/push/metrics", methods=["GET"])
+def push_metrics():
+    """Ticket/receipt counters and sends skipped for invalid tokens (this worker)."""
+    return jsonify(receipt_tracker.metrics()), 200
+
 # ───── Route: List All Users (Debug Only) ─────
 @push_bp.route("/users", methods=["GET"])
 def list_users():
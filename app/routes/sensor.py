@@ -0,0 +1,62 @@
+# app/routes/sensor.py
+
+from flask import Blueprint, request, jsonify
+
+from app.models import db, User
+from app.utils.sensor_stream import sensor_aggregator
+
+sensor_bp = Blueprint("sensor", __name__)
+
+# Upload batches larger than this are refused (the app should split them)
+MAX_SAMPLES_PER_BATCH = 5000
+MAX_UTC_OFFSET_MINUTES = 14 * 60
+
+
+# ───── Route: Sample Upload ─────
+@sensor_bp.route("/sensor/samples", methods=["POST"])
+def ingest_samples():
+    """
+    Accepts a batch of raw wearable/phone samples and folds them into the
+    user's rolling aggregates in memory (flushed to sensor_aggregates in the
+    background). Malformed or out-of-range samples are counted, not stored.
+
+    Expected JSON:
+    {
+        "user_id": 12,
+        "utc_offset_minutes": -300,
+        "samples": [
+            {"type": "steps", "ts": 1718000000, "value": 84},
+            {"type": "heart_rate", "ts": 1718000030, "value": 72},
+            {"type": "sleep", "ts": 1717990000, "value": 412, "efficiency": 91}
+        ]
+    }
+    """
+    try:
+        data = request.get_json(force=True)
+        user_id = data.get("user_id")
+        samples = data.get("samples")
+        utc_offset = data.get("utc_offset_minutes", 0)
+
+        if not isinstance(user_id, int) or not isinstance(samples, list):
+            return jsonify({"error": "Missing or invalid fields: user_id (int), samples (list)"}), 400
+        if not isinstance(utc_offset, int) or abs(utc_offset) > MAX_UTC_OFFSET_MINUTES:
+            return jsonify({"error": "utc_offset_minutes must be an int within ±840"}), 400
+        if len(samples) > MAX_SAMPLES_PER_BATCH:
+            return jsonify({"error": f"At most {MAX_SAMPLES_PER_BATCH} samples per batch"}), 413
+
+        # 👤 Users with live state are known; otherwise one primary-key lookup
+        if not sensor_aggregator.has_user(user_id) and db.session.get(User, user_id) is None:
+            return jsonify({"error": "User not found"}), 404
+
+        accepted, rejected = sensor_aggregator.ingest(user_id, samples, utc_offset)
+        return jsonify({"user_id": user_id, "accepted": accepted, "rejected": rejected}), 202
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+# ───── Route: Current Aggregates (Debug Only) ─────
+@sensor_bp.route("/sensor/aggregates/<int:user_id>", methods=["GET"])
+def current_aggregates(user_id):
+    """The user's current rolling aggregates (null → unknown)."""
+    return jsonify({"user_id": user_id, **sensor_aggregator.current(user_id)}), 200
@@ -1,19 +1,175 @@
 # app/state.py
 
+import os
+
 from app.agents.bandit_linucb import LinUCB
+from app.agents.threadsafe_linucb import ThreadSafeLinUCB
+from app.agents.linucb_persistence import (
+    DEFAULT_MODEL_PATH,
+    SnapshotWriter,
+    extend_linucb_state,
+    load_linucb_model,
+    retired_model_path,
+    stored_context_dim,
+)
+from app.agents.linucb_snapshot import is_snapshot, read_snapshot, write_snapshot
+from app.agents.reward_journal import RewardJournal
+from app.utils.context_codec import FEATURE_DIMS, FEATURE_VERSION
 
 # Configuration constants
 NUM_NUDGES = 5
-CONTEXT_DIM = 26
+CONTEXT_DIM = FEATURE_DIMS[FEATURE_VERSION]
 ALPHA = 0.1
 
-# Always create a fresh LinUCB agent — no loading
-agent = LinUCB(num_arms=NUM_NUDGES, context_dim=CONTEXT_DIM, alpha=ALPHA)
+# "local" → per-process agent; "shared" → one mmap'd model shared by all workers on the host
+AGENT_BACKEND = os.getenv("KEYRD_AGENT_BACKEND", "local")
+
+# Binary model snapshot, rewritten in the background every SNAPSHOT_EVERY updates
+MODEL_PATH = os.getenv("KEYRD_MODEL_PATH", DEFAULT_MODEL_PATH)
+SNAPSHOT_EVERY = int(os.getenv("KEYRD_SNAPSHOT_EVERY", "100"))
+# ...and at least this often (seconds) while the journal holds other workers' rewards
+SNAPSHOT_INTERVAL = float(os.getenv("KEYRD_SNAPSHOT_INTERVAL", "60"))
+
+# Write-ahead reward journal, replayed over the snapshot at startup. Every worker
+# appends to its own segment; the worker owning the directory compacts them all.
+JOURNAL_DIR = os.getenv("KEYRD_JOURNAL_DIR", os.path.join(os.path.dirname(MODEL_PATH), "journal"))
+JOURNAL_ENABLED = os.getenv("KEYRD_JOURNAL", "1") == "1"
+
+# Shared across request threads, so all access goes through a thread-safe wrapper
+if AGENT_BACKEND == "shared":
+    from app.agents.shared_linucb import SharedLinUCB
+    agent = SharedLinUCB(num_arms=NUM_NUDGES, context_dim=CONTEXT_DIM, alpha=ALPHA)
+else:
+    agent = ThreadSafeLinUCB(LinUCB(num_arms=NUM_NUDGES, context_dim=CONTEXT_DIM, alpha=ALPHA))
+
+journal = RewardJournal(JOURNAL_DIR, CONTEXT_DIM, shared_agent=AGENT_BACKEND == "shared") if JOURNAL_ENABLED else None
+snapshot_writer = SnapshotWriter(agent, MODEL_PATH, every=SNAPSHOT_EVERY, journal=journal, interval=SNAPSHOT_INTERVAL)
 
 def load_agent():
-    """No-op: we’re starting fresh each time."""
-    print("[state.py] Skipping model load — using clean agent.")
+    """
+    Restore the agent from the latest snapshot (memmapped, no unpickling) and start the writer.
+    A snapshot saved under an older feature layout (smaller context_dim) is
+    warm-started into the current one (see _warm_start) rather than discarded.
+
+    With the journal on, every worker journals its rewards durably into its
+    own segment. Exactly one process (the first to lock JOURNAL_DIR) also
+    compacts every worker's segments into snapshots; the others replay the
+    journal to start warm and never write snapshots.
+    """
+    owner = journal.lock() if journal is not None else True
+    stored_dim = stored_context_dim(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
+    generation = 0
+    if AGENT_BACKEND == "shared" and not agent.fresh:
+        # Another worker already restored (and has been updating) the shared segment,
+        # journaled records included
+        print("[state.py] Attached to live shared agent — skipping snapshot load.")
+        if journal is not None:
+            if stored_dim == CONTEXT_DIM and is_snapshot(MODEL_PATH):
+                journal.floor = read_snapshot(MODEL_PATH)["journal_generation"]
+            if owner:
+                snapshot_writer.start()
+            return
+    elif stored_dim == CONTEXT_DIM:
+        load_linucb_model(agent, MODEL_PATH)
+        if is_snapshot(MODEL_PATH):
+            generation = read_snapshot(MODEL_PATH)["journal_generation"]
+    elif stored_dim is not None and stored_dim < CONTEXT_DIM:
+        generation = _warm_start(stored_dim, owner)
+    elif stored_dim is not None:
+        print(f"[state.py] Snapshot {MODEL_PATH} has context_dim {stored_dim} > {CONTEXT_DIM} "
+              f"(newer than FEATURE_VERSION {FEATURE_VERSION}) — starting with a clean agent.")
+        if owner:
+            _retire_snapshot(stored_dim)
+    elif os.path.exists(MODEL_PATH):
+        print(f"[state.py] Snapshot {MODEL_PATH} is unreadable — starting with a clean agent.")
+    else:
+        print("[state.py] No model snapshot found — starting with a clean agent.")
+
+    if journal is not None:
+        replayed = journal.replay(agent, from_generation=generation)
+        if not owner:
+            print(f"[state.py] Reward journal {JOURNAL_DIR} is compacted by another process — "
+                  "this worker journals its rewards but writes no snapshots.")
+            return
+        if replayed:
+            journal.compact(agent, MODEL_PATH)
+
+    snapshot_writer.start()
+
+def _feature_version(context_dim):
+    """FEATURE_VERSION whose layout has context_dim features (the dim itself if none does)."""
+    return next((version for version, dim in FEATURE_DIMS.items() if dim == context_dim), context_dim)
+
+def _retire_snapshot(stored_dim, state=None):
+    """
+    Keep the snapshot of another layout as linucb_model.v<N>.bin. With
+    `state`, that state (the old model plus its folded journal) is written
+    there and MODEL_PATH is left for the caller to replace atomically, so
+    there is never a moment without a snapshot on disk.
+    """
+    retired = retired_model_path(MODEL_PATH, _feature_version(stored_dim))
+    if state is None:
+        os.replace(MODEL_PATH, retired)
+    else:
+        write_snapshot(retired, state)
+    print(f"[state.py] Kept the context_dim {stored_dim} snapshot as {retired}")
+
+def _warm_start(stored_dim, owner):
+    """
+    Start from a snapshot of an older feature layout, whose features are a
+    prefix of the current ones: the old model, plus any journal generations
+    of that layout not yet folded into it, is embedded with
+    extend_linucb_state (old scores unchanged, new features at the prior).
+    The owner keeps the old model as linucb_model.v<N>.bin and writes the
+    warm model as the current snapshot; other workers only warm their agent.
+
+    Returns:
+        int: Journal generation to replay the current layout's records from.
+    """
+    staged = LinUCB(num_arms=NUM_NUDGES, context_dim=stored_dim, alpha=ALPHA)
+    staged.load(MODEL_PATH)
+    generation = read_snapshot(MODEL_PATH)["journal_generation"] if is_snapshot(MODEL_PATH) else 0
+
+    old_state = staged.export_state()
+    if JOURNAL_ENABLED:
+        old_journal = RewardJournal(JOURNAL_DIR, stored_dim)
+        old_journal.replay(staged, from_generation=generation)
+        old_state = staged.export_state()
+        # Folded: a rollback to the old layout must not replay them again
+        old_state["journal_generation"] = max(old_journal.generations(), default=-1) + 1
+
+    state = extend_linucb_state(old_state, CONTEXT_DIM)
+    agent.load_state(state)
+    print(f"[state.py] Warm-started the FEATURE_VERSION {FEATURE_VERSION} agent from {MODEL_PATH} "
+          f"(context_dim {stored_dim} → {CONTEXT_DIM}, {state['update_count']} updates).")
+
+    if owner:
+        _retire_snapshot(stored_dim, old_state)
+        # Older-layout generations are skipped by replay; the current layout's replay from `generation`
+        state["journal_generation"] = generation
+        write_snapshot(MODEL_PATH, state)
+    return generation
 
 def save_agent():
-    """Optional: Save manually later if desired."""
-    print("[state.py] Skipping model save — clean session only.")
+    """Request a background snapshot; returns immediately."""
+    snapshot_writer.request()
+
+def record_updates(n_updates=1):
+    """Call after applying agent updates; triggers a snapshot every SNAPSHOT_EVERY updates."""
+    snapshot_writer.notify(n_updates)
+
+def apply_reward(arm, reward, context_vector):
+    """Journal (if enabled) and apply one reward; returns once it is durable."""
+    if journal is not None:
+        journal.apply(agent, arm, reward, context_vector)
+    else:
+        agent.update(arm, reward, context_vector)
+    record_updates(1)
+
+def apply_rewards(arms, rewards, contexts):
+    """Journal (if enabled) and apply a batch of rewards as one mini-batch update."""
+    if journal is not None:
+        journal.apply_batch(agent, arms, rewards, contexts)
+    else:
+        agent.update_batch(arms, rewards, contexts)
+    record_updates(len(arms))
@@ -0,0 +1,355 @@
+# app/utils/campaign_scheduler.py
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+from sqlalchemy import String, cast, func, insert, select
+
+from app.models import db, User, NudgeLog
+from app.utils.context_codec import CONTEXT_DTYPE, FEATURE_VERSION
+from app.utils.context_matrix import IN_CLAUSE_CHUNK, build_context_matrix
+from app.utils.context_vector import dynamic_feature_matrix
+
+MINUTES_PER_DAY = 1440
+
+# Minutes after local wake time to send; users without a wake time count as 07:00
+WAKE_OFFSET = int(os.getenv("KEYRD_CAMPAIGN_WAKE_OFFSET", "30"))
+DEFAULT_WAKE_MINUTE = 7 * 60
+
+# Timezone for users who never sent one (everyone onboarded before the column
+# existed). Unset → those users get no campaign rather than a 07:30 UTC push.
+DEFAULT_TIMEZONE = os.getenv("KEYRD_DEFAULT_TZ") or None
+
+# NudgeLog.goal of campaign sends, so restarts can find the last one per user
+CAMPAIGN_GOAL = "daily_campaign"
+
+# A user gets at most one campaign nudge per this many minutes (guards against
+# slot moves on rebuild/DST re-sending on the same day)
+MIN_GAP_MINUTES = 20 * 60
+
+
+class TimingWheel:
+    """
+    One slot per UTC minute of the day, each holding the user ids due then.
+    A user's send minute repeats daily, so the wheel never needs re-keying
+    except when wake time or UTC offset changes (handled by rebuilds).
+    """
+
+    def __init__(self, slots: int = MINUTES_PER_DAY):
+        self.slots = [set() for _ in range(slots)]
+        self.slot_of = {}
+
+    @classmethod
+    def from_arrays(cls, user_ids, slots):
+        wheel = cls()
+        order = np.argsort(slots, kind="stable")
+        bounds = np.searchsorted(slots[order], np.arange(MINUTES_PER_DAY + 1))
+        ids = user_ids[order].tolist()
+        for slot in range(MINUTES_PER_DAY):
+            members = ids[bounds[slot]:bounds[slot + 1]]
+            if members:
+                wheel.slots[slot] = set(members)
+        wheel.slot_of = dict(zip(user_ids.tolist(), slots.tolist()))
+        return wheel
+
+    def add(self, user_id, slot):
+        self.remove(user_id)
+        self.slots[slot].add(user_id)
+        self.slot_of[user_id] = slot
+
+    def remove(self, user_id):
+        slot = self.slot_of.pop(user_id, None)
+        if slot is not None:
+            self.slots[slot].discard(user_id)
+
+    def due(self, slot):
+        return list(self.slots[slot])
+
+    def __len__(self):
+        return len(self.slot_of)
+
+
+def _utc_offset_minutes(name, at):
+    try:
+        zone = ZoneInfo(name) if name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = timezone.utc
+    return int(at.astimezone(zone).utcoffset().total_seconds() // 60)
+
+
+def _parse_time_us(values):
+    """
+    Vectorized 'HH:MM[:SS[.ffffff]]' → microseconds since midnight.
+    Non-string values (datetime.time from non-SQLite drivers) fall back per row.
+    """
+    n = len(values)
+    strings = [v if isinstance(v, str) and v.isascii() else "" for v in values]
+    raw = np.array(strings, dtype="S15")
+    b = raw.view(np.uint8).reshape(n, 15).astype(np.int64)
+    lengths = np.char.str_len(raw)
+    d = b - ord("0")
+
+    def digits(*positions):
+        ok = np.ones(n, dtype=bool)
+        value = np.zeros(n, dtype=np.int64)
+        for p in positions:
+            ok &= (d[:, p] >= 0) & (d[:, p] <= 9)
+            value = value * 10 + d[:, p]
+        return value, ok
+
+    hh, ok_h = digits(0, 1)
+    mm, ok_m = digits(3, 4)
+    ss, ok_s = digits(6, 7)
+    frac, ok_f = digits(9, 10, 11, 12, 13, 14)
+
+    has_secs = (lengths >= 8) & (b[:, 5] == ord(":"))
+    has_frac = (lengths == 15) & (b[:, 8] == ord("."))
+    ok = (
+        ok_h & ok_m & (b[:, 2] == ord(":")) & (hh < 24) & (mm < 60)
+        & ((lengths == 5) | (has_secs & ok_s & (ss < 60) & ((lengths == 8) | (has_frac & ok_f))))
+    )
+    us = ((hh * 60 + mm) * 60 + np.where(has_secs, ss, 0)) * 1_000_000 + np.where(has_frac, frac, 0)
+
+    for i in np.nonzero(~ok)[0]:
+        v = values[i]
+        if v is not None and hasattr(v, "hour"):
+            us[i] = ((v.hour * 60 + v.minute) * 60 + v.second) * 1_000_000 + v.microsecond
+            ok[i] = True
+    return us, ok
+
+
+def send_slots(wake_times, timezones, at=None, wake_offset: int = WAKE_OFFSET):
+    """
+    Vectorized UTC minute-of-day to send to each user: local wake time plus
+    wake_offset, shifted by the timezone's UTC offset at `at`.
+
+    Args:
+        wake_times (sequence): 'HH:MM[:SS]' strings / datetime.time / None.
+        timezones (sequence): IANA names or None (UTC).
+        at (datetime | None): Instant whose offsets apply (default: now).
+
+    Returns:
+        np.ndarray: int64 slots in [0, 1440).
+    """
+    at = at or datetime.now(timezone.utc)
+    us, ok = _parse_time_us(list(wake_times))
+    local = np.where(ok, us // 60_000_000, DEFAULT_WAKE_MINUTE) + wake_offset
+
+    names = np.array(["" if tz is None else tz for tz in timezones], dtype=object)
+    uniques, inverse = np.unique(names, return_inverse=True)
+    offsets = np.array([_utc_offset_minutes(name, at) for name in uniques.tolist()], dtype=np.int64)
+    return (local - offsets[inverse.reshape(-1)]) % MINUTES_PER_DAY
+
+
+class CampaignScheduler:
+    """
+    Sends each user one nudge a day at their local wake time (+ WAKE_OFFSET).
+
+    Users with a live device token are indexed in a TimingWheel by UTC send
+    minute. A background thread drains each minute's slot as it comes due:
+    contexts via build_context_matrix (one column query per chunk), arms via
+    the agent's batched select_actions, one bulk NudgeLog insert, and pushes
+    queued on the batched dispatcher. The wheel is rebuilt from one column
+    scan every `rebuild_every` seconds, which picks up new users, changed
+    wake times and DST shifts.
+
+    Run it in exactly one process (KEYRD_SCHEDULER=1), not in every web worker.
+
+    Args:
+        app: Flask app (for DB access from the scheduler thread).
+        dispatcher (PushDispatcher): Where pushes are queued.
+        agent: Agent exposing select_actions (default: app.state.agent).
+        batch_size (int): Users encoded/selected per pass when draining a slot.
+        rebuild_every (float): Seconds between wheel rebuilds.
+        tick (float): Seconds between checks for due slots.
+    """
+
+    def __init__(self, app, dispatcher, agent=None, batch_size: int = 5000,
+                 rebuild_every: float = 3600.0, tick: float = 1.0, wake_offset: int = WAKE_OFFSET):
+        self.app = app
+        self.dispatcher = dispatcher
+        self.agent = agent
+        self.batch_size = batch_size
+        self.rebuild_every = rebuild_every
+        self.tick = tick
+        self.wake_offset = wake_offset
+
+        self.wheel = TimingWheel()
+        self._last_sent = {}   # user_id → absolute UTC minute of last campaign send
+        self._cursor = None    # next absolute UTC minute to drain
+        self._next_rebuild = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"sent": 0, "skipped_recent": 0, "slots_drained": 0, "last_rebuild_users": 0}
+
+    # ───── Lifecycle ─────
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="campaign-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"[CampaignScheduler Error] {e}")
+
+    # ───── Index ─────
+    def rebuild(self, at=None):
+        """
+        Re-index every pushable user from one column scan, and reload who got
+        a campaign nudge within MIN_GAP_MINUTES (so a restart doesn't resend
+        today's). Users without a timezone are skipped unless KEYRD_DEFAULT_TZ is set.
+        """
+        at = at or datetime.now(timezone.utc)
+        query = (
+            select(User.id, cast(User.wake_time, String), User.timezone)
+            .where(User.device_token.is_not(None))
+            .where(User.device_token_invalid_at.is_(None))
+        )
+        if DEFAULT_TIMEZONE is None:
+            query = query.where(User.timezone.is_not(None))
+        # NudgeLog.timestamp is naive UTC
+        since = at.astimezone(timezone.utc).replace(tzinfo=None) - timedelta(minutes=MIN_GAP_MINUTES)
+        with self.app.app_context():
+            rows = db.session.connection().execute(query).all()
+            recent = db.session.connection().execute(
+                select(NudgeLog.user_id, func.max(NudgeLog.timestamp))
+                .where(NudgeLog.goal == CAMPAIGN_GOAL)
+                .where(NudgeLog.timestamp >= since)
+                .group_by(NudgeLog.user_id)
+            ).all()
+        self._seed_last_sent(recent, at)
+
+        if rows:
+            ids, wake_times, zones = zip(*rows)
+            user_ids = np.array(ids, dtype=np.int64)
+            zones = [zone or DEFAULT_TIMEZONE for zone in zones]
+            slots = send_slots(wake_times, zones, at, self.wake_offset)
+        else:
+            user_ids = slots = np.empty(0, dtype=np.int64)
+
+        wheel = TimingWheel.from_arrays(user_ids, slots)
+        with self._lock:
+            self.wheel = wheel
+        self.stats["last_rebuild_users"] = len(wheel)
+        print(f"[CampaignScheduler] Indexed {len(wheel)} users")
+
+    def _seed_last_sent(self, recent, at):
+        """Merge (user_id, naive-UTC timestamp) of recent campaign logs into _last_sent, dropping expired entries."""
+        minute = int(at.timestamp() // 60)
+        last_sent = {
+            uid: sent for uid, sent in self._last_sent.items() if minute - sent < MIN_GAP_MINUTES
+        }
+        for user_id, timestamp in recent:
+            if isinstance(timestamp, str):  # SQLite returns max() of a DateTime as text
+                timestamp = datetime.fromisoformat(timestamp)
+            sent = int(timestamp.replace(tzinfo=timezone.utc).timestamp() // 60)
+            last_sent[user_id] = max(sent, last_sent.get(user_id, sent))
+        self._last_sent = last_sent
+
+    # ───── Draining ─────
+    def run_pending(self, now=None):
+        """
+        Drain every slot that has come due since the last call (catching up at
+        most one day after a stall).
+
+        Returns:
+            int: Nudges sent.
+        """
+        now = now or datetime.now(timezone.utc)
+        if time.monotonic() >= self._next_rebuild:
+            self.rebuild(now)
+            self._next_rebuild = time.monotonic() + self.rebuild_every
+
+        minute = int(now.timestamp() // 60)
+        start = minute if self._cursor is None else max(self._cursor, minute - MINUTES_PER_DAY + 1)
+        sent = 0
+        for m in range(start, minute + 1):
+            with self._lock:
+                due = self.wheel.due(m % MINUTES_PER_DAY)
+            sent += self.drain(due, m)
+            self.stats["slots_drained"] += 1
+        self._cursor = minute + 1
+        return sent
+
+    def drain(self, user_ids, minute=None):
+        """
+        Select and queue nudges for user_ids (skipping anyone nudged within
+        MIN_GAP_MINUTES).
+
+        Returns:
+            int: Nudges sent.
+        """
+        minute = int(time.time() // 60) if minute is None else minute
+        eligible = [
+            uid for uid in user_ids
+            if minute - self._last_sent.get(uid, -MIN_GAP_MINUTES) >= MIN_GAP_MINUTES
+        ]
+        self.stats["skipped_recent"] += len(user_ids) - len(eligible)
+
+        sent = 0
+        with self.app.app_context():
+            for start in range(0, len(eligible), self.batch_size):
+                sent += self._send_chunk(eligible[start:start + self.batch_size], minute)
+        self.stats["sent"] += sent
+        return sent
+
+    def _send_chunk(self, user_ids, minute):
+        ids, static = build_context_matrix(user_ids)
+        if ids.size == 0:
+            return 0
+        contexts = np.hstack([static, dynamic_feature_matrix(ids)])
+        nudge_ids = self._agent().select_actions(contexts)
+
+        tokens = {}
+        id_list = ids.tolist()
+        for start in range(0, len(id_list), IN_CLAUSE_CHUNK):
+            tokens.update(db.session.execute(
+                select(User.id, User.device_token)
+                .where(User.id.in_(id_list[start:start + IN_CLAUSE_CHUNK]))
+                .where(User.device_token.is_not(None))
+                .where(User.device_token_invalid_at.is_(None))
+            ).all())
+
+        now = datetime.utcnow()
+        message = "Try Nudge #{} today!"
+        logs = []
+        blobs = np.ascontiguousarray(contexts, dtype=CONTEXT_DTYPE)
+        for row, (user_id, nudge_id) in enumerate(zip(id_list, nudge_ids.tolist())):
+            token = tokens.get(user_id)
+            if token is None:
+                continue
+            logs.append({
+                "user_id": user_id,
+                "nudge_id": nudge_id,
+                "goal": CAMPAIGN_GOAL,
+                "message": message.format(nudge_id + 1),
+                "context_blob": blobs[row].tobytes(),
+                "context_version": FEATURE_VERSION,
+                "timestamp": now,
+            })
+            self.dispatcher.enqueue(token, "Today’s Nudge", message.format(nudge_id + 1), {"nudge_id": nudge_id})
+            self._last_sent[user_id] = minute
+        if logs:
+            db.session.execute(insert(NudgeLog), logs)
+            db.session.commit()
+        return len(logs)
+
+    def _agent(self):
+        if self.agent is None:
+            from app.state import agent
+            self.agent = agent
+        return self.agent
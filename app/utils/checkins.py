@@ -0,0 +1,154 @@
+# app/utils/checkins.py
+
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import insert, select, update
+
+from app.models import CheckIn, CheckInState
+from app.utils.encoders.encode_checkin import CHECKIN_FIELDS
+
+# ───── Decayed Check-In Trend ─────
+# Each user's check-ins are summarized by exponentially-decayed sums of the
+# normalized ratings plus the decayed check-in count, updated in O(1) per
+# check-in (no history scan). A check-in `half_life` old weighs half as much
+# as one made now.
+CHECKIN_HALF_LIFE = float(os.getenv("KEYRD_CHECKIN_HALF_LIFE_HOURS", "72")) * 3600
+
+# Pseudo-check-ins at the neutral midpoint: one real check-in moves the trend
+# halfway from 0.5, and a lapsed user drifts back towards neutral
+PRIOR_WEIGHT = 1.0
+NEUTRAL = 0.5
+
+# Stored trend: [decayed sum per field..., decayed weight, epoch seconds it is decayed to]
+NUM_FIELDS = len(CHECKIN_FIELDS)
+WEIGHT, AT = NUM_FIELDS, NUM_FIELDS + 1
+TREND_SIZE = NUM_FIELDS + 2
+
+# Features per user: decayed mean per field, then confidence (decayed weight share)
+TREND_FIELDS = [f"{field}_trend" for field in CHECKIN_FIELDS] + ["checkin_confidence"]
+
+
+def epoch_seconds(at: datetime) -> float:
+    """Epoch seconds of a naive-UTC (datetime.utcnow) timestamp."""
+    return at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def normalize_checkin(values) -> np.ndarray:
+    """1–5 ratings (CHECKIN_FIELDS order) → [0, 1], as encode_checkin does."""
+    return (np.asarray(values, dtype=np.float64) - 1) / 4.0
+
+
+def fold_checkin(trend, values, at: float) -> np.ndarray:
+    """
+    Add one check-in to a trend (None → first check-in) without touching the
+    history. A late check-in (older than the trend) is discounted by its age
+    instead of re-decaying the newer ones.
+
+    Args:
+        trend (np.ndarray | None): (TREND_SIZE,) stored trend.
+        values (sequence[int]): Ratings in CHECKIN_FIELDS order.
+        at (float): Epoch seconds of the check-in.
+
+    Returns:
+        np.ndarray: New (TREND_SIZE,) float64 trend.
+    """
+    x = normalize_checkin(values)
+    new = np.empty(TREND_SIZE)
+    if trend is None:
+        new[:NUM_FIELDS], new[WEIGHT], new[AT] = x, 1.0, at
+    elif at >= trend[AT]:
+        decay = 0.5 ** ((at - trend[AT]) / CHECKIN_HALF_LIFE)
+        new[:NUM_FIELDS] = trend[:NUM_FIELDS] * decay + x
+        new[WEIGHT], new[AT] = trend[WEIGHT] * decay + 1.0, at
+    else:
+        decay = 0.5 ** ((trend[AT] - at) / CHECKIN_HALF_LIFE)
+        new[:NUM_FIELDS] = trend[:NUM_FIELDS] + x * decay
+        new[WEIGHT], new[AT] = trend[WEIGHT] + decay, trend[AT]
+    return new
+
+
+def trend_columns(trends, now: float) -> dict:
+    """
+    Trend features for many users, decayed to `now`, as columns for the
+    dynamic context pipeline.
+
+    Args:
+        trends (sequence[np.ndarray | None]): Stored trend per user (None → no check-ins).
+        now (float): Epoch seconds.
+
+    Returns:
+        dict: TREND_FIELDS name → (n,) float64 column (users without check-ins
+        get 0.5 means and 0 confidence).
+    """
+    n = len(trends)
+    stacked = np.zeros((n, TREND_SIZE))
+    for row, trend in zip(stacked, trends):
+        if trend is not None and trend.size:
+            row[:] = trend
+        else:
+            row[AT] = now
+    decay = 0.5 ** (np.maximum(now - stacked[:, AT], 0.0) / CHECKIN_HALF_LIFE)
+    weight = stacked[:, WEIGHT] * decay
+    total = weight + PRIOR_WEIGHT
+    means = (stacked[:, :NUM_FIELDS] * decay[:, None] + PRIOR_WEIGHT * NEUTRAL) / total[:, None]
+
+    columns = {name: means[:, k] for k, name in enumerate(TREND_FIELDS[:NUM_FIELDS])}
+    columns["checkin_confidence"] = weight / total
+    return columns
+
+
+def pack_trend(trend) -> bytes:
+    return np.ascontiguousarray(trend, dtype="<f8").tobytes()
+
+
+def unpack_trend(blob) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f8").copy()
+
+
+# ───── Group-Commit Op ─────
+def record_checkin(conn, user_id: int, values, created_at: datetime):
+    """
+    Insert one check-in and fold it into the user's checkin_state row in the
+    same transaction (run through group_commit.write).
+
+    Args:
+        conn: Connection of the group transaction.
+        user_id (int): Existing user id.
+        values (sequence[int]): 1–5 ratings in CHECKIN_FIELDS order.
+        created_at (datetime): Naive UTC time of the check-in.
+
+    Returns:
+        tuple[np.ndarray, int]: (new stored trend, check-ins so far)
+    """
+    state = conn.execute(
+        select(CheckInState.trend, CheckInState.checkin_count, CheckInState.last_checkin_at)
+        .where(CheckInState.user_id == user_id)
+        .with_for_update()
+    ).first()
+
+    ratings = dict(zip(CHECKIN_FIELDS, values))
+    conn.execute(insert(CheckIn).values(user_id=user_id, created_at=created_at, **ratings))
+
+    at = epoch_seconds(created_at)
+    if state is None:
+        trend = fold_checkin(None, values, at)
+        conn.execute(insert(CheckInState).values(
+            user_id=user_id, trend=pack_trend(trend), checkin_count=1, last_checkin_at=created_at, **ratings
+        ))
+        return trend, 1
+
+    trend = fold_checkin(unpack_trend(state.trend), values, at)
+    latest = created_at >= state.last_checkin_at
+    conn.execute(
+        update(CheckInState)
+        .where(CheckInState.user_id == user_id)
+        .values(
+            trend=pack_trend(trend),
+            checkin_count=state.checkin_count + 1,
+            # Latest ratings only move forward in time
+            **({"last_checkin_at": created_at, **ratings} if latest else {}),
+        )
+    )
+    return trend, state.checkin_count + 1
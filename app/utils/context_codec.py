@@ -0,0 +1,37 @@
+# app/utils/context_codec.py
+#
+# Binary encoding for stored context vectors (users.static_context and
+# nudge_logs.context_blob): packed little-endian float32, read back with
+# np.frombuffer as a zero-copy view. Kept free of app imports so models.py
+# can use it.
+
+import numpy as np
+
+CONTEXT_DTYPE = np.dtype("<f4")
+
+# Layout of logged decision contexts. Bump FEATURE_VERSION (and add its length)
+# whenever features are added, removed or reordered; rows logged under another
+# version must not be fed to the current model.
+FEATURE_VERSION = 2
+FEATURE_DIMS = {1: 26, 2: 40}  # 2: static + check-in trends + sensor aggregates
+
+
+def pack_context(vector) -> bytes:
+    """Packed little-endian float32 blob for storage."""
+    return np.asarray(vector, dtype=CONTEXT_DTYPE).tobytes()
+
+
+def unpack_context(blob: bytes) -> np.ndarray:
+    """Zero-copy, read-only float32 view over a stored blob."""
+    return np.frombuffer(blob, dtype=CONTEXT_DTYPE)
+
+
+def unpack_contexts(blobs, dim: int = None) -> np.ndarray:
+    """
+    Stack same-length blobs into an (n, dim) float32 matrix with one join and
+    one frombuffer (for feedback batches, replay and offline evaluation).
+    """
+    blobs = list(blobs)
+    if dim is None:
+        dim = len(blobs[0]) // CONTEXT_DTYPE.itemsize if blobs else 0
+    return np.frombuffer(b"".join(blobs), dtype=CONTEXT_DTYPE).reshape(len(blobs), dim)
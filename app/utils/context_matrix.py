@@ -0,0 +1,108 @@
+# app/utils/context_matrix.py
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.models import db, User
+from app.utils.context_vector import STATIC_DIM, STATIC_LAYOUT
+
+# SQLite caps bound parameters per statement; keep IN (...) lists under it
+IN_CLAUSE_CHUNK = 900
+
+# The User columns the static writers read (static_context.py), fetched as-is
+# and encoded by STATIC_LAYOUT's columnar writers. NULLs come back as the blank
+# value each writer already treats the same way (age or 40, '' → unknown), so
+# these columns arrive as plain int/str arrays
+BLANKS = {
+    "age": 0,
+    "sex": "",
+    "diet_type": "",
+    "goal_type": "",
+    "readiness_stage": "",
+    "chronic_conditions": "",
+    "nudge_style": "",
+    "work_hours": "",
+}
+FIELDS = (*BLANKS, "wake_time", "sleep_time")
+COLUMNS = (
+    User.id,
+    *(func.coalesce(getattr(User, f), BLANKS[f]).label(f) if f in BLANKS else getattr(User, f) for f in FIELDS),
+)
+
+
+def build_context_matrix(user_ids=None, chunk_size: int = 50_000):
+    """
+    Batch equivalent of build_context_vector for campaign sends and offline
+    evaluation: one column-only query per chunk, every feature encoded with
+    NumPy over whole columns.
+
+    Args:
+        user_ids (iterable[int] | None): Users to encode, or None for every user.
+        chunk_size (int): Rows fetched/encoded per pass.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (ids, matrix) — int64 ids of the users
+        found and the matching (n, STATIC_DIM) float32 context rows. With
+        explicit user_ids, rows follow the order given (missing ids dropped).
+    """
+    id_parts, matrix_parts = [], []
+    for rows in _fetch(user_ids, chunk_size):
+        ids, matrix = encode_rows(rows)
+        id_parts.append(ids)
+        matrix_parts.append(matrix)
+
+    if not id_parts:
+        return np.empty(0, dtype=np.int64), np.empty((0, STATIC_DIM), dtype=np.float32)
+
+    ids = np.concatenate(id_parts)
+    matrix = np.concatenate(matrix_parts)
+
+    if user_ids is not None:
+        # Restore caller order (queries return rows in arbitrary order)
+        wanted = np.asarray(list(dict.fromkeys(user_ids)), dtype=np.int64)
+        order = np.argsort(ids)
+        pos = np.searchsorted(ids, wanted, sorter=order)
+        pos = np.minimum(pos, len(ids) - 1)
+        hit = ids[order[pos]] == wanted
+        ids, matrix = wanted[hit], matrix[order[pos[hit]]]
+
+    return ids, matrix
+
+
+def _fetch(user_ids, chunk_size):
+    """Yield lists of raw column tuples."""
+    if user_ids is None:
+        # Core connection, not the ORM session: plain tuples without per-row ORM processing
+        result = db.session.connection().execute(
+            select(*COLUMNS).order_by(User.id).execution_options(yield_per=chunk_size)
+        )
+        for partition in result.partitions(chunk_size):
+            yield partition
+        return
+
+    user_ids = list(dict.fromkeys(user_ids))
+    batch = []
+    for start in range(0, len(user_ids), IN_CLAUSE_CHUNK):
+        ids = user_ids[start:start + IN_CLAUSE_CHUNK]
+        batch.extend(db.session.connection().execute(select(*COLUMNS).where(User.id.in_(ids))).all())
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ───── Column Encoders ─────
+def encode_rows(rows):
+    """
+    Encode fetched rows (in COLUMNS order) into (ids, (n, STATIC_DIM) float32).
+    Produces the same values as encode_static_features for every row.
+    """
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, STATIC_DIM), dtype=np.float32)
+
+    ids, *values = zip(*rows)
+    columns = dict(zip(FIELDS, values))
+    for field, blank in BLANKS.items():
+        columns[field] = np.array(columns[field], dtype=type(blank))
+    return np.array(ids, dtype=np.int64), STATIC_LAYOUT.encode_columns(columns)
@@ -1,95 +1,214 @@
 # app/utils/context_vector.py
 
+import threading
+import time
+from collections import OrderedDict
+
 import numpy as np
-from app.models import db, User
+from app.models import db, User, CheckInState
+from app.utils.checkins import trend_columns, unpack_trend
+from app.utils.context_codec import pack_context, unpack_context
+from app.utils.sensor_stream import AGGREGATE_FIELDS, sensor_aggregator
+
+# Onboarding-derived (static) part of the context: a compiled feature pipeline
+# (category orders are re-exported so they stay importable from here)
+from app.utils.encoders.static_context import (
+    STATIC_LAYOUT, DIET_ORDER, GOAL_ORDER, STAGE_ORDER, STYLE_ORDER,
+)
+# Per-push (dynamic) part: check-in trends + sensor aggregates
+from app.utils.encoders.dynamic_context import DYNAMIC_LAYOUT
 
+# Length of the onboarding-derived (static) part of the context
+STATIC_DIM = STATIC_LAYOUT.dim
+DYNAMIC_DIM = DYNAMIC_LAYOUT.dim
 
-def normalize(val, min_val, max_val):
-    """Min-max normalize value to [0, 1] range."""
-    try:
-        val = float(val)
-    except (TypeError, ValueError):
-        return 0.0
-    return (val - min_val) / (max_val - min_val) if max_val != min_val else 0.0
 
+def encode_static_features(user, out=None) -> np.ndarray:
+    """
+    Encodes the onboarding fields of a user into the static part of the context.
+    Only needs re-running when those fields change.
 
-def one_hot(index, length):
-    """Return a one-hot encoded vector."""
-    vec = [0] * length
-    if isinstance(index, int) and 0 <= index < length:
-        vec[index] = 1
-    return vec
+    Args:
+        user: User model (or any row exposing the User columns).
+        out (np.ndarray | None): Preallocated (STATIC_DIM,) float32 row to fill.
+
+    Returns:
+        np.ndarray: (STATIC_DIM,) float32 feature vector
+    """
+    return STATIC_LAYOUT.encode(user, out)
+
+
+# ───── Static Context Cache ─────
+class StaticContextCache:
+    """
+    Thread-safe LRU of per-user context arrays (static vectors, check-in
+    trends) keyed by user id.
+
+    Entries are invalidated on write in this process; the TTL bounds how long
+    another worker process can serve a vector after an onboarding update.
+    """
+
+    def __init__(self, maxsize: int = 100_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            vector, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return vector
+
+    def put(self, user_id, vector):
+        vector.flags.writeable = False  # shared between requests
+        with self._lock:
+            self._entries[user_id] = (vector, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+static_context_cache = StaticContextCache()
+
+# Latest stored check-in trend per user (empty array → no check-ins yet);
+# POST /checkin puts the new trend here after its write commits
+checkin_trend_cache = StaticContextCache()
+NO_CHECKINS = np.empty(0)
+
+
+def refresh_static_context(user) -> np.ndarray:
+    """
+    Recompute and store a user's static context (call whenever onboarding/profile
+    fields are written, before committing) and drop the cached copy.
+    """
+    vector = encode_static_features(user)
+    user.static_context = pack_context(vector)
+    if user.id is not None:
+        static_context_cache.invalidate(user.id)
+    return vector
+
+
+def get_static_contexts(user_ids) -> dict:
+    """
+    Static context per user id: cache hits first, then one query for the packed
+    blobs of the misses. Users with no stored blob yet are encoded (and stored).
+
+    Returns:
+        dict: user_id → (STATIC_DIM,) float32 array, for the ids that exist
+    """
+    found = {}
+    misses = []
+    for user_id in user_ids:
+        vector = static_context_cache.get(user_id)
+        if vector is None:
+            misses.append(user_id)
+        else:
+            found[user_id] = vector
+
+    if misses:
+        rows = db.session.query(User.id, User.static_context).filter(User.id.in_(misses)).all()
+        backfill = []
+        for user_id, blob in rows:
+            if blob is not None and len(blob) == STATIC_DIM * 4:
+                vector = unpack_context(blob)
+            else:
+                backfill.append(user_id)
+                continue
+            static_context_cache.put(user_id, vector)
+            found[user_id] = vector
+
+        # Users onboarded before blobs existed: encode once and persist
+        if backfill:
+            for user in User.query.filter(User.id.in_(backfill)).all():
+                vector = refresh_static_context(user)
+                static_context_cache.put(user.id, vector)
+                found[user.id] = vector
+            db.session.commit()
+
+    return found
+
+
+def get_checkin_trends(user_ids) -> dict:
+    """
+    Stored check-in trend per user id: cache hits first, then one query
+    against checkin_state for the misses (never the check-in history).
+
+    Returns:
+        dict: user_id → (TREND_SIZE,) float64 trend, or NO_CHECKINS
+    """
+    found, misses = {}, []
+    for user_id in user_ids:
+        trend = checkin_trend_cache.get(user_id)
+        if trend is None:
+            misses.append(user_id)
+        else:
+            found[user_id] = trend
+
+    if misses:
+        rows = db.session.query(CheckInState.user_id, CheckInState.trend).filter(
+            CheckInState.user_id.in_(misses)
+        )
+        for user_id, blob in rows:
+            found[user_id] = unpack_trend(blob)
+        for user_id in misses:
+            trend = found.setdefault(user_id, NO_CHECKINS)
+            checkin_trend_cache.put(user_id, trend)
+
+    return found
+
+
+def dynamic_feature_matrix(user_ids, now: float = None) -> np.ndarray:
+    """
+    Per-push features for many users: check-in trends decayed to `now` plus
+    the current sensor aggregates, encoded column-wise.
+
+    Args:
+        user_ids (sequence[int]): Users, one output row each, in the order given.
+        now (float | None): Epoch seconds (default: current time).
+
+    Returns:
+        np.ndarray: (n, DYNAMIC_DIM) float32 matrix
+    """
+    now = time.time() if now is None else now
+    user_ids = [int(user_id) for user_id in user_ids]
+    trends = get_checkin_trends(user_ids)
+    columns = trend_columns([trends[user_id] for user_id in user_ids], now)
+
+    sensors = sensor_aggregator.current_many(user_ids, now)
+    for field in AGGREGATE_FIELDS:
+        columns[field] = [sensors[user_id][field] for user_id in user_ids]
+    return DYNAMIC_LAYOUT.encode_columns(columns)
+
+
+def dynamic_features(user_id: int, now: float = None) -> np.ndarray:
+    """dynamic_feature_matrix for one user: (DYNAMIC_DIM,) float32 row."""
+    return dynamic_feature_matrix([user_id], now)[0]
 
 
 def build_context_vector(user_id: int) -> np.ndarray:
     """
-    Builds a normalized context vector from user onboarding + mock dynamic data.
+    Builds the context vector for LinUCB: cached static onboarding features
+    concatenated with the user's current check-in trends and sensor aggregates.
 
     Returns:
-        np.ndarray: Feature vector for LinUCB agent
+        np.ndarray: (STATIC_DIM + DYNAMIC_DIM,) float32 feature vector for the LinUCB agent
     """
-    user = User.query.get(user_id)
-    if not user:
+    static = get_static_contexts([user_id]).get(user_id)
+    if static is None:
         raise ValueError(f"User with ID {user_id} not found.")
-
-    vector = []
-
-    # ─────────────────────────────────────────────
-    # 🎂 Age: Normalize (18–90)
-    vector.append(normalize(user.age or 40, 18, 90))
-
-    # 🧬 Sex: One-hot [male, female, other]
-    sex = (user.sex or "other").lower()
-    sex_vector = {
-        "male": [1, 0, 0],
-        "female": [0, 1, 0],
-    }.get(sex, [0, 0, 1])
-    vector.extend(sex_vector)
-
-    # 🍽️ Diet Type: One-hot (omnivore, vegetarian, vegan, pescatarian, dash)
-    diet_order = ["omnivore", "vegetarian", "vegan", "pescatarian", "dash"]
-    diet_index = diet_order.index(user.diet_type.lower()) if user.diet_type and user.diet_type.lower() in diet_order else -1
-    vector.extend(one_hot(diet_index, len(diet_order)))
-
-    # 🎯 Goal Type: One-hot (weight_loss, lower_bp, better_labs, more_energy, better_mood)
-    goal_order = ["weight_loss", "lower_bp", "better_labs", "more_energy", "better_mood"]
-    goal_index = goal_order.index(user.goal_type.lower()) if user.goal_type and user.goal_type.lower() in goal_order else -1
-    vector.extend(one_hot(goal_index, len(goal_order)))
-
-    # 🔁 Stage of Change: One-hot (TTM model)
-    stage_order = ["precontemplation", "contemplation", "preparation", "action", "maintenance"]
-    stage_index = stage_order.index(user.readiness_stage.lower()) if user.readiness_stage and user.readiness_stage.lower() in stage_order else -1
-    vector.extend(one_hot(stage_index, len(stage_order)))
-
-    # 💊 Chronic Conditions: Count how many flags (T2D, HTN, etc.)
-    condition_count = len(user.chronic_conditions.split(",")) if user.chronic_conditions else 0
-    vector.append(normalize(condition_count, 0, 5))  # normalize to 5+ condition scale
-
-    # 🧠 Nudge Style: One-hot (gentle, motivating, directive, humorous)
-    style_order = ["gentle", "motivating", "directive", "humorous"]
-    style_index = style_order.index(user.nudge_style.lower()) if user.nudge_style and user.nudge_style.lower() in style_order else -1
-    vector.extend(one_hot(style_index, len(style_order)))
-
-    # 🕓 Wake/Sleep Time → total sleep window (hours)
-    try:
-        sleep_duration = (datetime.combine(datetime.today(), user.sleep_time) -
-                          datetime.combine(datetime.today(), user.wake_time)).seconds / 3600.0
-        if sleep_duration < 0:  # wrap around midnight
-            sleep_duration += 24
-    except Exception:
-        sleep_duration = 7
-    vector.append(normalize(sleep_duration, 0, 12))
-
-    # 🏙️ Work hours length
-    try:
-        start, end = user.work_hours.split("-")
-        from datetime import datetime
-        fmt = "%H:%M"
-        hours = (datetime.strptime(end.strip(), fmt) - datetime.strptime(start.strip(), fmt)).seconds / 3600.0
-    except Exception:
-        hours = 8
-    vector.append(normalize(hours, 0, 16))
-
-    # 🌐 Zip Code → Drop for now or use later via SES mapping
-
-    return np.array(vector, dtype=np.float32)
+    return np.concatenate([static, dynamic_features(user_id)])
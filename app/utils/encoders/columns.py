@@ -0,0 +1,210 @@
+# file: utils/encoders/columns.py
+#
+# Column helpers for the batch encoders. A "columns" input maps field name →
+# one value per record: NumPy arrays, lists, pandas Series or Arrow arrays
+# (anything np.asarray understands). Numeric columns are encoded with array
+# arithmetic; everything else is encoded once per distinct value with the
+# same scalar function the single-record encoder uses, so both paths agree
+# value for value (including fallbacks for malformed input). Unicode columns
+# with few distinct values (categories) are factorized by comparing packed
+# bytes rather than sorted; case-insensitive table lookups lower-case only the
+# distinct values; HH:MM strings are parsed at fixed positions, and only the
+# rows that rejects go to the scalar function.
+import numpy as np
+
+# Unicode columns with at most this many distinct values are factorized by
+# masking (a few linear passes); wider ones are sorted with np.unique.
+# bench_columnar_encoders.py --sort-only measures the difference
+FEW_DISTINCT = 32
+
+
+def column_length(columns):
+    """Number of records in a columns mapping (all columns must agree)."""
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    return lengths.pop() if lengths else 0
+
+
+def as_array(values):
+    """np.asarray that also accepts Arrow arrays/chunked arrays."""
+    if hasattr(values, "to_numpy") and not isinstance(values, np.ndarray):
+        try:
+            return np.asarray(values.to_numpy(zero_copy_only=False))
+        except TypeError:
+            return np.asarray(values.to_numpy())
+    return np.asarray(values)
+
+
+def factorize(values):
+    """
+    (distinct values, inverse) of a column: factorize_strings for unicode
+    columns with few distinct values, np.unique for other strings and
+    numbers, a dict of already-seen values for object columns (mixed types,
+    None, datetime.time, ...).
+    """
+    arr = as_array(values)
+    if arr.ndim != 1:
+        arr = arr.reshape(-1)
+    if arr.dtype.kind == "U":
+        factorized = factorize_strings(arr, FEW_DISTINCT)
+        if factorized is not None:
+            uniques, inverse = factorized
+            return uniques.tolist(), inverse
+    if arr.dtype.kind in "biufUS":
+        uniques, inverse = np.unique(arr, return_inverse=True)
+        return uniques.tolist(), inverse.reshape(-1)
+
+    seen = {}
+    inverse = np.array([seen.setdefault(v, len(seen)) for v in arr.tolist()], dtype=np.intp)
+    return list(seen), inverse
+
+
+def map_values(values, scalar, dtype=np.float64):
+    """scalar(v) for every value, computed once per distinct value (see factorize)."""
+    uniques, inverse = factorize(values)
+    return np.array([scalar(v) for v in uniques], dtype=dtype)[inverse]
+
+
+def codepoints(arr):
+    """(n, width) uint32 view of a NumPy unicode array (no copy when contiguous)."""
+    arr = np.ascontiguousarray(arr)
+    width = arr.dtype.itemsize // 4
+    return arr.view(np.uint32).reshape(len(arr), width)
+
+
+def ascii_bytes(codes):
+    """
+    Each row's code points as bytes, NUL-padded and packed into (k, n) uint64
+    words, word j of every row contiguous (exact for ASCII rows only). Bytes
+    are written straight into that layout, so no transpose copy is needed.
+    """
+    n, width = codes.shape
+    k = -(-width // 8)
+    packed = np.zeros((k, n, 8), dtype=np.uint8)
+    for j in range(k):
+        chunk = codes[:, 8 * j:8 * j + 8]
+        np.copyto(packed[j, :, :chunk.shape[1]], chunk, casting="unsafe")
+    return packed.view(np.uint64).reshape(k, n)
+
+
+def factorize_strings(arr, max_distinct):
+    """
+    (distinct values, inverse) of a unicode column, found by comparing every
+    row's raw characters against one not-yet-seen row at a time, or None if
+    the column has more than max_distinct distinct values. All-ASCII columns
+    are compared as packed bytes (8 characters per word), others as code points.
+    """
+    codes = codepoints(arr)
+    n, width = codes.shape
+    if n == 0:
+        return arr[:0], np.zeros(0, dtype=np.intp)
+    if codes.max() < 128:
+        words = ascii_bytes(codes)  # (k, n): word j of every row contiguous
+    else:
+        if width % 2:
+            codes = np.pad(codes, ((0, 0), (0, 1)))
+        words = np.ascontiguousarray(codes.view(np.uint64).T)
+
+    slot = np.zeros(n, dtype=np.uint8)  # 0 → not seen yet, k → k-th distinct value (max_distinct < 256)
+    match, word_match, hit = np.empty(n, dtype=bool), np.empty(n, dtype=bool), np.empty(n, dtype=np.uint8)
+    firsts = []
+    first = 0
+    while len(firsts) < max_distinct:
+        np.equal(words[0], words[0, first], out=match)
+        for word in words[1:]:
+            np.equal(word, word[first], out=word_match)
+            match &= word_match
+        firsts.append(first)
+        np.multiply(match.view(np.uint8), np.uint8(len(firsts)), out=hit)
+        slot |= hit  # rows matching an earlier value were already excluded by their differing words
+        unseen = slot[first:].argmin()
+        if slot[first + unseen]:
+            slot -= np.uint8(1)
+            return arr[firsts], slot
+        first += unseen
+    return None
+
+
+def lookup_strings(arr, table, default):
+    """table.get(v.lower(), default) for a unicode column, looked up once per distinct value."""
+    uniques, inverse = factorize(arr)
+    values = [table.get(v, default) for v in np.char.lower(np.array(uniques, dtype=str)).tolist()]
+    return np.array(values, dtype=np.float64)[inverse]
+
+
+def encode_column(columns, field, n, scalar, missing=None, numeric=None, table=None, default=None, text=None):
+    """
+    Encode columns[field] with scalar (the single-record rule). Absent fields
+    behave like user_data.get(field, missing). Numeric columns use
+    numeric(float64 array) when given. Unicode columns use lookup_strings when
+    scalar is a case-insensitive `table` lookup, or text(str array) →
+    (values, ok) for the rows it can parse (see fast_or_scalar).
+    """
+    values = columns.get(field)
+    if values is None:
+        return np.full(n, scalar(missing), dtype=np.float64)
+    arr = as_array(values)
+    if numeric is not None and arr.dtype.kind in "biuf":
+        return numeric(arr.astype(np.float64))
+    if table is not None and arr.dtype.kind == "U":
+        return lookup_strings(arr, table, default)
+    if text is not None:
+        return fast_or_scalar(arr, text, scalar)
+    return map_values(arr, scalar)
+
+
+def category_codes(columns, field, n, scalar, order, other):
+    """
+    Integer category code per record: position of lower(value) in order,
+    else `other` (scalar is the single-record rule returning the same code).
+    """
+    table = {name: i for i, name in enumerate(order)}
+    return encode_column(columns, field, n, scalar, "", table=table, default=other).astype(np.int64)
+
+
+def one_hot_into(out, col, codes, width):
+    """out[:, col:col + width] = one-hot rows of codes (codes outside 0..width-1 → all zeros)."""
+    for k in range(width):
+        np.equal(codes, k, out=out[:, col + k], casting="unsafe")
+
+
+def hhmm_at(codes, pos):
+    """Strict 'HH:MM' at codes[:, pos:pos + 5] → minutes since midnight, plus a validity mask."""
+    n, width = codes.shape
+    if width < pos + 5:
+        return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=bool)
+    # uint32 wrap-around: anything below "0" becomes huge, so `<= 9` is the whole digit test
+    h1, h2, colon, m1, m2 = (codes[:, pos + k] - np.uint32(ord("0")) for k in range(5))
+    hh, mm = h1 * np.uint32(10) + h2, m1 * np.uint32(10) + m2
+    ok = (h1 <= 9) & (h2 <= 9) & (m1 <= 9) & (m2 <= 9) & (colon == ord(":") - ord("0")) & (hh < 24) & (mm < 60)
+    return (hh * np.uint32(60) + mm).astype(np.int64), ok
+
+
+def ends_at(codes, length):
+    """Rows whose string is at most `length` characters (NumPy pads with NULs)."""
+    if codes.shape[1] <= length:
+        return np.ones(len(codes), dtype=bool)
+    return codes[:, length] == 0
+
+
+def parse_hhmm(parts):
+    """Strict 'HH:MM' → minutes since midnight, plus a validity mask."""
+    codes = codepoints(np.asarray(parts, dtype=str))
+    minutes, ok = hhmm_at(codes, 0)
+    return minutes, ok & ends_at(codes, 5)
+
+
+def fast_or_scalar(arr, fast, scalar):
+    """
+    fast(str array) → (values, ok) for well-formed rows; rows it rejects (and
+    non-string columns) fall back to scalar once per distinct value.
+    """
+    if arr.dtype.kind != "U":
+        return map_values(arr, scalar)
+    values, ok = fast(arr)
+    slow = np.nonzero(~ok)[0]
+    if slow.size:
+        values = values.astype(np.float64)
+        values[slow] = map_values(arr[slow], scalar)
+    return values
@@ -0,0 +1,52 @@
+# file: utils/encoders/dynamic_context.py
+#
+# The dynamic (per-push) part of the LinUCB context, appended after the static
+# layout from FEATURE_VERSION 2 on: decayed check-in trends, then the rolling
+# sensor aggregates. Records are dicts (or columns) of precomputed values;
+# changing an order or a normalization here changes the model's inputs: bump
+# FEATURE_VERSION.
+import numpy as np
+
+from .columns import encode_column
+from .encode_sensor_data import SENSOR_SCALES, write_sensor_data, write_sensor_data_columns
+from .pipeline import FeaturePipeline
+
+# Matches app/utils/checkins.py TREND_FIELDS: decayed means, then confidence
+TREND_DEFAULTS = [
+    ("mood_trend", 0.5),
+    ("stress_level_trend", 0.5),
+    ("hunger_trend", 0.5),
+    ("cravings_trend", 0.5),
+    ("energy_level_trend", 0.5),
+    ("checkin_confidence", 0.0),
+]
+
+dynamic_features = FeaturePipeline("dynamic_context", dtype=np.float32)
+
+
+def _value(val, default):
+    return default if val is None else float(val)
+
+
+# 📝 Check-ins: decayed mean rating per field (0–1) + how much recent history backs them
+@dynamic_features.register("checkin_trend", width=len(TREND_DEFAULTS))
+def write_checkin_trend(record, out, i):
+    for k, (field, default) in enumerate(TREND_DEFAULTS):
+        out[i + k] = _value(record.get(field), default)
+
+
+@dynamic_features.register_columns("checkin_trend")
+def write_checkin_trend_columns(columns, out, i):
+    n = len(out)
+    for k, (field, default) in enumerate(TREND_DEFAULTS):
+        out[:, i + k] = encode_column(
+            columns, field, n, lambda v, default=default: _value(v, default), numeric=lambda v: v
+        )
+
+
+# ⌚ Wearables: rolling aggregates (app/utils/sensor_stream.py), same scaling as encode_sensor_data
+dynamic_features.register("sensor_data", width=len(SENSOR_SCALES))(write_sensor_data)
+dynamic_features.register_columns("sensor_data")(write_sensor_data_columns)
+
+
+DYNAMIC_LAYOUT = dynamic_features.compile()
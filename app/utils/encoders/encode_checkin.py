@@ -1,23 +1,51 @@
 # file: utils/encoders/encode_checkin.py
 import numpy as np
 
+from .columns import column_length, encode_column
+from .pipeline import profile_features
+
+CHECKIN_FIELDS = ["mood", "stress_level", "hunger", "cravings", "energy_level"]
+
+
+def _norm(val):
+    try:
+        return (float(val) - 1) / 4.0
+    except (TypeError, ValueError):
+        return 0.5
+
+
+@profile_features.register("checkin", width=len(CHECKIN_FIELDS))
+def write_checkin(user_data, out, i):
+    """
+    Writes self-reported daily state variables into out[i:i + 5].
+    Each is expected on a 1–5 scale and normalized to [0, 1].
+    If missing, defaults to midpoint (0.5).
+    """
+    for k, field in enumerate(CHECKIN_FIELDS):
+        out[i + k] = _norm(user_data.get(field))
+
+
 def encode_checkin(user_data):
     """
     Encodes self-reported daily state variables.
     Each is expected on a 1–5 scale and normalized to [0, 1].
     If missing, defaults to midpoint (0.5).
     """
+    out = np.empty(len(CHECKIN_FIELDS))
+    write_checkin(user_data, out, 0)
+    return out
+
 
-    def norm(val):
-        try:
-            return (float(val) - 1) / 4.0
-        except:
-            return 0.5
+@profile_features.register_columns("checkin")
+def write_checkin_columns(columns, out, i):
+    """Columnar write_checkin: numeric columns are rescaled as arrays."""
+    n = len(out)
+    for k, field in enumerate(CHECKIN_FIELDS):
+        out[:, i + k] = encode_column(columns, field, n, _norm, numeric=lambda v: (v - 1) / 4.0)
 
-    mood = norm(user_data.get("mood"))
-    stress = norm(user_data.get("stress_level"))
-    hunger = norm(user_data.get("hunger"))
-    cravings = norm(user_data.get("cravings"))
-    energy = norm(user_data.get("energy_level"))
 
-    return np.array([mood, stress, hunger, cravings, energy])
+def encode_checkin_columns(columns):
+    """Batch encode_checkin: field → values columns in, (n, 5) array out."""
+    out = np.empty((column_length(columns), len(CHECKIN_FIELDS)))
+    write_checkin_columns(columns, out, 0)
+    return out
@@ -1,6 +1,37 @@
 # file: utils/encoders/encode_demographics.py
 import numpy as np
 
+from .columns import category_codes, column_length, encode_column, one_hot_into
+from .pipeline import profile_features
+
+SEX_ORDER = ["male", "female"]  # anything else → "other"
+
+
+def _age(age):
+    return float(age) / 100.0
+
+
+def _sex_code(sex):
+    sex = sex.lower()
+    return SEX_ORDER.index(sex) if sex in SEX_ORDER else 2
+
+
+@profile_features.register("demographics", width=4)
+def write_demographics(user_data, out, i):
+    """
+    Writes age, sex, and zip_code into out[i:i + 4].
+    - age is normalized
+    - sex is one-hot: [male, female, other]
+    - zip_code is dropped (placeholder)
+    """
+
+    # Normalize age to 0–1 range (assume 100 as upper cap)
+    out[i] = _age(user_data.get("age", 0))
+
+    out[i + 1:i + 4] = 0.0
+    out[i + 1 + _sex_code(user_data.get("sex", ""))] = 1.0
+
+
 def encode_demographics(user_data):
     """
     Encodes age, sex, and zip_code.
@@ -8,14 +39,21 @@ def encode_demographics(user_data):
     - sex is one-hot: [male, female, other]
     - zip_code is dropped (placeholder)
     """
+    out = np.empty(4)
+    write_demographics(user_data, out, 0)
+    return out
 
-    # Normalize age to 0–1 range (assume 100 as upper cap)
-    age = float(user_data.get("age", 0)) / 100.0
 
-    sex = user_data.get("sex", "").lower()
-    sex_encoded = {
-        "male": [1.0, 0.0, 0.0],
-        "female": [0.0, 1.0, 0.0],
-    }.get(sex, [0.0, 0.0, 1.0])  # all other cases → "other"
+@profile_features.register_columns("demographics")
+def write_demographics_columns(columns, out, i):
+    """Columnar write_demographics: one lookup per distinct sex value."""
+    n = len(out)
+    out[:, i] = encode_column(columns, "age", n, _age, missing=0, numeric=lambda v: v / 100.0)
+    one_hot_into(out, i + 1, category_codes(columns, "sex", n, _sex_code, SEX_ORDER, 2), 3)
+
 
-    return np.array([age] + sex_encoded)
+def encode_demographics_columns(columns):
+    """Batch encode_demographics: field → values columns in, (n, 4) array out."""
+    out = np.empty((column_length(columns), 4))
+    write_demographics_columns(columns, out, 0)
+    return out
@@ -1,24 +1,58 @@
 # file: utils/encoders/encode_device_meta.py
 import numpy as np
 
+from .columns import category_codes, column_length, encode_column, one_hot_into
+from .pipeline import profile_features
+
+DEVICE_ORDER = ["ios", "android"]  # anything else → Other
+
+
+def _device_code(device):
+    device = device.lower()
+    return DEVICE_ORDER.index(device) if device in DEVICE_ORDER else 2
+
+
+def _os_version(os_version_str):
+    try:
+        major, minor = os_version_str.split(".")[:2]
+        return (int(major) + int(minor)/10.0) / 20.0  # normalize to ~[0, 1]
+    except Exception:
+        return 0.5  # fallback
+
+
+@profile_features.register("device_meta", width=4)
+def write_device_meta(user_data, out, i):
+    """
+    Writes device_type and OS_version into out[i:i + 4].
+    - device_type is one-hot: [iOS, Android, Other]
+    - OS_version is parsed into a float: major.minor/20
+    """
+    out[i:i + 3] = 0.0
+    out[i + _device_code(user_data.get("device_type", ""))] = 1.0
+    out[i + 3] = _os_version(user_data.get("os_version", "0.0"))
+
+
 def encode_device_meta(user_data):
     """
     Encodes device_type and OS_version.
     - device_type is one-hot: [iOS, Android, Other]
     - OS_version is parsed into a float: major.minor/20
     """
+    out = np.empty(4)
+    write_device_meta(user_data, out, 0)
+    return out
 
-    device = user_data.get("device_type", "").lower()
-    device_encoded = {
-        "ios": [1.0, 0.0, 0.0],
-        "android": [0.0, 1.0, 0.0]
-    }.get(device, [0.0, 0.0, 1.0])  # default → Other
 
-    os_version_str = user_data.get("os_version", "0.0")
-    try:
-        major, minor = os_version_str.split(".")[:2]
-        os_version = (int(major) + int(minor)/10.0) / 20.0  # normalize to ~[0, 1]
-    except:
-        os_version = 0.5  # fallback
+@profile_features.register_columns("device_meta")
+def write_device_meta_columns(columns, out, i):
+    """Columnar write_device_meta: device types and OS versions parsed once per distinct value."""
+    n = len(out)
+    one_hot_into(out, i, category_codes(columns, "device_type", n, _device_code, DEVICE_ORDER, 2), 3)
+    out[:, i + 3] = encode_column(columns, "os_version", n, _os_version, missing="0.0")
+
 
-    return np.array(device_encoded + [os_version])
+def encode_device_meta_columns(columns):
+    """Batch encode_device_meta: field → values columns in, (n, 4) array out."""
+    out = np.empty((column_length(columns), 4))
+    write_device_meta_columns(columns, out, 0)
+    return out
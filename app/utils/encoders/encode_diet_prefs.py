@@ -1,21 +1,52 @@
 # file: utils/encoders/encode_diet_prefs.py
 import numpy as np
 
+from .columns import column_length, encode_column
+from .pipeline import profile_features
+
+# Example: simple diet_type encoding (expand as needed)
+DIET_SCORES = {
+    "omnivore": 0.2,
+    "vegetarian": 0.4,
+    "vegan": 1.0,
+    "pescatarian": 0.6,
+    "dash": 0.8
+}
+DEFAULT_DIET_SCORE = 0.5  # default if unknown
+
+
+def _diet_score(diet_type):
+    return DIET_SCORES.get(diet_type.lower(), DEFAULT_DIET_SCORE)
+
+
+@profile_features.register("diet_prefs", width=1)
+def write_diet_prefs(user_data, out, i):
+    """
+    Writes diet_type (food_allergies and food_avoidances not yet encoded) into out[i].
+    """
+    out[i] = _diet_score(user_data.get("diet_type", ""))
+
+
 def encode_diet_prefs(user_data):
     """
     Encode diet_type, food_allergies, and food_avoidances.
     Currently encodes only diet_type.
     """
+    out = np.empty(1)
+    write_diet_prefs(user_data, out, 0)
+    return out
+
+
+@profile_features.register_columns("diet_prefs")
+def write_diet_prefs_columns(columns, out, i):
+    """Columnar write_diet_prefs: one lookup per distinct diet_type."""
+    out[:, i] = encode_column(
+        columns, "diet_type", len(out), _diet_score, missing="", table=DIET_SCORES, default=DEFAULT_DIET_SCORE
+    )
+
 
-    diet_type = user_data.get("diet_type", "").lower()
-    # Example: simple diet_type encoding (expand as needed)
-    diet_map = {
-        "omnivore": 0.2,
-        "vegetarian": 0.4,
-        "vegan": 1.0,
-        "pescatarian": 0.6,
-        "dash": 0.8
-    }
-    diet_score = diet_map.get(diet_type, 0.5)  # default if unknown
-
-    return np.array([diet_score])
+def encode_diet_prefs_columns(columns):
+    """Batch encode_diet_prefs: field → values columns in, (n, 1) array out."""
+    out = np.empty((column_length(columns), 1))
+    write_diet_prefs_columns(columns, out, 0)
+    return out
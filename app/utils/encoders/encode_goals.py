@@ -1,29 +1,66 @@
 # file: utils/encoders/encode_goals.py
 import numpy as np
 
+from .columns import column_length, encode_column
+from .pipeline import profile_features
+
+GOAL_SCORES = {
+    "weight_loss": 0.8,
+    "lower_bp": 0.6,
+    "better_labs": 0.7,
+    "more_energy": 0.5,
+    "better_mood": 0.4
+}
+NUDGE_SCORES = {
+    "gentle": 0.5,
+    "motivating": 0.7,
+    "directive": 1.0,
+    "humorous": 0.6
+}
+DEFAULT_GOAL_SCORE = 0.3
+DEFAULT_NUDGE_SCORE = 0.5
+
+
+def _goal_score(goal_type):
+    return GOAL_SCORES.get(goal_type.lower(), DEFAULT_GOAL_SCORE)
+
+
+def _nudge_score(nudge_style):
+    return NUDGE_SCORES.get(nudge_style.lower(), DEFAULT_NUDGE_SCORE)
+
+
+@profile_features.register("goals", width=2)
+def write_goals(user_data, out, i):
+    """
+    Writes goal_type and nudge_style scores into out[i:i + 2].
+    """
+    out[i] = _goal_score(user_data.get("goal_type", ""))
+    out[i + 1] = _nudge_score(user_data.get("nudge_style", ""))
+
+
 def encode_goals(user_data):
     """
     Encodes goal_type and nudge_style into numeric features.
     """
+    out = np.empty(2)
+    write_goals(user_data, out, 0)
+    return out
+
+
+@profile_features.register_columns("goals")
+def write_goals_columns(columns, out, i):
+    """Columnar write_goals: one lookup per distinct goal_type / nudge_style."""
+    n = len(out)
+    out[:, i] = encode_column(
+        columns, "goal_type", n, _goal_score, missing="", table=GOAL_SCORES, default=DEFAULT_GOAL_SCORE
+    )
+    out[:, i + 1] = encode_column(
+        columns, "nudge_style", n, _nudge_score, missing="", table=NUDGE_SCORES, default=DEFAULT_NUDGE_SCORE
+    )
+
 
-    goal_type = user_data.get("goal_type", "").lower()
-    nudge_style = user_data.get("nudge_style", "").lower()
-
-    goal_map = {
-        "weight_loss": 0.8,
-        "lower_bp": 0.6,
-        "better_labs": 0.7,
-        "more_energy": 0.5,
-        "better_mood": 0.4
-    }
-    nudge_map = {
-        "gentle": 0.5,
-        "motivating": 0.7,
-        "directive": 1.0,
-        "humorous": 0.6
-    }
-
-    goal_score = goal_map.get(goal_type, 0.3)
-    nudge_score = nudge_map.get(nudge_style, 0.5)
-
-    return np.array([goal_score, nudge_score])
+def encode_goals_columns(columns):
+    """Batch encode_goals: field → values columns in, (n, 2) array out."""
+    out = np.empty((column_length(columns), 2))
+    write_goals_columns(columns, out, 0)
+    return out
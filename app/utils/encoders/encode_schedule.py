@@ -2,6 +2,9 @@
 import numpy as np
 from datetime import datetime
 
+from .columns import codepoints, column_length, encode_column, ends_at, hhmm_at, parse_hhmm
+from .pipeline import profile_features
+
 def _time_to_float(time_str):
     """
     Converts time in HH:MM format to a float between 0 and 1.
@@ -9,20 +12,11 @@ def _time_to_float(time_str):
     try:
         t = datetime.strptime(time_str, "%H:%M")
         return (t.hour * 60 + t.minute) / 1440.0
-    except:
+    except Exception:
         return 0.5  # default if malformed
 
-def encode_schedule(user_data):
-    """
-    Encode wake_time, sleep_time, and work_hours.
-    - wake/sleep are sin-normalized floats
-    - work_hours becomes duration
-    """
-
-    wake = _time_to_float(user_data.get("wake_time", "07:00"))
-    sleep = _time_to_float(user_data.get("sleep_time", "22:00"))
 
-    work_hours = user_data.get("work_hours", "09:00-17:00")
+def _work_duration(work_hours):
     try:
         start, end = work_hours.split("-")
         work_start = _time_to_float(start.strip())
@@ -30,7 +24,66 @@ def encode_schedule(user_data):
         duration = work_end - work_start
         if duration < 0:
             duration += 1.0  # wrap around midnight
-    except:
-        duration = 0.5  # fallback
+        return duration
+    except Exception:
+        return 0.5  # fallback
+
+
+@profile_features.register("schedule", width=3)
+def write_schedule(user_data, out, i):
+    """
+    Writes wake_time, sleep_time, and work_hours into out[i:i + 3].
+    - wake/sleep are fractions of the day
+    - work_hours becomes duration
+    """
+    out[i] = _time_to_float(user_data.get("wake_time", "07:00"))
+    out[i + 1] = _time_to_float(user_data.get("sleep_time", "22:00"))
+    out[i + 2] = _work_duration(user_data.get("work_hours", "09:00-17:00"))
+
+
+def encode_schedule(user_data):
+    """
+    Encode wake_time, sleep_time, and work_hours.
+    - wake/sleep are sin-normalized floats
+    - work_hours becomes duration
+    """
+    out = np.empty(3)
+    write_schedule(user_data, out, 0)
+    return out
+
+
+def _time_to_float_fast(times):
+    minutes, ok = parse_hhmm(times)
+    return minutes / 1440.0, ok
+
+
+def _work_duration_fast(work_hours):
+    # Canonical "HH:MM-HH:MM" at fixed positions; spaced or odd forms go to the scalar parser
+    codes = codepoints(work_hours)
+    start_min, start_ok = hhmm_at(codes, 0)
+    end_min, end_ok = hhmm_at(codes, 6)
+    duration = end_min / 1440.0 - start_min / 1440.0
+    duration[duration < 0] += 1.0  # wrap around midnight
+    ok = start_ok & end_ok & ends_at(codes, 11)
+    if codes.shape[1] > 5:
+        ok &= codes[:, 5] == ord("-")
+    return duration, ok
+
+
+@profile_features.register_columns("schedule")
+def write_schedule_columns(columns, out, i):
+    """
+    Columnar write_schedule: strict HH:MM strings are parsed at the byte
+    level; anything else falls back to the scalar parser once per distinct value.
+    """
+    n = len(out)
+    out[:, i] = encode_column(columns, "wake_time", n, _time_to_float, "07:00", text=_time_to_float_fast)
+    out[:, i + 1] = encode_column(columns, "sleep_time", n, _time_to_float, "22:00", text=_time_to_float_fast)
+    out[:, i + 2] = encode_column(columns, "work_hours", n, _work_duration, "09:00-17:00", text=_work_duration_fast)
+
 
-    return np.array([wake, sleep, duration])
+def encode_schedule_columns(columns):
+    """Batch encode_schedule: field → values columns in, (n, 3) array out."""
+    out = np.empty((column_length(columns), 3))
+    write_schedule_columns(columns, out, 0)
+    return out
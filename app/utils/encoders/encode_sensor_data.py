@@ -1,32 +1,62 @@
 # file: utils/encoders/encode_sensor_data.py
 import numpy as np
 
+from .columns import column_length, encode_column
+from .pipeline import profile_features
+
+# (field, scale) in output order
+SENSOR_SCALES = [
+    ("steps_today", 20000),
+    ("steps_last_hour", 1000),
+    ("sedentary_minutes", 600),
+    ("heart_rate", 200),
+    ("resting_hr", 100),
+    ("max_hr", 220),
+    ("total_sleep_minutes", 960),
+    ("sleep_efficiency", 100),
+]
+
+
+def _safe(val, scale=1.0, default=0.5):
+    try:
+        return float(val) / scale
+    except (TypeError, ValueError):
+        return default
+
+
+@profile_features.register("sensor_data", width=len(SENSOR_SCALES))
+def write_sensor_data(sensor_data, out, i):
+    """
+    Writes passive wearable/phone sensor data into out[i:i + 8], scaled to
+    ~[0, 1]; unavailable values default to neutral midpoints.
+    """
+    for k, (field, scale) in enumerate(SENSOR_SCALES):
+        out[i + k] = _safe(sensor_data.get(field), scale=scale)
+
+
 def encode_sensor_data(sensor_data):
     """
     Encodes passive data from wearable or phone sensors.
     Values should be pre-normalized or scaled here.
     If unavailable, defaults to neutral midpoints.
     """
+    out = np.empty(len(SENSOR_SCALES))
+    write_sensor_data(sensor_data, out, 0)
+    return out
 
-    def safe(val, scale=1.0, default=0.5):
-        try:
-            return float(val) / scale
-        except:
-            return default
-
-    steps_today = safe(sensor_data.get("steps_today"), scale=20000)
-    steps_last_hour = safe(sensor_data.get("steps_last_hour"), scale=1000)
-    sedentary_minutes = safe(sensor_data.get("sedentary_minutes"), scale=600)
 
-    heart_rate = safe(sensor_data.get("heart_rate"), scale=200)
-    resting_hr = safe(sensor_data.get("resting_hr"), scale=100)
-    max_hr = safe(sensor_data.get("max_hr"), scale=220)
+@profile_features.register_columns("sensor_data")
+def write_sensor_data_columns(columns, out, i):
+    """Columnar write_sensor_data: numeric columns are scaled as arrays."""
+    n = len(out)
+    for k, (field, scale) in enumerate(SENSOR_SCALES):
+        out[:, i + k] = encode_column(
+            columns, field, n, lambda v, scale=scale: _safe(v, scale=scale), numeric=lambda v, scale=scale: v / scale
+        )
 
-    sleep_minutes = safe(sensor_data.get("total_sleep_minutes"), scale=960)
-    sleep_efficiency = safe(sensor_data.get("sleep_efficiency"), scale=100)
 
-    return np.array([
-        steps_today, steps_last_hour, sedentary_minutes,
-        heart_rate, resting_hr, max_hr,
-        sleep_minutes, sleep_efficiency
-    ])
+def encode_sensor_data_columns(columns):
+    """Batch encode_sensor_data: field → values columns in, (n, 8) array out."""
+    out = np.empty((column_length(columns), len(SENSOR_SCALES)))
+    write_sensor_data_columns(columns, out, 0)
+    return out
@@ -0,0 +1,174 @@
+# file: utils/encoders/pipeline.py
+from collections import namedtuple
+
+import numpy as np
+
+from .columns import column_length
+
+# One registered encoder: `write` stores `width` values for one record into
+# out[offset:offset + width]; the optional `write_columns` does the same for a
+# whole batch of columnar records into out[:, offset:offset + width]
+Feature = namedtuple("Feature", ["name", "width", "dtype", "write", "write_columns"])
+
+
+class FeaturePipeline:
+    """
+    Declarative registry of feature encoders.
+
+    Each encoder registers its name, output width and dtype, and a writer
+    `write(record, out, offset)` that stores its values directly into
+    out[offset:offset + width] (no intermediate arrays). compile() fixes the
+    layout once; the compiled pipeline then fills preallocated rows or
+    matrices by running the writers at their precomputed offsets.
+
+    Encoders may also register a columnar writer
+    `write_columns(columns, out, offset)` that encodes whole columns (field →
+    array of values) with NumPy; it must produce exactly what `write` does
+    record by record.
+    """
+
+    def __init__(self, name, dtype=np.float32):
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self.features = {}
+        self._compiled = {}
+
+    def register(self, name, width, dtype=np.float32):
+        """Decorator: add `write(record, out, offset)` as feature `name`."""
+        def decorator(write):
+            if name in self.features:
+                raise ValueError(f"Feature '{name}' already registered in pipeline '{self.name}'")
+            if self._compiled:
+                raise RuntimeError(f"Pipeline '{self.name}' is already compiled; register features at import time")
+            if not np.can_cast(dtype, self.dtype, casting="same_kind"):
+                raise TypeError(f"Feature '{name}' dtype {np.dtype(dtype)} doesn't fit pipeline dtype {self.dtype}")
+            self.features[name] = Feature(name, width, np.dtype(dtype), write, None)
+            return write
+        return decorator
+
+    def register_columns(self, name):
+        """Decorator: add the columnar writer for already-registered feature `name`."""
+        def decorator(write_columns):
+            if self._compiled:
+                raise RuntimeError(f"Pipeline '{self.name}' is already compiled; register features at import time")
+            self.features[name] = self.features[name]._replace(write_columns=write_columns)
+            return write_columns
+        return decorator
+
+    def compile(self, order=None):
+        """
+        Fix the layout: features in `order` (default: registration order).
+
+        Returns:
+            CompiledPipeline: Reused for every later call with the same order.
+        """
+        order = tuple(order or self.features)
+        compiled = self._compiled.get(order)
+        if compiled is None:
+            missing = [name for name in order if name not in self.features]
+            if missing:
+                raise KeyError(f"Unknown features in pipeline '{self.name}': {missing}")
+            compiled = CompiledPipeline([self.features[name] for name in order], self.dtype)
+            self._compiled[order] = compiled
+        return compiled
+
+
+class CompiledPipeline:
+    """
+    A fixed feature layout: `dim` columns, each feature at a known slice.
+
+    encode() and encode_many() run the same writers at the same offsets, so
+    one record encodes identically either way.
+    """
+
+    def __init__(self, features, dtype):
+        self.features = list(features)
+        self.dtype = dtype
+        self.slices = {}
+        self._plan = []
+        self._column_plan = []
+        offset = 0
+        for feature in self.features:
+            self.slices[feature.name] = slice(offset, offset + feature.width)
+            self._plan.append((feature.write, offset))
+            self._column_plan.append((feature.write_columns, feature.write, offset))
+            offset += feature.width
+        self.dim = offset
+
+    def encode(self, record, out=None):
+        """
+        Encode one record into a (dim,) row.
+
+        Args:
+            record: Whatever the registered writers read (dict, model row, ...).
+            out (np.ndarray | None): Preallocated (dim,) row to fill.
+
+        Returns:
+            np.ndarray: out (allocated when not given).
+        """
+        if out is None:
+            out = np.empty(self.dim, dtype=self.dtype)
+        for write, offset in self._plan:
+            write(record, out, offset)
+        return out
+
+    def encode_many(self, records, out=None):
+        """
+        Encode records into the rows of an (n, dim) matrix.
+
+        Args:
+            records (sequence): Records, one per output row.
+            out (np.ndarray | None): Preallocated (n, dim) matrix to fill.
+
+        Returns:
+            np.ndarray: out (allocated when not given).
+        """
+        if out is None:
+            out = np.empty((len(records), self.dim), dtype=self.dtype)
+        plan = self._plan
+        for row, record in zip(out, records):
+            for write, offset in plan:
+                write(record, row, offset)
+        return out
+
+    def encode_columns(self, columns, out=None):
+        """
+        Encode columnar records (field → one value per record) into an (n, dim)
+        matrix; row i equals encode() of record i. Features without a columnar
+        writer are filled record by record.
+
+        Args:
+            columns (Mapping): Field name → array-like (ndarray, list, pandas/Arrow column).
+            out (np.ndarray | None): Preallocated (n, dim) matrix to fill.
+
+        Returns:
+            np.ndarray: out (allocated when not given).
+        """
+        n = column_length(columns)
+        if out is None:
+            out = np.empty((n, self.dim), dtype=self.dtype)
+        records = None
+        for write_columns, write, offset in self._column_plan:
+            if write_columns is not None:
+                write_columns(columns, out, offset)
+                continue
+            if records is None:
+                fields = list(columns)
+                records = [dict(zip(fields, values)) for values in zip(*(columns[f] for f in fields))]
+            for row, record in zip(out, records):
+                write(record, row, offset)
+        return out
+
+    def names(self):
+        """Feature name per output column (e.g. 'sex[1]' for a multi-column feature)."""
+        columns = []
+        for feature in self.features:
+            if feature.width == 1:
+                columns.append(feature.name)
+            else:
+                columns.extend(f"{feature.name}[{i}]" for i in range(feature.width))
+        return columns
+
+
+# Registry the encoders in this package add themselves to (see profile.py)
+profile_features = FeaturePipeline("profile")
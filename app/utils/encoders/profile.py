@@ -0,0 +1,38 @@
+# file: utils/encoders/profile.py
+# Importing the encoder modules registers their writers on profile_features
+from . import (  # noqa: F401
+    encode_checkin,
+    encode_demographics,
+    encode_device_meta,
+    encode_diet_prefs,
+    encode_goals,
+    encode_schedule,
+    encode_sensor_data,
+)
+from .pipeline import profile_features
+
+# Fixed column order, independent of import order
+PROFILE_LAYOUT = profile_features.compile([
+    "demographics",
+    "diet_prefs",
+    "goals",
+    "schedule",
+    "device_meta",
+    "checkin",
+    "sensor_data",
+])
+
+
+def encode_profile(user_data, out=None):
+    """All encoders for one merged user/check-in/sensor dict → (PROFILE_LAYOUT.dim,) row."""
+    return PROFILE_LAYOUT.encode(user_data, out)
+
+
+def encode_profiles(records, out=None):
+    """encode_profile for many dicts → (n, PROFILE_LAYOUT.dim) matrix, same values row for row."""
+    return PROFILE_LAYOUT.encode_many(records, out)
+
+
+def encode_profile_columns(columns, out=None):
+    """Columnar encode_profiles: field → values columns (arrays, lists, pandas/Arrow) in."""
+    return PROFILE_LAYOUT.encode_columns(columns, out)
@@ -0,0 +1,239 @@
+# file: utils/encoders/static_context.py
+#
+# The static (onboarding) part of the LinUCB context: the first 26 columns
+# since FEATURE_VERSION 1 (dynamic_context.py follows it). Writers read
+# attributes, so records can be User models, SQLAlchemy rows or anything else
+# exposing the User columns; the columnar writers take the same User columns
+# as field → values (build_context_matrix in context_matrix.py). Changing a
+# normalization or the order here changes the model's inputs: bump FEATURE_VERSION.
+from datetime import datetime, time
+from functools import partial
+
+import numpy as np
+
+from .columns import category_codes, encode_column, factorize, one_hot_into, parse_hhmm
+from .pipeline import FeaturePipeline
+
+# Category orders for the one-hot blocks
+SEX_ORDER = ["male", "female"]  # anything else → other
+DIET_ORDER = ["omnivore", "vegetarian", "vegan", "pescatarian", "dash"]
+GOAL_ORDER = ["weight_loss", "lower_bp", "better_labs", "more_energy", "better_mood"]
+STAGE_ORDER = ["precontemplation", "contemplation", "preparation", "action", "maintenance"]
+STYLE_ORDER = ["gentle", "motivating", "directive", "humorous"]
+
+static_features = FeaturePipeline("static_context", dtype=np.float32)
+
+
+def normalize(val, min_val, max_val):
+    """Min-max normalize value to [0, 1] range."""
+    try:
+        val = float(val)
+    except (TypeError, ValueError):
+        return 0.0
+    return (val - min_val) / (max_val - min_val) if max_val != min_val else 0.0
+
+
+def _category_code(value, order):
+    """Position of lower(value) in order, -1 when unknown (all-zero one-hot)."""
+    if value:
+        value = value.lower()
+        if value in order:
+            return order.index(value)
+    return -1
+
+
+def _one_hot(value, order, out, i):
+    """out[i:i + len(order)] = one-hot of lower(value) in order (all zeros when unknown)."""
+    out[i:i + len(order)] = 0.0
+    code = _category_code(value, order)
+    if code >= 0:
+        out[i + code] = 1.0
+
+
+def _one_hot_columns(columns, field, order, out, i):
+    """Columnar _one_hot: one lookup per distinct value."""
+    codes = category_codes(columns, field, len(out), partial(_category_code, order=order), order, -1)
+    one_hot_into(out, i, codes, len(order))
+
+
+def _age(age):
+    return normalize(age or 40, 18, 90)
+
+
+def _sex_code(sex):
+    sex = (sex or "other").lower()
+    return SEX_ORDER.index(sex) if sex in SEX_ORDER else 2
+
+
+def _chronic_conditions(conditions):
+    count = len(conditions.split(",")) if conditions else 0
+    return normalize(count, 0, 5)
+
+
+def _sleep_window(wake_time, sleep_time):
+    try:
+        sleep_duration = (datetime.combine(datetime.today(), sleep_time) -
+                          datetime.combine(datetime.today(), wake_time)).seconds / 3600.0
+    except Exception:
+        sleep_duration = 7
+    return normalize(sleep_duration, 0, 12)
+
+
+def _work_hours(work_hours):
+    try:
+        start, end = work_hours.split("-")
+        fmt = "%H:%M"
+        hours = (datetime.strptime(end.strip(), fmt) - datetime.strptime(start.strip(), fmt)).seconds / 3600.0
+    except Exception:
+        hours = 8
+    return normalize(hours, 0, 16)
+
+
+# 🎂 Age: Normalize (18–90)
+@static_features.register("age", width=1)
+def write_age(user, out, i):
+    out[i] = _age(user.age)
+
+
+def _ages(ages):
+    return (np.where(ages == 0, 40.0, ages) - 18) / (90 - 18)
+
+
+@static_features.register_columns("age")
+def write_age_columns(columns, out, i):
+    out[:, i] = encode_column(columns, "age", len(out), _age, numeric=_ages)
+
+
+# 🧬 Sex: One-hot [male, female, other]
+@static_features.register("sex", width=3, dtype=np.bool_)
+def write_sex(user, out, i):
+    out[i:i + 3] = 0.0
+    out[i + _sex_code(user.sex)] = 1.0
+
+
+@static_features.register_columns("sex")
+def write_sex_columns(columns, out, i):
+    one_hot_into(out, i, category_codes(columns, "sex", len(out), _sex_code, SEX_ORDER, 2), 3)
+
+
+# 🍽️ Diet Type: One-hot (omnivore, vegetarian, vegan, pescatarian, dash)
+@static_features.register("diet_type", width=len(DIET_ORDER), dtype=np.bool_)
+def write_diet_type(user, out, i):
+    _one_hot(user.diet_type, DIET_ORDER, out, i)
+
+
+@static_features.register_columns("diet_type")
+def write_diet_type_columns(columns, out, i):
+    _one_hot_columns(columns, "diet_type", DIET_ORDER, out, i)
+
+
+# 🎯 Goal Type: One-hot (weight_loss, lower_bp, better_labs, more_energy, better_mood)
+@static_features.register("goal_type", width=len(GOAL_ORDER), dtype=np.bool_)
+def write_goal_type(user, out, i):
+    _one_hot(user.goal_type, GOAL_ORDER, out, i)
+
+
+@static_features.register_columns("goal_type")
+def write_goal_type_columns(columns, out, i):
+    _one_hot_columns(columns, "goal_type", GOAL_ORDER, out, i)
+
+
+# 🔁 Stage of Change: One-hot (TTM model)
+@static_features.register("readiness_stage", width=len(STAGE_ORDER), dtype=np.bool_)
+def write_readiness_stage(user, out, i):
+    _one_hot(user.readiness_stage, STAGE_ORDER, out, i)
+
+
+@static_features.register_columns("readiness_stage")
+def write_readiness_stage_columns(columns, out, i):
+    _one_hot_columns(columns, "readiness_stage", STAGE_ORDER, out, i)
+
+
+# 💊 Chronic Conditions: Count how many flags (T2D, HTN, etc.), normalized to a 5+ condition scale
+@static_features.register("chronic_conditions", width=1)
+def write_chronic_conditions(user, out, i):
+    out[i] = _chronic_conditions(user.chronic_conditions)
+
+
+def _chronic_conditions_fast(conditions):
+    counts = np.where(conditions == "", 0, np.char.count(conditions, ",") + 1)
+    return counts / 5.0, np.ones(len(conditions), dtype=bool)
+
+
+@static_features.register_columns("chronic_conditions")
+def write_chronic_conditions_columns(columns, out, i):
+    out[:, i] = encode_column(
+        columns, "chronic_conditions", len(out), _chronic_conditions, text=_chronic_conditions_fast
+    )
+
+
+# 🧠 Nudge Style: One-hot (gentle, motivating, directive, humorous)
+@static_features.register("nudge_style", width=len(STYLE_ORDER), dtype=np.bool_)
+def write_nudge_style(user, out, i):
+    _one_hot(user.nudge_style, STYLE_ORDER, out, i)
+
+
+@static_features.register_columns("nudge_style")
+def write_nudge_style_columns(columns, out, i):
+    _one_hot_columns(columns, "nudge_style", STYLE_ORDER, out, i)
+
+
+# 🕓 Wake/Sleep Time → total sleep window (hours)
+@static_features.register("sleep_window", width=1)
+def write_sleep_window(user, out, i):
+    out[i] = _sleep_window(user.wake_time, user.sleep_time)
+
+
+def _time_us(times):
+    """Microseconds since midnight per naive datetime.time (-1 for anything else)."""
+    return np.array([
+        ((t.hour * 60 + t.minute) * 60 + t.second) * 1_000_000 + t.microsecond
+        if isinstance(t, time) and t.tzinfo is None else -1
+        for t in times
+    ], dtype=np.int64)
+
+
+@static_features.register_columns("sleep_window")
+def write_sleep_window_columns(columns, out, i):
+    """
+    Columnar write_sleep_window: naive times are subtracted as microseconds
+    (timedelta.seconds wraps to [0, 24h)); other pairs run the scalar rule
+    once per distinct (wake, sleep) pair.
+    """
+    n = len(out)
+    wakes, wake_codes = factorize(columns.get("wake_time", [None] * n))
+    sleeps, sleep_codes = factorize(columns.get("sleep_time", [None] * n))
+    wake_us, sleep_us = _time_us(wakes)[wake_codes], _time_us(sleeps)[sleep_codes]
+    seconds = (sleep_us - wake_us) // 1_000_000 % 86400
+    out[:, i] = seconds / 3600.0 / 12.0
+
+    slow = np.nonzero((wake_us < 0) | (sleep_us < 0))[0]
+    if slow.size:
+        pairs, inverse = np.unique(wake_codes[slow] * len(sleeps) + sleep_codes[slow], return_inverse=True)
+        windows = [_sleep_window(wakes[p // len(sleeps)], sleeps[p % len(sleeps)]) for p in pairs.tolist()]
+        out[slow, i] = np.array(windows, dtype=np.float64)[inverse.reshape(-1)]
+
+
+# 🏙️ Work hours length
+@static_features.register("work_hours", width=1)
+def write_work_hours(user, out, i):
+    out[i] = _work_hours(user.work_hours)
+
+
+def _work_hours_fast(work_hours):
+    # Strict "HH:MM-HH:MM" (parts may be space-padded); other forms go to the scalar parser
+    start, _, end = (np.char.strip(part) for part in np.char.partition(work_hours, "-").T)
+    start_min, start_ok = parse_hhmm(start)
+    end_min, end_ok = parse_hhmm(end)
+    ok = (np.char.count(work_hours, "-") == 1) & start_ok & end_ok
+    return ((end_min - start_min) % 1440) / 60.0 / 16.0, ok
+
+
+@static_features.register_columns("work_hours")
+def write_work_hours_columns(columns, out, i):
+    out[:, i] = encode_column(columns, "work_hours", len(out), _work_hours, text=_work_hours_fast)
+
+# 🌐 Zip Code → Drop for now or use later via SES mapping
+
+
+STATIC_LAYOUT = static_features.compile()
@@ -0,0 +1,237 @@
+# app/utils/group_commit.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import current_app
+from sqlalchemy import bindparam, case, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models import db, User, NudgeLog
+from app.utils.context_codec import pack_context
+from app.utils.context_vector import encode_static_features
+
+# How long the committer keeps collecting writes after the first one arrives
+GROUP_COMMIT_WINDOW = float(os.getenv("KEYRD_GROUP_COMMIT_MS", "4")) / 1000
+GROUP_COMMIT_MAX_BATCH = 512
+
+# Seconds a request waits for its write to commit before giving up
+COMMIT_TIMEOUT = 30
+
+
+class GroupCommitter:
+    """
+    Write-behind for hot insert/upsert paths: writes submitted from many
+    request/worker threads are applied by one committer thread, which
+    collects them for up to `window` seconds and commits them in a single
+    transaction, so N concurrent requests cost one commit (one fsync)
+    instead of N.
+
+    Each submit() returns a Future resolved only after the transaction that
+    contains the write has committed; callers that must not acknowledge
+    before the write is durable wait on it (see write()). Because a batch
+    costs one fsync, the committer's own connection runs SQLite with
+    synchronous=FULL: acknowledged writes survive power loss too.
+
+    If a batch fails, it is rolled back and its writes are retried one
+    transaction each, so one bad write fails only its own Future. If no
+    connection can be opened, the whole batch fails and the next batch
+    reconnects; the committer thread itself keeps running.
+
+    Args:
+        window (float): Seconds to keep collecting after the first write.
+        max_batch (int): Writes per transaction at most.
+    """
+
+    def __init__(self, window: float = GROUP_COMMIT_WINDOW, max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self.app = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+        self.stats = {"writes": 0, "commits": 0, "failed": 0}
+
+    # ───── Lifecycle ─────
+    def start(self, app):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self.app = app
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Commit everything already submitted, then stop the committer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    # ───── Submitting ─────
+    def submit(self, fn, *args) -> Future:
+        """
+        Queue fn(conn, *args) to run inside the next group transaction.
+
+        Returns:
+            Future: fn's return value, set once its transaction has committed.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self.start(self.app or current_app._get_current_object())
+        future = Future()
+        self._queue.put((fn, args, future))
+        return future
+
+    def write(self, fn, *args, timeout: float = COMMIT_TIMEOUT):
+        """submit() and wait until committed (raises fn's exception)."""
+        return self.submit(fn, *args).result(timeout)
+
+    # ───── Committer ─────
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch, stopping = self._collect()
+                if batch:
+                    self._commit(batch)
+                if stopping:
+                    break
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is None:
+            return self._drain_remaining(), True
+        batch = [item]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch + self._drain_remaining(), True
+            batch.append(item)
+        return batch, False
+
+    def _drain_remaining(self):
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is not None:
+                items.append(item)
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed or self._conn.invalidated:
+            self._conn = db.engine.connect()
+            if self._conn.dialect.name == "sqlite":
+                self._conn.exec_driver_sql("PRAGMA synchronous=FULL")
+                self._conn.commit()
+        return self._conn
+
+    def _commit(self, batch):
+        try:
+            conn = self._connection()
+        except Exception as e:
+            self._discard_connection()
+            self.stats["failed"] += len(batch)
+            print(f"[GroupCommit Error] Could not connect: {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        try:
+            with conn.begin():
+                results = [fn(conn, *args) for fn, args, _ in batch]
+        except Exception:
+            # Isolate the failing write(s): one transaction per write
+            for fn, args, future in batch:
+                self._commit_one(conn, fn, args, future)
+            return
+        self.stats["writes"] += len(batch)
+        self.stats["commits"] += 1
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _discard_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _commit_one(self, conn, fn, args, future):
+        try:
+            with conn.begin():
+                result = fn(conn, *args)
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"[GroupCommit Error] {fn.__name__}: {e}")
+            future.set_exception(e)
+            return
+        self.stats["writes"] += 1
+        self.stats["commits"] += 1
+        future.set_result(result)
+
+
+group_commit = GroupCommitter()
+
+
+# ───── Write Operations (run on the committer's connection) ─────
+def insert_nudge_logs(conn, rows):
+    """Bulk-insert NudgeLog rows (dicts of column values)."""
+    if rows:
+        conn.execute(insert(NudgeLog), rows)
+    return len(rows)
+
+
+_upsert_statements = {}
+_store_static_context = (
+    update(User).where(User.id == bindparam("user_id")).values(static_context=bindparam("static_context"))
+)
+
+
+def _upsert_statement(dialect_name, names):
+    """INSERT .. ON CONFLICT(email) DO UPDATE for one set of field names, built once and reused."""
+    key = (dialect_name, names)
+    stmt = _upsert_statements.get(key)
+    if stmt is None:
+        dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+        stmt = dialect_insert(User).values({name: bindparam(name) for name in ("email", "created_at", *names)})
+        updates = {name: stmt.excluded[name] for name in names}
+        if "device_token" in names:
+            updates["device_token_invalid_at"] = case(
+                (User.device_token.is_not_distinct_from(stmt.excluded.device_token), User.device_token_invalid_at),
+                else_=None,
+            )
+        stmt = stmt.on_conflict_do_update(index_elements=[User.email], set_=updates).returning(*User.__table__.columns)
+        _upsert_statements[key] = stmt
+    return stmt
+
+
+def upsert_user(conn, email, fields, created_at):
+    """
+    Insert or update the user with `email` (one INSERT .. ON CONFLICT), then
+    store the static context encoded from the merged row. A changed
+    device_token clears device_token_invalid_at.
+
+    Returns:
+        tuple[int, np.ndarray]: (user id, static context vector)
+    """
+    stmt = _upsert_statement(conn.dialect.name, tuple(sorted(fields)))
+    row = conn.execute(stmt, {"email": email, "created_at": created_at, **fields}).one()
+
+    vector = encode_static_features(row)  # Row exposes the merged columns as attributes
+    conn.execute(_store_static_context, {"user_id": row.id, "static_context": pack_context(vector)})
+    return row.id, vector
@@ -0,0 +1,143 @@
+# app/utils/job_handlers.py
+#
+# Background work moved out of request handlers. Routes enqueue these job
+# kinds on job_queue and return 202; WorkerPool threads run them.
+
+from concurrent.futures import wait
+
+import numpy as np
+
+from app.models import db, User
+from app.state import agent
+from app.utils.context_codec import FEATURE_VERSION, pack_context
+from app.utils.context_vector import build_context_vector, dynamic_feature_matrix, get_static_contexts
+from app.utils.group_commit import group_commit, insert_nudge_logs
+from app.utils.job_queue import LEASE_SECONDS, job_queue
+from app.utils.push_dispatcher import dispatcher
+from app.utils.push_providers import is_retryable
+from app.utils.push_receipts import receipt_tracker
+
+PUSH_NUDGE = "push.nudge"
+PUSH_BATCH = "push.batch"
+ONBOARDING_NUDGE = "onboarding.first_nudge"
+
+# Seconds to wait for push tickets; messages still queued after that are
+# withdrawn and the attempt counts as failed
+TICKET_TIMEOUT = 30
+
+# Messages already being sent can't be withdrawn, and a retry would send them
+# again: their tickets are awaited for as long as the provider's retry policy
+# can take, within the job's lease
+SENDING_TIMEOUT_CAP = LEASE_SECONDS - TICKET_TIMEOUT - 30
+
+
+class RetryableError(Exception):
+    """Raised to make the queue retry a job with backoff."""
+
+
+def _push_and_log(entries):
+    """
+    Queue pushes for (user_id, token, nudge_id, context, title, body) entries,
+    wait for their tickets, and log every decision whose push didn't fail
+    transiently. Users with a transient failure, or whose message was
+    withdrawn unsent after TICKET_TIMEOUT, are returned (nothing logged), so
+    retrying them can never send a push twice.
+    Logs are group-committed with other jobs' and durable before this returns.
+    """
+    futures = {}
+    for i, (user_id, token, nudge_id, _, title, body) in enumerate(entries):
+        if token:
+            futures[i] = dispatcher.enqueue(token, title, body, {"nudge_id": nudge_id})
+
+    _, not_done = wait(futures.values(), timeout=TICKET_TIMEOUT)
+    sending = [future for future in not_done if not future.cancel()]
+    if sending:
+        wait(sending, timeout=min(dispatcher.max_send_seconds(), SENDING_TIMEOUT_CAP))
+
+    failed = set()
+    logs = []
+    for i, (user_id, _, nudge_id, context, _, _) in enumerate(entries):
+        future = futures.get(i)
+        # Withdrawn before sending → safe to retry. Still sending → may be
+        # delivered, so it is logged as sent rather than retried.
+        if future is not None and (future.cancelled() or (future.done() and is_retryable(future.result()))):
+            failed.add(user_id)
+            continue
+        logs.append({
+            "user_id": user_id,
+            "nudge_id": nudge_id,
+            "context_blob": pack_context(context),
+            "context_version": FEATURE_VERSION,
+        })
+
+    group_commit.write(insert_nudge_logs, logs)
+    return failed
+
+
+def _live_token(user):
+    if user.device_token and user.device_token_invalid_at is not None:
+        receipt_tracker.note_skipped()
+        return None
+    return user.device_token
+
+
+def _nudge_one(user_id, title, body_for):
+    user = db.session.get(User, user_id)
+    if user is None:
+        return  # deleted since the job was queued; nothing to retry
+
+    context = build_context_vector(user.id)
+    nudge_id = int(agent.select_action(context))
+    failed = _push_and_log([(user.id, _live_token(user), nudge_id, context, title, body_for(nudge_id))])
+    if failed:
+        raise RetryableError(f"Push to user {user_id} failed transiently")
+
+
+@job_queue.handler(PUSH_NUDGE)
+def push_nudge(payload, job):
+    """Select, send and log one personalized nudge (was inline in POST /push)."""
+    _nudge_one(payload["user_id"], "Today’s Nudge", lambda n: f"Try Nudge #{n + 1} today!")
+
+
+@job_queue.handler(ONBOARDING_NUDGE)
+def onboarding_nudge(payload, job):
+    """First nudge after onboarding (was inline in POST /submit_onboarding)."""
+    _nudge_one(payload["user_id"], "Your First Nudge", lambda n: f"Nudge #{n} is ready for you!")
+
+
+@job_queue.handler(PUSH_BATCH)
+def push_batch(payload, job):
+    """
+    Vectorized selection for many users (was inline in POST /push/batch).
+    Users whose push fails transiently are re-queued as individual
+    push.nudge jobs, so a retry never re-sends to the rest of the batch.
+    """
+    static_contexts = get_static_contexts(payload["user_ids"])
+    found_ids = [uid for uid in dict.fromkeys(payload["user_ids"]) if uid in static_contexts]
+    if not found_ids:
+        return
+
+    contexts = np.hstack([
+        np.stack([static_contexts[uid] for uid in found_ids]),
+        dynamic_feature_matrix(found_ids),
+    ])
+    nudge_ids = agent.select_actions(contexts)
+
+    tokens, invalid = {}, 0
+    rows = db.session.query(User.id, User.device_token, User.device_token_invalid_at).filter(
+        User.id.in_(found_ids)
+    )
+    for user_id, token, invalid_at in rows:
+        if token and invalid_at is not None:
+            invalid += 1
+        elif token:
+            tokens[user_id] = token
+    if invalid:
+        receipt_tracker.note_skipped(invalid)
+
+    failed = _push_and_log([
+        (user_id, tokens.get(user_id), nudge_id, context, "Today’s Nudge", f"Try Nudge #{nudge_id + 1} today!")
+        for user_id, context, nudge_id in zip(found_ids, contexts, nudge_ids.tolist())
+    ])
+    for user_id in failed:
+        job_queue.enqueue(PUSH_NUDGE, {"user_id": user_id}, idempotency_key=f"job-{job.id}-retry-{user_id}")
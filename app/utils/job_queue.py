@@ -0,0 +1,369 @@
+# app/utils/job_queue.py
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+# Durable local job queue
+#
+# A standalone SQLite file (WAL mode), separate from the app database, so
+# queue traffic never contends with app tables and it keeps working if the
+# app database moves to another engine. Several processes may enqueue to and
+# work from the same file.
+#
+#   jobs          queued / running / done rows; done rows are kept for
+#                 IDEMPOTENCY_TTL so a repeated idempotency key is recognised
+#   dead_letters  jobs that exhausted their attempts, with the last error
+#
+# claim() writes a fresh lease token; complete()/fail() only touch the row
+# while it still holds that token, so a worker whose lease expired (and whose
+# job was re-claimed elsewhere) can't overwrite the new attempt's outcome.
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(__file__), "../../instance/jobs.db")
+
+IDEMPOTENCY_TTL = 24 * 3600
+LEASE_SECONDS = 300  # a running job whose worker died is retried after this
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    locked_until REAL,
+    lease TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_due ON jobs (status, run_at);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+class Job:
+    """A claimed job as handed to a handler."""
+
+    __slots__ = ("id", "kind", "payload", "attempts", "max_attempts", "lease")
+
+    def __init__(self, id, kind, payload, attempts, max_attempts, lease=None):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.lease = lease
+
+
+class JobQueue:
+    """
+    SQLite-backed durable queue with idempotency keys, retry with exponential
+    backoff, and a dead-letter table.
+
+    Args:
+        path (str): Queue database file.
+        max_attempts (int): Default attempts before a job is dead-lettered.
+        base_delay (float): First retry delay in seconds (doubles per attempt, with jitter).
+        max_delay (float): Cap on the retry delay.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, max_attempts: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 300.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.handlers = {}
+        self._local = threading.local()
+        self._wake = threading.Condition()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    # ───── Connection ─────
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: durable across app crashes
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+                    if "lease" not in columns:  # queue files created before lease tokens
+                        try:
+                            conn.execute("ALTER TABLE jobs ADD COLUMN lease TEXT")
+                        except sqlite3.OperationalError as e:
+                            if "duplicate column" not in str(e):  # another process migrated first
+                                raise
+                    self._schema_ready = True
+        return conn
+
+    # ───── Handlers ─────
+    def handler(self, kind):
+        """Decorator registering fn(payload, job) as the handler for `kind`."""
+        def register(fn):
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    # ───── Producer ─────
+    def enqueue(self, kind, payload, idempotency_key=None, delay: float = 0.0, max_attempts: int = None):
+        """
+        Persist a job; returns once it is committed.
+
+        Returns:
+            tuple[int, bool]: (job id, created). created is False when a job with
+            the same idempotency key already exists (its id is returned instead).
+        """
+        now = time.time()
+        conn = self._conn()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO jobs (kind, payload, idempotency_key, max_attempts, run_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload), idempotency_key, max_attempts or self.max_attempts, now + delay, now),
+        )
+        if cursor.rowcount == 0:
+            row = conn.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+            return row["id"], False
+
+        with self._wake:
+            self._wake.notify()
+        return cursor.lastrowid, True
+
+    def status(self, job_id):
+        """Job row as a dict ({"status": "dead"} if dead-lettered, None if unknown or purged)."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT id, kind, status, attempts, last_error, created_at, finished_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is not None:
+            return dict(row)
+        row = conn.execute(
+            "SELECT id, kind, attempts, last_error, created_at, failed_at FROM dead_letters WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        return {**dict(row), "status": "dead"} if row is not None else None
+
+    def counts(self):
+        conn = self._conn()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        counts["dead"] = conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        return counts
+
+    # ───── Consumer ─────
+    def claim(self):
+        """Atomically lease the oldest due job (or one whose lease expired); None if idle."""
+        now = time.time()
+        lease = uuid.uuid4().hex
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts, max_attempts FROM jobs "
+                "WHERE (status = 'queued' AND run_at <= ?) OR (status = 'running' AND locked_until < ?) "
+                "ORDER BY run_at LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ?, lease = ? WHERE id = ?",
+                (now + LEASE_SECONDS, lease, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return Job(row["id"], row["kind"], json.loads(row["payload"]), row["attempts"] + 1, row["max_attempts"], lease)
+
+    def complete(self, job):
+        """Mark the job done; False if its lease was lost (the job was re-claimed after expiring)."""
+        updated = self._conn().execute(
+            "UPDATE jobs SET status = 'done', locked_until = NULL, lease = NULL, finished_at = ? "
+            "WHERE id = ? AND lease = ?",
+            (time.time(), job.id, job.lease),
+        ).rowcount
+        if not updated:
+            self._lease_lost(job)
+        return bool(updated)
+
+    def fail(self, job, error):
+        """
+        Schedule a retry with backoff, or dead-letter the job once attempts are
+        exhausted. False if its lease was lost (the new holder decides instead).
+        """
+        now = time.time()
+        conn = self._conn()
+        if job.attempts < job.max_attempts:
+            delay = random.uniform(0.5, 1.0) * min(self.max_delay, self.base_delay * 2 ** (job.attempts - 1))
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'queued', locked_until = NULL, lease = NULL, run_at = ?, last_error = ? "
+                "WHERE id = ? AND lease = ?",
+                (now + delay, error, job.id, job.lease),
+            ).rowcount
+            if not updated:
+                self._lease_lost(job)
+            return bool(updated)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            moved = conn.execute(
+                "INSERT INTO dead_letters (id, kind, payload, idempotency_key, attempts, last_error, created_at, failed_at) "
+                "SELECT id, kind, payload, idempotency_key, attempts, ?, created_at, ? FROM jobs WHERE id = ? AND lease = ?",
+                (error, now, job.id, job.lease),
+            ).rowcount
+            conn.execute("DELETE FROM jobs WHERE id = ? AND lease = ?", (job.id, job.lease))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if not moved:
+            self._lease_lost(job)
+            return False
+        print(f"[JobQueue] Job {job.id} ({job.kind}) dead-lettered after {job.attempts} attempts")
+        return True
+
+    def _lease_lost(self, job):
+        print(f"[JobQueue] Job {job.id} ({job.kind}) attempt {job.attempts} finished after its lease expired; "
+              f"outcome discarded")
+
+    def requeue_dead(self, job_id):
+        """Move a dead-lettered job back to the queue with a fresh attempt budget."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            moved = conn.execute(
+                "INSERT INTO jobs (id, kind, payload, idempotency_key, max_attempts, run_at, created_at) "
+                "SELECT id, kind, payload, idempotency_key, ?, ?, created_at FROM dead_letters WHERE id = ?",
+                (self.max_attempts, time.time(), job_id),
+            ).rowcount
+            conn.execute("DELETE FROM dead_letters WHERE id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return bool(moved)
+
+    def purge(self, older_than: float = IDEMPOTENCY_TTL):
+        """Delete done jobs (and their idempotency keys) finished more than older_than seconds ago."""
+        return self._conn().execute(
+            "DELETE FROM jobs WHERE status = 'done' AND finished_at < ?", (time.time() - older_than,)
+        ).rowcount
+
+    def wait(self, timeout):
+        """Sleep until an in-process enqueue or timeout (other processes are seen on the next poll)."""
+        with self._wake:
+            self._wake.wait(timeout)
+
+
+class WorkerPool:
+    """
+    Threads that claim and run jobs. Handlers run inside an app context.
+    Start several processes on the same queue file for a process pool
+    (scripts/run_job_workers.py).
+
+    Args:
+        queue (JobQueue): Queue to work.
+        app: Flask app, or None for handlers that need no app context.
+        workers (int): Worker threads.
+        poll_interval (float): Idle wait between claims.
+    """
+
+    def __init__(self, queue: JobQueue, app=None, workers: int = 2, poll_interval: float = 0.25):
+        self.queue = queue
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_purge = 0.0
+
+    def start(self):
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self.queue._wake:
+            self.queue._wake.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._maybe_purge()
+                    self.queue.wait(self.poll_interval)
+            except Exception as e:
+                print(f"[JobQueue Error] {e}")
+                self._stop.wait(self.poll_interval)
+
+    def run_once(self):
+        """Claim and run one job; False if none was due."""
+        job = self.queue.claim()
+        if job is None:
+            return False
+
+        handler = self.queue.handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind '{job.kind}'")
+            if self.app is not None:
+                with self.app.app_context():
+                    handler(job.payload, job)
+            else:
+                handler(job.payload, job)
+        except Exception as e:
+            print(f"[JobQueue] Job {job.id} ({job.kind}) attempt {job.attempts} failed: {e}")
+            self.queue.fail(job, "".join(traceback.format_exception_only(type(e), e)).strip())
+        else:
+            self.queue.complete(job)
+        return True
+
+    def drain(self):
+        """Run due jobs on the calling thread until none are left (scripts and tests)."""
+        ran = 0
+        while self.run_once():
+            ran += 1
+        return ran
+
+    def _maybe_purge(self):
+        if time.monotonic() - self._last_purge > 600:
+            self._last_purge = time.monotonic()
+            self.queue.purge()
+
+
+# Process-wide queue; handlers are registered in app/utils/job_handlers.py
+job_queue = JobQueue(os.getenv("KEYRD_JOBS_DB", DEFAULT_QUEUE_PATH))
@@ -0,0 +1,107 @@
+# app/utils/log_archive.py
+
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, MetaData, Table, delete, insert, inspect, select
+
+from app.models import db, NudgeLog
+
+# Rewarded decisions older than this move out of the hot nudge_logs table
+ARCHIVE_AFTER_DAYS = 30
+
+# SQLite caps bound parameters per statement; keep IN (...) lists under it
+IN_CLAUSE_CHUNK = 900
+
+ARCHIVE_PATTERN = re.compile(r"^nudge_logs_(\d{4})_(\d{2})$")
+
+
+def archive_table_name(month: datetime) -> str:
+    return f"nudge_logs_{month.year:04d}_{month.month:02d}"
+
+
+def _month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1)
+
+
+def archived_tables():
+    """Monthly archive table names, oldest first."""
+    return sorted(name for name in inspect(db.engine).get_table_names() if ARCHIVE_PATTERN.match(name))
+
+
+def archive_table(month: datetime) -> Table:
+    """Typed Table for a monthly archive (same columns as nudge_logs, no indexes), created if missing."""
+    table = Table(
+        archive_table_name(month),
+        MetaData(),
+        *[Column(column.name, column.type, primary_key=column.primary_key) for column in NudgeLog.__table__.columns],
+    )
+    conn = db.session.connection()
+    table.create(conn, checkfirst=True)
+
+    # Archives created before newer NudgeLog columns existed
+    present = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in present:
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}')
+    return table
+
+
+def archive_rewarded_logs(before: datetime = None, batch_size: int = 50_000):
+    """
+    Move rewarded NudgeLog rows with timestamp < before into monthly tables
+    (nudge_logs_YYYY_MM, same columns), batch_size rows per transaction.
+    Pending (reward IS NULL) rows always stay in nudge_logs, so feedback
+    lookups never need the archives.
+
+    Args:
+        before (datetime | None): Cutoff (default: ARCHIVE_AFTER_DAYS ago).
+        batch_size (int): Rows moved per transaction.
+
+    Returns:
+        dict: archive table name → rows moved.
+    """
+    before = before or datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    logs = NudgeLog.__table__
+    eligible = (logs.c.reward.is_not(None), logs.c.timestamp < before)
+    columns = [column.name for column in logs.columns]
+    archives = {}
+    moved = {}
+
+    # One pass along the primary key; each batch is split by month. The batch's
+    # ids are locked (Postgres) and both copied and deleted by id, so a row
+    # that becomes eligible meanwhile is never deleted without being archived.
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(logs.c.id, logs.c.timestamp)
+            .where(logs.c.id > last_id, *eligible)
+            .order_by(logs.c.id)
+            .limit(batch_size)
+            .with_for_update()
+        ).all()
+        if not rows:
+            break
+
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(_month_start(row.timestamp), []).append(row.id)
+        for month, ids in sorted(by_month.items()):
+            if month not in archives:
+                archives[month] = archive_table(month)
+            archive = archives[month]
+            for start in range(0, len(ids), IN_CLAUSE_CHUNK):
+                chunk = ids[start:start + IN_CLAUSE_CHUNK]
+                db.session.execute(
+                    insert(archive).from_select(columns, select(*logs.columns).where(logs.c.id.in_(chunk)))
+                )
+                db.session.execute(delete(logs).where(logs.c.id.in_(chunk)))
+            moved[archive.name] = moved.get(archive.name, 0) + len(ids)
+
+        db.session.commit()
+        last_id = rows[-1].id
+
+    if moved:
+        print(f"[LogArchive] Archived {sum(moved.values())} rewarded logs into {len(moved)} monthly tables")
+    return moved
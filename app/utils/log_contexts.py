@@ -0,0 +1,101 @@
+# app/utils/log_contexts.py
+
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import bindparam, null, select, update
+
+from app.models import db, NudgeLog
+from app.utils.context_codec import FEATURE_DIMS, FEATURE_VERSION, pack_context, unpack_contexts
+from app.utils.log_archive import ARCHIVE_PATTERN, archive_table, archived_tables
+
+# JSON lists logged before blobs existed used the version-1 layout
+LEGACY_VERSION = 1
+
+
+def _log_tables():
+    """nudge_logs plus every monthly archive, as typed Tables."""
+    tables = [NudgeLog.__table__]
+    for name in archived_tables():
+        year, month = ARCHIVE_PATTERN.match(name).groups()
+        tables.append(archive_table(datetime(int(year), int(month), 1)))
+    return tables
+
+
+def migrate_json_contexts(batch_size: int = 10_000):
+    """
+    Rewrite legacy JSON context_vector values as packed float32 blobs (with
+    their feature version) in nudge_logs and every archive, batch_size rows
+    per transaction. Rows whose length doesn't match the legacy layout get
+    version 0 so readers never feed them to a model.
+
+    Returns:
+        int: Rows migrated.
+    """
+    migrated = 0
+    for table in _log_tables():
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(context_blob=bindparam("blob"), context_version=bindparam("version"), context_vector=null())
+        )
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, table.c.context_vector)
+                .where(table.c.id > last_id, table.c.context_blob.is_(None), table.c.context_vector.is_not(None))
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            params = [
+                {
+                    "row_id": row_id,
+                    "blob": pack_context(vector),
+                    "version": LEGACY_VERSION if len(vector) == FEATURE_DIMS[LEGACY_VERSION] else 0,
+                }
+                for row_id, vector in rows
+            ]
+            db.session.connection().execute(stmt, params)
+            db.session.commit()
+            migrated += len(rows)
+            last_id = rows[-1].id
+        if migrated:
+            print(f"[LogContexts] Migrated JSON contexts in {table.name} (running total {migrated})")
+    return migrated
+
+
+def load_rewarded_contexts(since: datetime = None, version: int = FEATURE_VERSION, include_archives: bool = True):
+    """
+    Rewarded decisions logged under `version`, for replay and offline
+    evaluation: blobs are joined and read with one np.frombuffer per table.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (arms int64, rewards float64,
+        contexts (n, FEATURE_DIMS[version]) float32).
+    """
+    arms, rewards, contexts = [], [], []
+    tables = _log_tables() if include_archives else [NudgeLog.__table__]
+    for table in tables:
+        query = (
+            select(table.c.nudge_id, table.c.reward, table.c.context_blob)
+            .where(table.c.reward.is_not(None), table.c.context_blob.is_not(None), table.c.context_version == version)
+            .order_by(table.c.id)
+        )
+        if since is not None:
+            query = query.where(table.c.timestamp >= since)
+        rows = db.session.execute(query).all()
+        if not rows:
+            continue
+        arm_col, reward_col, blob_col = zip(*rows)
+        arms.append(np.array(arm_col, dtype=np.int64))
+        rewards.append(np.array(reward_col, dtype=np.float64))
+        contexts.append(unpack_contexts(blob_col, FEATURE_DIMS[version]))
+
+    if not arms:
+        dim = FEATURE_DIMS[version]
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty((0, dim), dtype=np.float32)
+    if len(arms) == 1:
+        return arms[0], rewards[0], contexts[0]
+    return np.concatenate(arms), np.concatenate(rewards), np.concatenate(contexts)
@@ -1,30 +1,22 @@
 # app/utils/push.py
 
-import requests
+from app.utils.push_providers import provider_for, send_one
 
-def send_push_notification(token, title, body):
-    """
-    Sends a push notification using Expo Push API for ExponentPushToken[...] tokens.
+
+def send_push_notification(token, title, body, data_payload=None):
     """
-    if not token or not token.startswith("ExponentPushToken["):
-        return 400, "Invalid Expo push token"
+    Send one push notification synchronously through the shared provider layer
+    (Expo for ExponentPushToken[...] tokens, FCM for registration tokens
+    when a service account is configured). Bulk and
+    per-request sends should go through push_dispatcher instead.
 
-    url = "https://exp.host/--/api/v2/push/send"
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "to": token,
-        "sound": "default",
-        "title": title,
-        "body": body,
-        "priority": "high"
-    }
+    Returns:
+        tuple[int, dict | str]: (status code, {"data": ticket} or error message).
+    """
+    if provider_for(token) is None:
+        return 400, "Missing or unsupported push token"
 
-    try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.status_code, response.json()
-    except requests.exceptions.RequestException as e:
-        return 500, f"Failed to send push notification: {str(e)}"
+    ticket = send_one(token, title, body, data_payload)
+    if ticket.get("status") == "ok":
+        return 200, {"data": ticket}
+    return 500, ticket.get("message", "Failed to send push notification")
@@ -0,0 +1,206 @@
+# app/utils/push_dispatcher.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.utils.push_providers import error_ticket, get_providers, provider_for
+
+
+class PushDispatcher:
+    """
+    Queues push messages and sends them in per-provider batches (100 per Expo
+    request, FCM multicasts for identical notifications) through the shared
+    provider layer, with at most `max_concurrency` requests in flight.
+    enqueue() returns immediately with a Future that resolves to the ticket
+    for that message ({"status": "ok", "id": ...} or
+    {"status": "error", "message": ..., "details": ...}). Cancelling the
+    Future withdraws the message if its batch hasn't started sending;
+    cancel() returns False once it has.
+
+    Listeners added with add_listener(fn) are called as fn(token, ticket) for
+    every message sent; filters added with add_filter(fn) drop a message at
+    enqueue time when fn(token) is true (its Future resolves to an error ticket).
+
+    Args:
+        providers (list[PushProvider] | None): Providers to route tokens to
+            (default: the process-wide Expo + FCM providers).
+        batch_size (int | None): Cap on messages per batch (default: each provider's max_batch).
+        max_concurrency (int): Concurrent HTTP requests.
+        linger (float): Seconds to wait for a batch to fill before sending it.
+    """
+
+    def __init__(self, providers=None, batch_size: int = None, max_concurrency: int = 4, linger: float = 0.05):
+        self.providers = providers
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.linger = linger
+
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = None
+        self._collector = None
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._inflight = []
+        self._listeners = []
+        self._filters = []
+
+    # ───── Public API ─────
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def add_filter(self, fn):
+        self._filters.append(fn)
+
+    def enqueue(self, token, title, body, data=None) -> Future:
+        """Queue one message; never blocks on the network."""
+        future = Future()
+        provider = self._provider_for(token)
+        if provider is None:
+            future.set_result(error_ticket("Missing or unsupported push token"))
+            return future
+        if any(skip(token) for skip in self._filters):
+            future.set_result(error_ticket("Push token marked invalid", "DeviceNotRegistered"))
+            return future
+
+        message = {"to": token, "title": title, "body": body, "data": data or None}
+        self._ensure_started()
+        self._queue.put((provider, message, future))
+        return future
+
+    def enqueue_many(self, messages):
+        """Queue (token, title, body, data) tuples; returns one Future per message."""
+        return [self.enqueue(*message) for message in messages]
+
+    def max_send_seconds(self) -> float:
+        """Upper bound on how long a batch that has started sending takes to resolve its Futures."""
+        providers = self.providers if self.providers is not None else get_providers()
+        return max((p.max_send_seconds(self._limit(p)) for p in providers), default=0.0)
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been sent."""
+        marker = Future()
+        self._ensure_started()
+        self._queue.put((None, None, marker))
+        marker.result(timeout)
+
+    def stop(self):
+        with self._lock:
+            if self._collector is None:
+                return
+            self._stopping = True
+        self._queue.put(None)
+        self._collector.join()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._collector = None
+            self._executor = None
+            self._stopping = False
+
+    # ───── Batching ─────
+    def _ensure_started(self):
+        if self._collector is not None:
+            return
+        with self._lock:
+            if self._collector is None:
+                self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="push")
+                self._collector = threading.Thread(target=self._collect, name="push-collector", daemon=True)
+                self._collector.start()
+
+    def _provider_for(self, token):
+        if self.providers is None:
+            return provider_for(token)
+        return next((p for p in self.providers if p.supports(token)), None)
+
+    def _collect(self):
+        """Group queued messages into per-provider batches; send when full or after `linger`."""
+        batches = {}  # provider -> (deadline, [(message, future), ...])
+        markers = []
+        while True:
+            deadline = min((d for d, _ in batches.values()), default=None)
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            if item is None:  # stop sentinel
+                for provider, (_, batch) in batches.items():
+                    self._submit(provider, batch)
+                self._resolve_markers(markers)
+                return
+            if item is not False:
+                provider, message, future = item
+                if message is None:
+                    markers.append(future)
+                else:
+                    batch = batches.setdefault(provider, (time.monotonic() + self.linger, []))[1]
+                    batch.append((message, future))
+
+            now = time.monotonic()
+            flush_all = markers and self._queue.empty()
+            for provider, (due, batch) in list(batches.items()):
+                if flush_all or len(batch) >= self._limit(provider) or now >= due:
+                    self._submit(provider, batch)
+                    del batches[provider]
+            if flush_all:
+                self._resolve_markers(markers)
+                markers = []
+
+    def _limit(self, provider):
+        return min(provider.max_batch, self.batch_size or provider.max_batch)
+
+    def _submit(self, provider, batch):
+        self._slots.acquire()  # bound in-flight requests; backpressure on the collector
+        pending = self._executor.submit(self._send_batch, provider, batch)
+        self._inflight = [f for f in self._inflight if not f.done()] + [pending]
+
+    def _resolve_markers(self, markers):
+        """flush() markers resolve once every batch submitted so far has been sent."""
+        for marker in markers:
+            _resolve_when_done(marker, list(self._inflight))
+
+    def _send_batch(self, provider, batch):
+        try:
+            # Cancelled messages are dropped; the rest can no longer be cancelled
+            batch = [(message, future) for message, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                return
+            try:
+                tickets = provider.send([message for message, _ in batch])
+            except Exception as e:
+                tickets = [error_ticket(f"Failed to send push batch: {e}")] * len(batch)
+            for (message, future), ticket in zip(batch, tickets):
+                future.set_result(ticket)
+                for listener in self._listeners:
+                    try:
+                        listener(message["to"], ticket)
+                    except Exception as e:
+                        print(f"[PushDispatcher] Listener error: {e}")
+        finally:
+            self._slots.release()
+
+
+def _resolve_when_done(marker, pending):
+    """Set marker once every future in pending has finished."""
+    if not pending:
+        marker.set_result(None)
+        return
+    remaining = [len(pending)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            marker.set_result(None)
+
+    for future in pending:
+        future.add_done_callback(done)
+
+
+# Process-wide dispatcher; its threads start on first enqueue
+dispatcher = PushDispatcher()
@@ -0,0 +1,380 @@
+# app/utils/push_providers.py
+#
+# Single push-sending layer for every backend (Expo + FCM HTTP v1).
+# Only depends on the standard library and requests so keyrd_backend/ can load it
+# too; FCM additionally needs google-auth and is skipped without it.
+
+import email.utils
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+EXPO_PUSH_URL = os.getenv("EXPO_PUSH_URL", "https://exp.host/--/api/v2/push/send")
+EXPO_RECEIPTS_URL = os.getenv("EXPO_RECEIPTS_URL", "https://exp.host/--/api/v2/push/getReceipts")
+
+# FCM HTTP v1: service-account OAuth (google-auth, optional); project id defaults to the account's
+FCM_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+FCM_PROJECT_ID = os.getenv("FCM_PROJECT_ID")
+FCM_V1_URL = os.getenv("FCM_V1_URL", "https://fcm.googleapis.com/v1/projects/{project_id}/messages:send")
+FCM_SCOPE = "https://www.googleapis.com/auth/firebase.messaging"
+
+# Registration tokens: "<instance id>:<base64url payload>", ~150+ characters
+FCM_TOKEN_RE = re.compile(r"[\w-]{8,}:[\w-]{100,}")
+
+
+def is_expo_token(token):
+    return bool(token) and token.startswith("ExponentPushToken[")
+
+
+def is_fcm_token(token):
+    return bool(token) and FCM_TOKEN_RE.fullmatch(token) is not None
+
+
+def error_ticket(message, error=None, retryable=False):
+    ticket = {"status": "error", "message": message}
+    if error:
+        ticket["details"] = {"error": error}
+    if retryable:
+        ticket["retryable"] = True  # transient transport failure: worth another attempt later
+    return ticket
+
+
+# Per-message ticket errors worth another attempt (Expo reports these inside an HTTP 200 batch)
+RETRYABLE_ERRORS = {"MessageRateExceeded"}
+
+# Transport failures worth another attempt; anything else (bad URL, 4xx) fails the same way again
+TRANSIENT_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+def is_transient_status(status_code):
+    return status_code == 429 or 500 <= status_code < 600
+
+
+def is_retryable(ticket):
+    if ticket.get("status") != "error":
+        return False
+    return bool(ticket.get("retryable")) or (ticket.get("details") or {}).get("error") in RETRYABLE_ERRORS
+
+
+# ───── Retry / Backoff ─────
+class RetryPolicy:
+    """
+    Shared retry policy: exponential backoff with full jitter, retrying on
+    connection errors and retryable statuses. A Retry-After header (seconds
+    or HTTP date, as sent with 429/503) overrides the computed delay.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 30.0,
+                 retry_statuses=(429, 500, 502, 503, 504), sleep=time.sleep):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = set(retry_statuses)
+        self.sleep = sleep
+
+    def delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                parsed = email.utils.parsedate_to_datetime(retry_after)
+                if parsed is not None:
+                    return min(max(0.0, parsed.timestamp() - time.time()), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def max_total_delay(self):
+        """Longest time call() can spend sleeping between attempts."""
+        return self.max_retries * self.max_delay
+
+    def call(self, request):
+        """Run request() (returning a requests.Response) until it succeeds or retries run out."""
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                response = request()
+            except requests.exceptions.RequestException:
+                if last:
+                    raise
+                self.sleep(self.delay(attempt))
+                continue
+            if response.status_code not in self.retry_statuses or last:
+                return response
+            self.sleep(self.delay(attempt, response))
+
+
+# ───── Providers ─────
+class PushProvider:
+    """
+    Base provider: a pooled keep-alive session plus the shared retry policy.
+
+    Messages are Expo-shaped dicts ({"to", "title", "body", "data"}); each
+    provider translates them and returns one normalized ticket per message:
+    {"status": "ok", "id": ...} or {"status": "error", "message": ...,
+    "details": {"error": "DeviceNotRegistered" | ...}}.
+    """
+
+    name = "base"
+    max_batch = 1
+
+    def __init__(self, retry: RetryPolicy = None, pool_size: int = 10, timeout: float = 10.0):
+        self.retry = retry or RetryPolicy()
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def supports(self, token) -> bool:
+        raise NotImplementedError
+
+    def send(self, messages):
+        raise NotImplementedError
+
+    def max_send_seconds(self, n_messages: int) -> float:
+        """Upper bound on send() of n_messages: every request timing out and retrying with the longest backoff."""
+        per_request = (self.retry.max_retries + 1) * self.timeout + self.retry.max_total_delay()
+        return self._rounds(n_messages) * per_request
+
+    def _rounds(self, n_messages):
+        """Requests send() makes one after another for n_messages."""
+        return -(-n_messages // self.max_batch)
+
+    def send_to_many(self, tokens, title, body, data=None):
+        """Fan one notification out to many tokens; tickets are aligned with tokens."""
+        return self.send([_message(token, title, body, data) for token in tokens])
+
+    def _post(self, url, payload, headers=None):
+        return self.retry.call(
+            lambda: self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+        )
+
+
+class ExpoProvider(PushProvider):
+    """Expo push API: up to 100 messages per request."""
+
+    name = "expo"
+    max_batch = 100
+    max_receipt_batch = 1000
+
+    def __init__(self, url: str = EXPO_PUSH_URL, receipts_url: str = EXPO_RECEIPTS_URL, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.receipts_url = receipts_url
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Content-Type": "application/json",
+        })
+
+    def supports(self, token):
+        return is_expo_token(token)
+
+    def send(self, messages):
+        tickets = []
+        for start in range(0, len(messages), self.max_batch):
+            tickets.extend(self._send_chunk(messages[start:start + self.max_batch]))
+        return tickets
+
+    def _send_chunk(self, messages):
+        payload = [
+            {"sound": "default", "priority": "high", **{k: v for k, v in m.items() if v is not None}}
+            for m in messages
+        ]
+        try:
+            response = self._post(self.url, payload)
+        except requests.exceptions.RequestException as e:
+            failed = error_ticket(f"Failed to send push batch: {e}", retryable=isinstance(e, TRANSIENT_EXCEPTIONS))
+            return [failed] * len(messages)
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text[:200]
+
+        tickets = body.get("data") if isinstance(body, dict) else None
+        if response.status_code != 200 or not isinstance(tickets, list) or len(tickets) != len(messages):
+            errors = body.get("errors") if isinstance(body, dict) else body
+            failed = error_ticket(f"Expo push error {response.status_code}: {errors}",
+                                  retryable=is_transient_status(response.status_code))
+            return [failed] * len(messages)
+        return tickets
+
+    def get_receipts(self, ticket_ids):
+        """
+        Fetch delivery receipts for ticket ids (1000 per request).
+
+        Returns:
+            dict: ticket id → receipt ({"status": "ok"} or {"status": "error", "details": ...}).
+            Ids whose receipts aren't ready yet are absent.
+
+        Raises:
+            requests.exceptions.RequestException: If a request fails after retries.
+        """
+        receipts = {}
+        for start in range(0, len(ticket_ids), self.max_receipt_batch):
+            response = self._post(self.receipts_url, {"ids": ticket_ids[start:start + self.max_receipt_batch]})
+            response.raise_for_status()
+            receipts.update(response.json().get("data") or {})
+        return receipts
+
+
+class FCMProvider(PushProvider):
+    """
+    FCM HTTP v1 API, authorized with an OAuth2 access token minted from the
+    Firebase service account (GOOGLE_APPLICATION_CREDENTIALS). v1 has no
+    multicast, so a batch is sent as concurrent single-message requests over
+    the pooled session.
+    """
+
+    name = "fcm"
+    max_batch = 500
+
+    # v1 error codes meaning the token will never work again
+    DEAD_TOKEN_ERRORS = {"UNREGISTERED", "SENDER_ID_MISMATCH"}
+
+    def __init__(self, project_id: str, credentials, auth_request=None, **kwargs):
+        super().__init__(**kwargs)
+        self.url = FCM_V1_URL.format(project_id=project_id)
+        self.credentials = credentials
+        self.auth_request = auth_request  # google.auth transport used for token refreshes
+        self._token_lock = threading.Lock()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """
+        Provider for the configured service account, or None when FCM isn't
+        configured (no credentials file) or google-auth isn't installed.
+        """
+        if not FCM_CREDENTIALS or not os.path.exists(FCM_CREDENTIALS):
+            return None
+        try:
+            from google.auth.transport.requests import Request
+            from google.oauth2 import service_account
+        except ImportError:
+            print("[Push Providers] google-auth not installed — FCM tokens are unsupported")
+            return None
+        credentials = service_account.Credentials.from_service_account_file(FCM_CREDENTIALS, scopes=[FCM_SCOPE])
+        return cls(FCM_PROJECT_ID or credentials.project_id, credentials, auth_request=Request(), **kwargs)
+
+    def supports(self, token):
+        return is_fcm_token(token)
+
+    def send(self, messages):
+        if len(messages) == 1:
+            return [self._send_one(messages[0])]
+        with ThreadPoolExecutor(max_workers=self.pool_size) as pool:
+            return list(pool.map(self._send_one, messages))
+
+    def _rounds(self, n_messages):
+        return -(-n_messages // self.pool_size)
+
+    def _authorization(self):
+        """Bearer header, refreshing the access token (1 h lifetime) when it has expired."""
+        with self._token_lock:
+            if not self.credentials.valid:
+                self.credentials.refresh(self.auth_request)
+            return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    def _send_one(self, message):
+        data = message.get("data") or {}
+        payload = {"message": {
+            "token": message["to"],
+            "notification": {"title": message.get("title"), "body": message.get("body")},
+            "data": {str(k): v if isinstance(v, str) else json.dumps(v) for k, v in data.items()},  # v1: string values only
+            "android": {"priority": "high", "notification": {"sound": "default"}},
+            "apns": {"payload": {"aps": {"sound": "default"}}},
+        }}
+        try:
+            headers = self._authorization()
+        except Exception as e:
+            return error_ticket(f"FCM authorization failed: {e}")
+        try:
+            response = self._post(self.url, payload, headers)
+        except requests.exceptions.RequestException as e:
+            return error_ticket(f"Failed to send FCM message: {e}", retryable=isinstance(e, TRANSIENT_EXCEPTIONS))
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text[:200]
+
+        if response.status_code == 200 and isinstance(body, dict):
+            return {"status": "ok", "id": body.get("name")}
+        code = _fcm_error_code(body)
+        # Normalize to Expo's code so token pruning handles both providers the same way
+        if code in self.DEAD_TOKEN_ERRORS:
+            code = "DeviceNotRegistered"
+        return error_ticket(f"FCM error {response.status_code}: {body}", code,
+                            retryable=is_transient_status(response.status_code))
+
+
+def _fcm_error_code(body):
+    """FcmError errorCode from a v1 error response (falls back to the google.rpc status)."""
+    error = body.get("error") if isinstance(body, dict) else None
+    if not isinstance(error, dict):
+        return None
+    for detail in error.get("details") or []:
+        if isinstance(detail, dict) and detail.get("errorCode"):
+            return detail["errorCode"]
+    return error.get("status")
+
+
+def _message(token, title, body, data=None):
+    return {"to": token, "title": title, "body": body, "data": data or None}
+
+
+# ───── Registry ─────
+_providers = None
+
+
+def get_providers():
+    """Process-wide provider instances (one connection pool each), created on first use."""
+    global _providers
+    if _providers is None:
+        fcm = FCMProvider.from_env()  # only when a service account is configured
+        _providers = [ExpoProvider()] + ([fcm] if fcm is not None else [])
+    return _providers
+
+
+def provider_for(token):
+    for provider in get_providers():
+        if provider.supports(token):
+            return provider
+    return None
+
+
+def send_to_many(tokens, title, body, data=None):
+    """
+    Send one notification to many tokens of any provider: tokens are grouped per
+    provider and each group is fanned out in as few requests as it allows.
+
+    Returns:
+        list[dict]: One ticket per token, in input order.
+    """
+    tickets = [None] * len(tokens)
+    groups = {}
+    for i, token in enumerate(tokens):
+        provider = provider_for(token)
+        if provider is None:
+            tickets[i] = error_ticket("Missing or unsupported push token")
+        else:
+            groups.setdefault(provider, []).append(i)
+
+    for provider, indices in groups.items():
+        results = provider.send_to_many([tokens[i] for i in indices], title, body, data)
+        for i, ticket in zip(indices, results):
+            tickets[i] = ticket
+    return tickets
+
+
+def send_one(token, title, body, data=None):
+    """Send a single notification; returns its ticket."""
+    return send_to_many([token], title, body, data)[0]
@@ -0,0 +1,232 @@
+# app/utils/push_receipts.py
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.models import db, User
+from app.utils.push_providers import ExpoProvider, get_providers
+
+# Expo makes receipts available ~15 minutes after sending and keeps them for 24 hours
+RECEIPT_DELAY = float(os.getenv("KEYRD_RECEIPT_DELAY", "900"))
+RECEIPT_INTERVAL = float(os.getenv("KEYRD_RECEIPT_INTERVAL", "60"))
+RECEIPT_TTL = 24 * 3600
+
+DEAD_TOKEN_ERROR = "DeviceNotRegistered"
+
+# SQLite caps bound parameters per statement; keep IN (...) lists under it
+IN_CLAUSE_CHUNK = 900
+
+
+def _error_code(result):
+    return (result.get("details") or {}).get("error") if result.get("status") == "error" else None
+
+
+class ReceiptTracker:
+    """
+    Collects push tickets from the dispatcher, polls Expo receipts for them in
+    bulk, and marks tokens that come back DeviceNotRegistered as invalid
+    (users.device_token_invalid_at). That column is the source of truth:
+    every fan-out selects only tokens where it is NULL, and re-registering a
+    token clears it, so all processes agree. The dispatcher filter only
+    covers the gap until this process has written its newly dead tokens.
+    Every skipped send is counted.
+
+    FCM reports dead tokens in the send response itself, so those tickets are
+    acted on immediately; only Expo ticket ids wait for receipts.
+
+    Args:
+        delay (float): Seconds after sending before a receipt is polled.
+        interval (float): Seconds between polling passes.
+        provider (ExpoProvider | None): Receipt source (default: the shared Expo provider).
+    """
+
+    def __init__(self, delay: float = RECEIPT_DELAY, interval: float = RECEIPT_INTERVAL, provider=None):
+        self.delay = delay
+        self.interval = interval
+        self.provider = provider
+        self.app = None
+        self._dispatcher = None
+
+        self._lock = threading.Lock()
+        self._pending = deque()      # (sent_at, ticket_id, token), oldest first
+        self._dead = set()           # tokens this process found dead and hasn't written to users yet
+        self._to_mark = []           # the same tokens, in the order they were found
+        self._stop = threading.Event()
+        self._thread = None
+        self._metrics = {
+            "tickets_ok": 0,
+            "ticket_errors": 0,
+            "receipts_ok": 0,
+            "receipt_errors": 0,
+            "receipts_expired": 0,
+            "tokens_invalidated": 0,
+            "sends_skipped": 0,
+        }
+
+    # ───── Lifecycle ─────
+    def start(self, app, dispatcher=None):
+        """Hook into the dispatcher and start polling."""
+        self.app = app
+        if dispatcher is not None and dispatcher is not self._dispatcher:
+            self._dispatcher = dispatcher
+            dispatcher.add_listener(self.track)
+            dispatcher.add_filter(self.should_skip)
+
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="push-receipts", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._flush_invalid()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[PushReceipts Error] {e}")
+
+    # ───── Ticket Intake ─────
+    def track(self, token, ticket):
+        """Dispatcher listener: remember Expo ticket ids; act on dead-token tickets right away."""
+        code = _error_code(ticket)
+        with self._lock:
+            if ticket.get("status") == "ok":
+                self._metrics["tickets_ok"] += 1
+                if ticket.get("id") and self._receipt_provider().supports(token):
+                    self._pending.append((time.time(), ticket["id"], token))
+            else:
+                self._metrics["ticket_errors"] += 1
+        if code == DEAD_TOKEN_ERROR:
+            self.invalidate(token)
+
+    def should_skip(self, token):
+        """Dispatcher filter: True (and counted) for tokens found dead but not yet marked in users."""
+        with self._lock:
+            if token in self._dead:
+                self._metrics["sends_skipped"] += 1
+                return True
+        return False
+
+    def note_skipped(self, n: int = 1):
+        """Count sends skipped before reaching the dispatcher (e.g. filtered in SQL)."""
+        with self._lock:
+            self._metrics["sends_skipped"] += n
+
+    def invalidate(self, token):
+        with self._lock:
+            if token in self._dead:
+                return
+            self._dead.add(token)
+            self._to_mark.append(token)
+            self._metrics["tokens_invalidated"] += 1
+
+    def revive(self, token):
+        """A token was (re-)registered in this process: stop skipping it and don't mark it invalid."""
+        with self._lock:
+            if token in self._dead:
+                self._dead.discard(token)
+                self._to_mark = [t for t in self._to_mark if t != token]
+
+    def metrics(self):
+        with self._lock:
+            return {**self._metrics, "pending_receipts": len(self._pending), "unmarked_invalid_tokens": len(self._dead)}
+
+    # ───── Polling ─────
+    def _receipt_provider(self):
+        if self.provider is None:
+            self.provider = next(p for p in get_providers() if isinstance(p, ExpoProvider))
+        return self.provider
+
+    def poll(self, now: float = None):
+        """
+        One polling pass: fetch receipts for every ticket older than `delay`,
+        invalidate DeviceNotRegistered tokens, requeue receipts not ready yet,
+        then write newly invalid tokens to users.
+
+        Returns:
+            int: Receipts resolved in this pass.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            due = []
+            while self._pending and self._pending[0][0] <= now - self.delay:
+                due.append(self._pending.popleft())
+
+        resolved = 0
+        if due:
+            try:
+                receipts = self._receipt_provider().get_receipts([ticket_id for _, ticket_id, _ in due])
+            except Exception as e:
+                print(f"[PushReceipts Error] {e}")
+                receipts = None
+
+            retry = []
+            for entry in due:
+                sent_at, ticket_id, token = entry
+                receipt = receipts.get(ticket_id) if receipts is not None else None
+                if receipt is None:
+                    if now - sent_at < RECEIPT_TTL:
+                        retry.append(entry)
+                    else:
+                        with self._lock:
+                            self._metrics["receipts_expired"] += 1
+                    continue
+
+                resolved += 1
+                code = _error_code(receipt)
+                with self._lock:
+                    self._metrics["receipts_ok" if code is None else "receipt_errors"] += 1
+                if code == DEAD_TOKEN_ERROR:
+                    self.invalidate(token)
+
+            with self._lock:
+                # Still-pending receipts go back to the front: they are the oldest
+                self._pending.extendleft(reversed(retry))
+
+        self._flush_invalid()
+        return resolved
+
+    def _flush_invalid(self):
+        """
+        Mark newly invalid tokens in users (only rows still holding that
+        token); from then on the column, not this process, filters them.
+        """
+        with self._lock:
+            tokens, self._to_mark = self._to_mark, []
+        if not tokens or self.app is None:
+            with self._lock:
+                self._to_mark[:0] = tokens
+            return
+
+        try:
+            with self.app.app_context():
+                now = datetime.utcnow()
+                for start in range(0, len(tokens), IN_CLAUSE_CHUNK):
+                    db.session.execute(
+                        update(User)
+                        .where(User.device_token.in_(tokens[start:start + IN_CLAUSE_CHUNK]))
+                        .where(User.device_token_invalid_at.is_(None))
+                        .values(device_token_invalid_at=now)
+                    )
+                db.session.commit()
+            with self._lock:
+                self._dead.difference_update(tokens)
+            print(f"[PushReceipts] Marked {len(tokens)} device tokens invalid")
+        except Exception as e:
+            with self._lock:
+                self._to_mark.extend(tokens)
+            print(f"[PushReceipts Error] {e}")
+
+
+# Process-wide tracker; started from create_app()
+receipt_tracker = ReceiptTracker()
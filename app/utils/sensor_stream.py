@@ -0,0 +1,508 @@
+# app/utils/sensor_stream.py
+
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models import db, SensorAggregate
+
+# A minute with at least this many steps is active; anything less is sedentary
+ACTIVE_STEPS_PER_MINUTE = int(os.getenv("KEYRD_ACTIVE_STEPS_PER_MINUTE", "20"))
+
+# Rolling windows: per-minute steps over SEDENTARY_WINDOW minutes (the
+# sedentary_minutes scale in encode_sensor_data), per-hour heart rate over a day
+MINUTES_PER_HOUR = 60
+SEDENTARY_WINDOW = 600
+RESTING_HR_HOURS = 24
+RESTING_HR_MIN_SAMPLES = 5  # an hour needs this many HR samples to count toward resting HR
+
+# The latest heart rate is reported as unknown once it is this old (seconds)
+HEART_RATE_MAX_AGE = 15 * 60
+
+# Samples outside [now - MAX_SAMPLE_AGE, now + MAX_CLOCK_SKEW] are rejected
+MAX_SAMPLE_AGE = 24 * 3600
+MAX_CLOCK_SKEW = 5 * 60
+
+# In-memory state is flushed to sensor_aggregates every FLUSH_INTERVAL seconds;
+# processes without live state for a user trust a flushed row for STORED_MAX_AGE
+FLUSH_INTERVAL = float(os.getenv("KEYRD_SENSOR_FLUSH_INTERVAL", "60"))
+STORED_MAX_AGE = float(os.getenv("KEYRD_SENSOR_MAX_AGE", "3600"))
+
+SAMPLE_TYPES = ("steps", "heart_rate", "sleep")
+
+# Aggregates, named as encode_sensor_data reads them
+AGGREGATE_FIELDS = (
+    "steps_today", "steps_last_hour", "sedentary_minutes", "heart_rate",
+    "resting_hr", "max_hr", "total_sleep_minutes", "sleep_efficiency",
+)
+
+
+class UserSensorState:
+    """
+    Rolling sensor aggregates for one user, kept current as samples arrive so
+    reading them never touches raw samples:
+
+    - steps per minute in a SEDENTARY_WINDOW-slot ring buffer, with running
+      totals for the last hour's steps and the window's active minutes;
+    - heart-rate sums/counts per hour in a RESTING_HR_HOURS-slot ring
+      (resting HR = lowest hourly mean with enough samples);
+    - today's steps and max HR (reset at local midnight), the latest heart
+      rate, and the latest sleep summary.
+
+    Ring slots are cleared lazily as time advances (by samples or reads), so
+    each sample costs O(1) amortized. Not thread-safe: SensorAggregator
+    serializes access.
+
+    Retried uploads are idempotent: each minute (steps) and hour (heart rate)
+    slot remembers the newest sample timestamp folded in, and older or equal
+    ones are dropped. Step samples older than the ring count toward
+    steps_today only if newer than `steps_through`, the newest step already
+    counted that has left the ring (or was counted before a restart, see seed).
+
+    Args:
+        minute (int): Epoch minute of the first sample.
+        utc_offset (int): User's UTC offset in seconds (for "today").
+    """
+
+    def __init__(self, minute: int, utc_offset: int = 0):
+        self.utc_offset = utc_offset
+
+        self.steps = np.zeros(SEDENTARY_WINDOW, dtype=np.int64)
+        self.step_ts = np.zeros(SEDENTARY_WINDOW)  # newest sample ts folded into each minute slot
+        self.steps_through = 0.0   # step samples at or before this ts outside the ring are already counted
+        self.minute = minute       # newest minute the ring covers
+        self.first_minute = None   # oldest minute with step data (caps sedentary_minutes)
+        self.hour_steps = 0
+        self.active_minutes = 0
+
+        self.hr_sum = np.zeros(RESTING_HR_HOURS)
+        self.hr_count = np.zeros(RESTING_HR_HOURS, dtype=np.int64)
+        self.hr_ts = np.zeros(RESTING_HR_HOURS)  # newest sample ts folded into each hour slot
+        self.hour = minute // MINUTES_PER_HOUR
+
+        self.day = self._local_day(minute * 60)
+        self.steps_today = 0
+        self.max_hr = None
+        self.heart_rate = None
+        self.heart_rate_at = None
+        self.sleep = None  # (ts, total minutes, efficiency %)
+        self.updated_at = None  # when the last batch was ingested
+        self.seeded = None  # (ts, stored aggregates) carried over from sensor_aggregates, see seed()
+        self.seeded_day = None  # local day the seeded steps_today belongs to
+
+    def _local_day(self, ts):
+        return (ts + self.utc_offset) // 86400
+
+    def seed(self, stored: dict, stored_at: float):
+        """
+        Carry over aggregates flushed before a restart (a sensor_aggregates row
+        written at stored_at), so the first flush after it doesn't overwrite
+        them with partial values: steps_today and max_hr if still today, the
+        latest heart rate and sleep summary, and resting HR / step windows as
+        fallbacks until new samples cover them. Step samples at or before the
+        row's steps_through were already counted and are dropped.
+        """
+        if self._local_day(int(stored_at)) == self.day:
+            if stored["steps_today"] is not None:
+                self.steps_today = int(stored["steps_today"])
+                self.seeded_day = self.day
+            self.max_hr = stored["max_hr"]
+        if stored["heart_rate"] is not None:
+            self.heart_rate, self.heart_rate_at = stored["heart_rate"], stored_at
+        if stored["total_sleep_minutes"] is not None:
+            self.sleep = (stored_at, stored["total_sleep_minutes"], stored["sleep_efficiency"])
+        self.steps_through = float(stored.get("steps_through") or stored_at)
+        self.seeded = (stored_at, stored)
+
+    @property
+    def counted_through(self) -> float:
+        """Newest step sample timestamp counted so far (persisted as steps_through)."""
+        return max(self.steps_through, float(self.step_ts.max()))
+
+    # ───── Window Maintenance ─────
+    def _advance_minutes(self, minute: int):
+        """Move the step ring forward to `minute`, dropping minutes that leave either window."""
+        gap = minute - self.minute
+        if gap <= 0:
+            return
+        if gap >= SEDENTARY_WINDOW:
+            self.steps_through = max(self.steps_through, float(self.step_ts.max()))
+            self.steps[:] = 0
+            self.step_ts[:] = 0.0
+            self.hour_steps = 0
+            self.active_minutes = 0
+        else:
+            if gap >= MINUTES_PER_HOUR:
+                self.hour_steps = 0
+            else:
+                leaving = np.arange(self.minute - MINUTES_PER_HOUR + 1, minute - MINUTES_PER_HOUR + 1)
+                self.hour_steps -= int(self.steps[leaving % SEDENTARY_WINDOW].sum())
+            # New minutes reuse the slots of minutes that just left the window
+            reused = np.arange(self.minute + 1, minute + 1) % SEDENTARY_WINDOW
+            self.active_minutes -= int((self.steps[reused] >= ACTIVE_STEPS_PER_MINUTE).sum())
+            self.steps_through = max(self.steps_through, float(self.step_ts[reused].max()))
+            self.steps[reused] = 0
+            self.step_ts[reused] = 0.0
+        self.minute = minute
+
+    def _advance_hours(self, hour: int):
+        gap = hour - self.hour
+        if gap <= 0:
+            return
+        reused = np.arange(self.hour + 1, self.hour + 1 + min(gap, RESTING_HR_HOURS)) % RESTING_HR_HOURS
+        self.hr_sum[reused] = 0.0
+        self.hr_count[reused] = 0
+        self.hr_ts[reused] = 0.0
+        self.hour = hour
+
+    def _roll_day(self, ts):
+        day = self._local_day(ts)
+        if day > self.day:
+            self.day = day
+            self.steps_today = 0
+            self.max_hr = None
+
+    # ───── Samples ─────
+    def add_steps(self, ts: np.ndarray, counts: np.ndarray):
+        """Fold step samples (epoch seconds, steps counted in the minute ending at ts) in; repeats are dropped."""
+        ts, first = np.unique(ts, return_index=True)
+        counts = counts[first]
+        minutes = ts.astype(np.int64) // 60
+        self._advance_minutes(int(minutes.max()))
+        self._roll_day(int(ts.max()))
+
+        in_window = minutes > self.minute - SEDENTARY_WINDOW
+        slots = minutes % SEDENTARY_WINDOW
+        new = (ts > self.steps_through) & (~in_window | (ts > self.step_ts[slots]))
+        if not new.any():
+            return
+        ts, counts, minutes, slots, in_window = ts[new], counts[new], minutes[new], slots[new], in_window[new]
+
+        if in_window.any():
+            minutes, window_counts, slots = minutes[in_window], counts[in_window], slots[in_window]
+            earliest = int(minutes.min())
+            self.first_minute = earliest if self.first_minute is None else min(self.first_minute, earliest)
+            touched = np.unique(slots)
+            was_active = self.steps[touched] >= ACTIVE_STEPS_PER_MINUTE
+            np.add.at(self.steps, slots, window_counts)
+            np.maximum.at(self.step_ts, slots, ts[in_window])
+            self.active_minutes += int(((self.steps[touched] >= ACTIVE_STEPS_PER_MINUTE) & ~was_active).sum())
+            self.hour_steps += int(window_counts[minutes > self.minute - MINUTES_PER_HOUR].sum())
+        if not in_window.all():
+            self.steps_through = max(self.steps_through, float(ts[~in_window].max()))
+
+        self.steps_today += int(counts[self._local_day(ts.astype(np.int64)) == self.day].sum())
+
+    def add_heart_rate(self, ts: np.ndarray, bpm: np.ndarray):
+        """Fold heart-rate samples (epoch seconds, beats per minute) in; repeats are dropped."""
+        ts, first = np.unique(ts, return_index=True)
+        bpm = bpm[first]
+        hours = ts.astype(np.int64) // 3600
+        self._advance_hours(int(hours.max()))
+        self._roll_day(int(ts.max()))
+
+        in_window = hours > self.hour - RESTING_HR_HOURS
+        slots = hours % RESTING_HR_HOURS
+        in_window &= ts > self.hr_ts[slots]
+        slots = slots[in_window]
+        np.add.at(self.hr_sum, slots, bpm[in_window])
+        np.add.at(self.hr_count, slots, 1)
+        np.maximum.at(self.hr_ts, slots, ts[in_window])
+
+        latest = int(ts.argmax())
+        if self.heart_rate_at is None or ts[latest] >= self.heart_rate_at:
+            self.heart_rate, self.heart_rate_at = float(bpm[latest]), float(ts[latest])
+
+        today = self._local_day(ts.astype(np.int64)) == self.day
+        if today.any():
+            peak = float(bpm[today].max())
+            self.max_hr = peak if self.max_hr is None else max(self.max_hr, peak)
+
+    def add_sleep(self, ts: float, minutes: float, efficiency):
+        """Keep the most recent sleep summary (total minutes asleep, efficiency %)."""
+        if self.sleep is None or ts >= self.sleep[0]:
+            self.sleep = (ts, minutes, efficiency)
+
+    # ───── Reads ─────
+    def snapshot(self, now: float) -> dict:
+        """Current aggregates as of `now` (None → unknown); O(window) at most, no raw samples."""
+        minute = int(now // 60)
+        self._advance_minutes(minute)
+        self._advance_hours(minute // MINUTES_PER_HOUR)
+        self._roll_day(int(now))
+
+        has_steps = self.first_minute is not None
+        observed = min(SEDENTARY_WINDOW, self.minute - self.first_minute + 1) if has_steps else 0
+        rested = self.hr_count >= RESTING_HR_MIN_SAMPLES
+        resting_hr = float((self.hr_sum[rested] / self.hr_count[rested]).min()) if rested.any() else None
+        fresh_hr = self.heart_rate_at is not None and now - self.heart_rate_at <= HEART_RATE_MAX_AGE
+        steps_last_hour = self.hour_steps if has_steps else None
+        sedentary_minutes = observed - self.active_minutes if has_steps else None
+
+        if self.seeded is not None:
+            # Windows the ring can't rebuild: use the flushed values while they still apply
+            seeded_at, stored = self.seeded
+            if stored["steps_last_hour"] is not None and now - seeded_at < MINUTES_PER_HOUR * 60:
+                steps_last_hour = (steps_last_hour or 0) + stored["steps_last_hour"]
+            if sedentary_minutes is None and now - seeded_at < SEDENTARY_WINDOW * 60:
+                sedentary_minutes = stored["sedentary_minutes"]
+            if resting_hr is None and now - seeded_at < RESTING_HR_HOURS * 3600:
+                resting_hr = stored["resting_hr"]
+
+        return {
+            "steps_today": self.steps_today if has_steps or self.seeded_day == self.day else None,
+            "steps_last_hour": steps_last_hour,
+            "sedentary_minutes": sedentary_minutes,
+            "heart_rate": self.heart_rate if fresh_hr else None,
+            "resting_hr": resting_hr,
+            "max_hr": self.max_hr,
+            "total_sleep_minutes": self.sleep[1] if self.sleep else None,
+            "sleep_efficiency": self.sleep[2] if self.sleep else None,
+        }
+
+
+def _parse_samples(samples, now):
+    """Split raw sample dicts into per-type arrays; returns (by_type, rejected)."""
+    columns = {kind: ([], [], []) for kind in SAMPLE_TYPES}
+    rejected = 0
+    for sample in samples:
+        try:
+            kind = sample["type"]
+            ts = float(sample["ts"])
+            value = float(sample["value"])
+            extra = sample.get("efficiency")
+            extra = None if extra is None else float(extra)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            rejected += 1
+            continue
+        if (
+            kind not in columns
+            or not (math.isfinite(ts) and math.isfinite(value)) or value < 0
+            or not (now - MAX_SAMPLE_AGE <= ts <= now + MAX_CLOCK_SKEW)
+        ):
+            rejected += 1
+            continue
+        ts_col, value_col, extra_col = columns[kind]
+        ts_col.append(ts)
+        value_col.append(value)
+        extra_col.append(extra)
+    return columns, rejected
+
+
+class SensorAggregator:
+    """
+    Per-user rolling sensor aggregates for this process (UserSensorState),
+    fed by batched uploads and flushed to sensor_aggregates by a background
+    thread every `interval` seconds (only users with new samples).
+
+    current()/current_many() return the live aggregates when this process
+    holds the user's state, otherwise the last flushed row (if younger than
+    `max_age`). A user's first batch in this process seeds their state from
+    that row (UserSensorState.seed), so a restart doesn't reset today's
+    totals. Route a user's uploads to one process (or run ingestion in one)
+    so their windows aren't split across workers.
+
+    Args:
+        interval (float): Seconds between flushes.
+        max_age (float): Seconds a flushed row stays usable without live state.
+    """
+
+    def __init__(self, interval: float = FLUSH_INTERVAL, max_age: float = STORED_MAX_AGE):
+        self.interval = interval
+        self.max_age = max_age
+        self.app = None
+        self._states = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._metrics = {"batches": 0, "samples": 0, "rejected": 0, "flushes": 0, "rows_flushed": 0, "evicted": 0}
+
+    # ───── Lifecycle ─────
+    def start(self, app):
+        self.app = app
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sensor-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write whatever is still dirty."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[SensorStream Error] {e}")
+
+    # ───── Ingestion ─────
+    def ingest(self, user_id: int, samples, utc_offset_minutes: int = 0, now: float = None):
+        """
+        Fold a batch of samples into the user's rolling aggregates.
+
+        Args:
+            user_id (int): Owner of the samples.
+            samples (list[dict]): {"type": "steps" | "heart_rate" | "sleep",
+                "ts": epoch seconds, "value": number, "efficiency": % (sleep only)}.
+            utc_offset_minutes (int): User's current UTC offset (for "today").
+            now (float | None): Current epoch seconds (default: time.time()).
+
+        Returns:
+            tuple[int, int]: (accepted, rejected) sample counts.
+        """
+        now = time.time() if now is None else now
+        columns, rejected = _parse_samples(samples, now)
+        accepted = sum(len(ts) for ts, _, _ in columns.values())
+        stored = self._stored(user_id, now) if accepted and self.app is not None and not self.has_user(user_id) else None
+
+        with self._lock:
+            self._metrics["batches"] += 1
+            self._metrics["samples"] += accepted
+            self._metrics["rejected"] += rejected
+            if not accepted:
+                return accepted, rejected
+
+            state = self._states.get(user_id)
+            if state is None:
+                first = min(min(ts) for ts, _, _ in columns.values() if ts)
+                state = self._states[user_id] = UserSensorState(int(first // 60), int(utc_offset_minutes) * 60)
+                if stored is not None:
+                    state.seed(*stored)
+            state.utc_offset = int(utc_offset_minutes) * 60
+
+            ts, steps, _ = columns["steps"]
+            if ts:
+                state.add_steps(np.array(ts), np.array(steps, dtype=np.int64))
+            ts, bpm, _ = columns["heart_rate"]
+            if ts:
+                state.add_heart_rate(np.array(ts), np.array(bpm))
+            for ts, minutes, efficiency in zip(*columns["sleep"]):
+                state.add_sleep(ts, minutes, efficiency)
+            state.updated_at = now
+            self._dirty.add(user_id)
+        return accepted, rejected
+
+    def _stored(self, user_id, now):
+        """(aggregates, updated_at epoch seconds) of the user's flushed row if younger than max_age, else None."""
+        with self.app.app_context():
+            row = db.session.get(SensorAggregate, user_id)
+            if row is None:
+                return None
+            stored_at = row.updated_at.replace(tzinfo=timezone.utc).timestamp()
+            if now - stored_at > self.max_age:
+                return None
+            return {field: getattr(row, field) for field in (*AGGREGATE_FIELDS, "steps_through")}, stored_at
+
+    def has_user(self, user_id) -> bool:
+        with self._lock:
+            return user_id in self._states
+
+    # ───── Reads ─────
+    def current(self, user_id: int, now: float = None) -> dict:
+        """Current aggregates for one user (field → value or None); see current_many."""
+        return self.current_many([user_id], now)[user_id]
+
+    def current_many(self, user_ids, now: float = None) -> dict:
+        """
+        Current aggregates per user id: live state for users this process
+        holds (O(1) each), one query against sensor_aggregates for the rest.
+        Needs an app context when some users aren't live.
+
+        Returns:
+            dict: user_id → {field: value or None} (all None when nothing is known).
+        """
+        now = time.time() if now is None else now
+        found, misses = {}, []
+        with self._lock:
+            for user_id in user_ids:
+                state = self._states.get(user_id)
+                if state is None:
+                    misses.append(user_id)
+                else:
+                    found[user_id] = state.snapshot(now)
+
+        if misses:
+            cutoff = datetime.utcfromtimestamp(now - self.max_age)
+            rows = db.session.execute(
+                select(SensorAggregate)
+                .where(SensorAggregate.user_id.in_(misses))
+                .where(SensorAggregate.updated_at >= cutoff)
+            ).scalars()
+            for row in rows:
+                found[row.user_id] = {field: getattr(row, field) for field in AGGREGATE_FIELDS}
+            for user_id in misses:
+                found.setdefault(user_id, dict.fromkeys(AGGREGATE_FIELDS))
+        return found
+
+    def metrics(self):
+        with self._lock:
+            return {**self._metrics, "live_users": len(self._states), "dirty_users": len(self._dirty)}
+
+    # ───── Flushing ─────
+    def flush(self, now: float = None) -> int:
+        """
+        Upsert the aggregates of users with new samples into sensor_aggregates
+        (one statement, one transaction), then drop states idle for longer
+        than MAX_SAMPLE_AGE (their windows have emptied).
+
+        Returns:
+            int: Rows written.
+        """
+        now = time.time() if now is None else now
+        updated_at = datetime.utcfromtimestamp(now)
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = [
+                {
+                    "user_id": user_id,
+                    **self._states[user_id].snapshot(now),
+                    "steps_through": self._states[user_id].counted_through,
+                    "updated_at": updated_at,
+                }
+                for user_id in dirty
+            ]
+            idle = [user_id for user_id, state in self._states.items()
+                    if now - state.updated_at > MAX_SAMPLE_AGE and user_id not in dirty]
+            for user_id in idle:
+                del self._states[user_id]
+            self._metrics["evicted"] += len(idle)
+
+        if rows and self.app is not None:
+            try:
+                with self.app.app_context():
+                    db.session.execute(_upsert_statement(db.engine.dialect.name), rows)
+                    db.session.commit()
+            except Exception as e:
+                with self._lock:
+                    self._dirty |= dirty
+                print(f"[SensorStream Error] Flush of {len(rows)} users failed: {e}")
+                return 0
+            with self._lock:
+                self._metrics["flushes"] += 1
+                self._metrics["rows_flushed"] += len(rows)
+        return len(rows)
+
+
+def _upsert_statement(dialect_name):
+    """INSERT .. ON CONFLICT(user_id) DO UPDATE for sensor_aggregates rows."""
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(SensorAggregate)
+    return stmt.on_conflict_do_update(
+        index_elements=[SensorAggregate.user_id],
+        set_={name: stmt.excluded[name] for name in (*AGGREGATE_FIELDS, "steps_through", "updated_at")},
+    )
+
+
+# Process-wide aggregator; started from create_app()
+sensor_aggregator = SensorAggregator()
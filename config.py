@@ -1,5 +1,17 @@
 import os
 
+DEFAULT_DATABASE_URI = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'instance', 'keyrd.db')}"
+
+
+def database_uri():
+    """DATABASE_URL if set (sqlite:///… or postgresql://…), else instance/keyrd.db."""
+    url = os.getenv("DATABASE_URL") or DEFAULT_DATABASE_URI
+    # Heroku/Render style URLs; SQLAlchemy only accepts the postgresql scheme
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
 class Config:
-    SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'instance', 'keyrd.db')}"
+    SQLALCHEMY_DATABASE_URI = database_uri()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
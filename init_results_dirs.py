@@ -1,7 +1,7 @@
 import os
 
 def create_results_structure(base_dir="results"):
-    subdirs = ["resilient", "stress_eater", "fatigue_sensitive"]
+    subdirs = ["fitness_junkie", "resilient", "stress_eater", "fatigue_sensitive"]  # simulation/profiles.py
 
     # Create base directory if it doesn't exist
     if not os.path.exists(base_dir):
@@ -1,15 +1,22 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import requests
-import sqlite3
+import importlib.util
 import os
 
-from utils.register import save_device_token  # Preserves your current logic
+from utils.register import token_store
 
 app = Flask(__name__)
 CORS(app)
 
-EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+# Shared push provider layer (app/utils/push_providers.py). This service is
+# deployed from keyrd_backend/ and its own module is named "app", so the file
+# is loaded by path instead of via the main package.
+_spec = importlib.util.spec_from_file_location(
+    "keyrd_push_providers",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "utils", "push_providers.py"),
+)
+push_providers = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(push_providers)
 
 @app.route("/")
 def index():
@@ -25,21 +32,10 @@ def register_push_token():
     if not user_id or not token:
         return jsonify({"error": "Missing user_id or token"}), 400
 
-    # Save using your existing logic
-    save_device_token(user_id, token)
+    # One upsert on the (user_id, token) unique index; re-registering just refreshes it
+    created = token_store.save(user_id, token)
 
-    # Optionally persist in local SQLite (dev only)
-    try:
-        conn = sqlite3.connect("tokens.db")
-        cursor = conn.cursor()
-        cursor.execute("CREATE TABLE IF NOT EXISTS tokens (user_id TEXT, token TEXT)")
-        cursor.execute("INSERT INTO tokens (user_id, token) VALUES (?, ?)", (user_id, token))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"⚠️ SQLite error: {e}")
-
-    return jsonify({"success": True, "message": "Token registered."})
+    return jsonify({"success": True, "message": "Token registered." if created else "Token refreshed."})
 
 
 # === Send a test push notification ===
@@ -52,24 +48,10 @@ def send_test_push():
     if not expo_token:
         return jsonify({"error": "Missing expo_token"}), 400
 
-    payload = {
-        "to": expo_token,
-        "sound": "default",
-        "title": "KeyRD Alert",
-        "body": message,
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
-
-    try:
-        response = requests.post(EXPO_PUSH_URL, json=payload, headers=headers)
-        response.raise_for_status()
-        return jsonify({"success": True, "response": response.json()})
-    except requests.exceptions.RequestException as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+    ticket = push_providers.send_one(expo_token, "KeyRD Alert", message)
+    if ticket.get("status") == "ok":
+        return jsonify({"success": True, "response": {"data": ticket}})
+    return jsonify({"success": False, "error": ticket.get("message")}), 500
 
 
 if __name__ == "__main__":
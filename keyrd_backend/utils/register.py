@@ -1,17 +1,125 @@
 import json
 import os
+import sqlite3
+import threading
+import time
 
-def save_device_token(user_id, token):
-    filepath = os.path.join(os.path.dirname(__file__), '..', 'device_tokens.json')
-    if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-    else:
-        data = {}
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+TOKENS_DB = os.getenv("KEYRD_TOKENS_DB", os.path.join(BASE_DIR, 'tokens.db'))
+
+# Registry formats this store replaces; imported once, then retired
+LEGACY_JSON = os.path.join(BASE_DIR, 'device_tokens.json')
+LEGACY_TABLE = "tokens"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS device_tokens (
+    user_id    TEXT NOT NULL,
+    token      TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_device_tokens_user_token ON device_tokens (user_id, token);
+"""
+
+UPSERT = """
+INSERT INTO device_tokens (user_id, token, created_at, updated_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (user_id, token) DO UPDATE SET updated_at = excluded.updated_at
+"""
+
+
+class TokenStore:
+    """
+    Device push tokens in SQLite, one row per (user_id, token) under a unique
+    index. A registration is a single upsert statement, so it costs one
+    index probe whatever the registry size, never duplicates a row, and is
+    atomic under concurrent requests (WAL + busy_timeout serialize writers).
+    Connections are opened once per thread and reused.
+    """
+
+    def __init__(self, path=TOKENS_DB):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._import_legacy(conn)
+                    self._schema_ready = True
+        return conn
 
-    data[str(user_id)] = token
+    def _import_legacy(self, conn):
+        """
+        Fold device_tokens.json and the old duplicate-prone `tokens` table into
+        device_tokens. The JSON file is retired while the write lock is held, so
+        concurrent workers import it exactly once and never race on the rename.
+        """
+        now = time.time()
+        retired = False
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (LEGACY_TABLE,)).fetchone():
+                conn.execute(
+                    f"INSERT OR IGNORE INTO device_tokens (user_id, token, created_at, updated_at) "
+                    f"SELECT DISTINCT user_id, token, ?, ? FROM {LEGACY_TABLE} "
+                    f"WHERE user_id IS NOT NULL AND token IS NOT NULL",
+                    (now, now),
+                )
+                conn.execute(f"DROP TABLE {LEGACY_TABLE}")
+            try:
+                with open(LEGACY_JSON, 'r') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                data = None  # never existed, or another worker already imported it
+            if data is not None:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO device_tokens (user_id, token, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    [(str(user_id), token, now, now) for user_id, token in data.items() if token],
+                )
+                os.replace(LEGACY_JSON, LEGACY_JSON + ".imported")
+                retired = True
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            if retired:  # import rolled back: put the file back for the next attempt
+                os.replace(LEGACY_JSON + ".imported", LEGACY_JSON)
+            raise
+        if retired:
+            print(f"[TokenStore] Imported {LEGACY_JSON}")
 
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
+    def save(self, user_id, token):
+        """Register (or refresh) a user's token. Returns True if it was new."""
+        now = time.time()
+        cursor = self._conn().execute(UPSERT + " RETURNING created_at", (str(user_id), token, now, now))
+        created_at = cursor.fetchone()[0]
+        return created_at == now
 
+    def tokens_for(self, user_id):
+        """The user's tokens, most recently registered first."""
+        rows = self._conn().execute(
+            "SELECT token FROM device_tokens WHERE user_id = ? ORDER BY updated_at DESC", (str(user_id),)
+        )
+        return [token for (token,) in rows]
+
+    def remove(self, user_id, token):
+        self._conn().execute("DELETE FROM device_tokens WHERE user_id = ? AND token = ?", (str(user_id), token))
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM device_tokens").fetchone()[0]
+
+
+token_store = TokenStore()
+
+
+def save_device_token(user_id, token):
+    token_store.save(user_id, token)
     return True
@@ -0,0 +1,33 @@
+# scripts/archive_nudge_logs.py
+"""
+Move rewarded nudge logs older than --days into monthly nudge_logs_YYYY_MM
+tables. Safe to run repeatedly (e.g. nightly from cron).
+
+    python scripts/archive_nudge_logs.py --days 30
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("KEYRD_JOB_WORKERS", "0")
+os.environ.setdefault("KEYRD_RECEIPTS", "0")
+
+from app import create_app
+from app.utils.log_archive import ARCHIVE_AFTER_DAYS, archive_rewarded_logs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        moved = archive_rewarded_logs(datetime.utcnow() - timedelta(days=args.days))
+    for table, count in sorted(moved.items()):
+        print(f"✅ {table}: {count} rows")
+    if not moved:
+        print("✅ Nothing to archive")
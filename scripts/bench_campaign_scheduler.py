@@ -0,0 +1,98 @@
+# scripts/bench_campaign_scheduler.py
+"""
+Simulate one day of wake-time campaigns for N users against the stub Expo
+server: wheel rebuild time, then every minute slot drained in order.
+
+    python scripts/bench_campaign_scheduler.py --users 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+
+from stub_expo_server import SEND_PATH, start_stub
+
+ZONES = [None, "America/New_York", "America/Chicago", "America/Denver", "America/Los_Angeles", "Europe/London"]
+
+
+def main(n_users, seed=0):
+    server, base_url = start_stub()
+    os.environ["EXPO_PUSH_URL"] = base_url + SEND_PATH
+    os.environ["KEYRD_RECEIPTS"] = "0"
+    os.environ["KEYRD_JOURNAL"] = "0"
+    os.environ["KEYRD_DEFAULT_TZ"] = "UTC"  # ZONES includes users who never sent a timezone
+    # Every state path the app reads at import time goes to the scratch dir, not instance/
+    workdir = tempfile.mkdtemp(prefix="keyrd_bench_")
+    os.environ["KEYRD_MODEL_PATH"] = os.path.join(workdir, "linucb_model.bin")
+    os.environ["KEYRD_JOURNAL_DIR"] = os.path.join(workdir, "journal")
+    os.environ["KEYRD_JOBS_DB"] = os.path.join(workdir, "jobs.db")
+    os.environ["KEYRD_AGENT_SEGMENT"] = os.path.join(workdir, "keyrd_linucb.seg")
+
+    import config
+    config.Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    from app import create_app
+    from app.models import db, User
+    from app.utils.campaign_scheduler import CampaignScheduler
+    from app.utils.push_dispatcher import dispatcher
+
+    app = create_app()
+    rng = np.random.default_rng(seed)
+    wake = rng.integers(5 * 60, 10 * 60, n_users)
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {
+                "email": f"bench{i}@example.com",
+                "device_token": f"ExponentPushToken[bench{i}]",
+                "age": int(rng.integers(18, 80)),
+                "goal_type": "more_energy",
+                "wake_time": datetime(2000, 1, 1, int(w // 60), int(w % 60)).time(),
+                "sleep_time": datetime(2000, 1, 1, 22, 30).time(),
+                "work_hours": "09:00-17:00",
+                "timezone": ZONES[i % len(ZONES)],
+            }
+            for i, w in enumerate(wake.tolist())
+        ])
+        db.session.commit()
+
+    scheduler = CampaignScheduler(app, dispatcher)
+    day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    start = time.perf_counter()
+    scheduler.rebuild(day)
+    rebuild = time.perf_counter() - start
+    scheduler._next_rebuild = float("inf")
+
+    busiest = max(len(slot) for slot in scheduler.wheel.slots)
+    start = time.perf_counter()
+    sent = sum(scheduler.run_pending(day + timedelta(minutes=m)) for m in range(1440))
+    dispatcher.flush()
+    elapsed = time.perf_counter() - start
+
+    # A restarted scheduler must not resend today's campaign
+    restarted = CampaignScheduler(app, dispatcher)
+    restarted.rebuild(day + timedelta(minutes=1439))
+    restarted._next_rebuild = float("inf")
+    resent = sum(restarted.run_pending(day + timedelta(minutes=m)) for m in range(1440))
+    dispatcher.stop()
+    server.shutdown()
+
+    print(f"users={n_users} busiest slot={busiest} users")
+    print(f"wheel rebuild    : {rebuild:8.2f} s")
+    print(f"one simulated day: {elapsed:8.2f} s, sent={sent} ({sent / elapsed:,.0f} nudges/s incl. logging + push)")
+    print(f"HTTP requests    : {server.RequestHandlerClass.stats['requests']}")
+    print(f"{'✅' if resent == 0 else '❌'} resent after restart: {resent}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.users)
@@ -0,0 +1,138 @@
+# scripts/bench_columnar_encoders.py
+"""
+Bulk encoding throughput: looping the per-record encode_* functions over
+dict records vs their columnar encode_*_columns versions over the same data
+as NumPy columns (results must match exactly; columnar times are the best
+of 5 runs).
+
+The target is TARGET_SPEEDUP per encoder. Encoders below it are listed at the
+end. On a single core, encode_goals stays near 30x: it does two cheap dict
+lookups per record, while the columnar path has to read two UCS-4 string
+columns. encode_demographics sits right at the target (45-55x between runs).
+The combined ("all seven") and profile pipeline paths clear it (~115x, ~70x).
+Exit status reflects correctness only.
+
+--sort-only factorizes string columns with np.unique alone (no packed-byte
+masking, see columns.FEW_DISTINCT). The category encoders (demographics,
+device_meta, diet_prefs, goals) then drop to 4-15x and the profile pipeline
+to ~25x. That gap is why the masking path exists.
+
+    python scripts/bench_columnar_encoders.py --records 200000 [--sort-only]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from app.utils.encoders import columns as encoder_columns
+from app.utils.encoders import (
+    encode_checkin, encode_demographics, encode_device_meta, encode_diet_prefs,
+    encode_goals, encode_schedule, encode_sensor_data,
+)
+from app.utils.encoders.profile import encode_profile_columns, encode_profiles
+
+TARGET_SPEEDUP = 50
+
+ENCODERS = [
+    (encode_checkin.encode_checkin, encode_checkin.encode_checkin_columns),
+    (encode_demographics.encode_demographics, encode_demographics.encode_demographics_columns),
+    (encode_device_meta.encode_device_meta, encode_device_meta.encode_device_meta_columns),
+    (encode_diet_prefs.encode_diet_prefs, encode_diet_prefs.encode_diet_prefs_columns),
+    (encode_goals.encode_goals, encode_goals.encode_goals_columns),
+    (encode_schedule.encode_schedule, encode_schedule.encode_schedule_columns),
+    (encode_sensor_data.encode_sensor_data, encode_sensor_data.encode_sensor_data_columns),
+]
+
+
+def make_columns(n, rng):
+    """Check-in/sensor upload shaped columns, ~1% malformed strings."""
+    def hhmm(lo, hi):
+        minutes = rng.integers(lo, hi, n)
+        times = np.char.add(np.char.zfill((minutes // 60).astype(str), 2), ":")
+        return np.char.add(times, np.char.zfill((minutes % 60).astype(str), 2))
+
+    wake = hhmm(5 * 60, 9 * 60)
+    wake[rng.random(n) < 0.01] = "7am"
+    work = np.char.add(np.char.add(hhmm(7 * 60, 10 * 60), "-"), hhmm(15 * 60, 19 * 60))
+    work[rng.random(n) < 0.01] = "flexible"
+
+    return {
+        "mood": rng.integers(1, 6, n), "stress_level": rng.integers(1, 6, n), "hunger": rng.integers(1, 6, n),
+        "cravings": rng.integers(1, 6, n), "energy_level": rng.integers(1, 6, n),
+        "age": rng.integers(18, 90, n),
+        "sex": rng.choice(["male", "female", "Female", "nonbinary"], n),
+        "device_type": rng.choice(["iOS", "android", "web"], n),
+        "os_version": rng.choice(["17.4", "16.7", "14.0", "13.1", "beta"], n),
+        "diet_type": rng.choice(["omnivore", "vegetarian", "Vegan", "pescatarian", "dash", "keto"], n),
+        "goal_type": rng.choice(["weight_loss", "lower_bp", "better_labs", "more_energy", "better_mood"], n),
+        "nudge_style": rng.choice(["gentle", "motivating", "directive", "humorous"], n),
+        "wake_time": wake, "sleep_time": hhmm(21 * 60, 24 * 60), "work_hours": work,
+        "steps_today": rng.integers(0, 25000, n), "steps_last_hour": rng.integers(0, 2000, n),
+        "sedentary_minutes": rng.integers(0, 900, n), "heart_rate": rng.normal(75, 12, n),
+        "resting_hr": rng.normal(60, 8, n), "max_hr": rng.normal(180, 10, n),
+        "total_sleep_minutes": rng.integers(200, 600, n), "sleep_efficiency": rng.uniform(60, 99, n),
+    }
+
+
+def timed(fn, repeat=1):
+    """(result, best wall time of `repeat` runs)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main(n, seed):
+    rng = np.random.default_rng(seed)
+    columns = make_columns(n, rng)
+    fields = list(columns)
+    records = [dict(zip(fields, values)) for values in zip(*(columns[f].tolist() for f in fields))]
+
+    print(f"{n:,} records")
+    print(f"{'encoder':>22} {'loop rec/s':>12} {'columnar rec/s':>15} {'speedup':>8}  match")
+    total_loop = total_cols = 0.0
+    ok = True
+    below = []
+    for scalar, columnar in ENCODERS:
+        looped, t_loop = timed(lambda: np.stack([scalar(record) for record in records]))
+        batch, t_cols = timed(lambda: columnar(columns), repeat=5)
+        match = np.array_equal(looped, batch)
+        ok &= match
+        total_loop += t_loop
+        total_cols += t_cols
+        if t_loop / t_cols < TARGET_SPEEDUP:
+            below.append(f"{scalar.__name__} {t_loop / t_cols:.0f}x")
+        print(f"{scalar.__name__:>22} {n / t_loop:>12,.0f} {n / t_cols:>15,.0f} {t_loop / t_cols:>7.0f}x  {match}")
+    print(f"{'all seven':>22} {n / total_loop:>12,.0f} {n / total_cols:>15,.0f} {total_loop / total_cols:>7.0f}x")
+
+    rows, t_rows = timed(lambda: encode_profiles(records))
+    matrix, t_matrix = timed(lambda: encode_profile_columns(columns), repeat=5)
+    match = np.array_equal(rows, matrix)
+    ok &= match
+    print(f"{'profile pipeline':>22} {n / t_rows:>12,.0f} {n / t_matrix:>15,.0f} {t_rows / t_matrix:>7.0f}x  {match}")
+    for name, speedup in (("all seven", total_loop / total_cols), ("profile pipeline", t_rows / t_matrix)):
+        if speedup < TARGET_SPEEDUP:
+            below.append(f"{name} {speedup:.0f}x")
+    if below:
+        print(f"⚠️  Below the {TARGET_SPEEDUP}x target: {', '.join(below)}")
+    else:
+        print(f"✅ Every encoder clears the {TARGET_SPEEDUP}x target.")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sort-only", action="store_true", help="factorize strings with np.unique only")
+    args = parser.parse_args()
+    if args.sort_only:
+        encoder_columns.FEW_DISTINCT = 0
+    sys.exit(0 if main(args.records, args.seed) else 1)
@@ -0,0 +1,95 @@
+# scripts/bench_context_matrix.py
+"""
+build_context_matrix over a SQLite users table of --users rows (full scan),
+against encode_static_features on ORM-loaded users (timed on --sample rows
+and extrapolated). Both produce the same matrix; see check_context_matrix.py.
+
+    python scripts/bench_context_matrix.py --users 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from flask import Flask
+
+from app.models import db, User, init_db
+from app.utils.context_matrix import build_context_matrix
+from app.utils.context_vector import encode_static_features
+
+SEXES = [None, "male", "female", "Female", "nb"]
+DIETS = [None, "omnivore", "vegetarian", "Vegan", "pescatarian", "dash", "keto"]
+GOALS = [None, "weight_loss", "lower_bp", "better_labs", "more_energy", "better_mood"]
+STAGES = [None, "precontemplation", "contemplation", "preparation", "action", "maintenance"]
+STYLES = [None, "gentle", "motivating", "directive", "humorous"]
+CONDITIONS = [None, "", "t2d", "htn", "t2d,htn", "t2d,htn,ckd"]
+WORK_HOURS = [None, "09:00-17:00", "08:30-16:30", "22:00-06:00", "10:00 - 18:00", "9-5"]
+
+
+def populate(n_users, rng):
+    """Raw inserts (SQLite's Time storage format), chunked to bound memory."""
+    raw = db.engine.raw_connection()
+    pick = lambda options, k: [options[j] for j in rng.integers(0, len(options), k)]
+    for start in range(0, n_users, 100_000):
+        k = min(100_000, n_users - start)
+        wake = rng.integers(5 * 60, 10 * 60, k)
+        sleep = rng.integers(21 * 60, 24 * 60, k)
+        rows = zip(
+            range(start + 1, start + k + 1),
+            (f"user{i}@example.com" for i in range(start + 1, start + k + 1)),
+            rng.integers(0, 90, k).tolist(),
+            pick(SEXES, k), pick(DIETS, k), pick(GOALS, k), pick(STAGES, k), pick(CONDITIONS, k), pick(STYLES, k),
+            (f"{w // 60:02d}:{w % 60:02d}:00.000000" for w in wake.tolist()),
+            (f"{s // 60 % 24:02d}:{s % 60:02d}:00.000000" for s in sleep.tolist()),
+            pick(WORK_HOURS, k),
+        )
+        raw.executemany(
+            "INSERT INTO users (id, email, age, sex, diet_type, goal_type, readiness_stage, chronic_conditions,"
+            " nudge_style, wake_time, sleep_time, work_hours) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        raw.commit()
+    raw.close()
+
+
+def main(n_users, sample, seed=0):
+    tmp = tempfile.mkdtemp(prefix="keyrd_bench_")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/users.db"
+    init_db(app)
+    rng = np.random.default_rng(seed)
+
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        populate(n_users, rng)
+        print(f"populated {n_users} users in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        ids, matrix = build_context_matrix()
+        batch = time.perf_counter() - start
+
+        sample = min(sample, n_users)
+        start = time.perf_counter()
+        users = User.query.order_by(User.id).limit(sample).all()
+        rows = np.stack([encode_static_features(user) for user in users])
+        per_row = (time.perf_counter() - start) / sample * n_users
+        same = np.array_equal(rows, matrix[:sample])
+
+    print(f"build_context_matrix:    {batch:7.2f}s for {len(ids)} users ({len(ids) / batch:,.0f} users/s)")
+    print(f"encode_static_features: {per_row:7.2f}s extrapolated from {sample} ORM users")
+    print(f"{'✅' if same else '❌'} {per_row / batch:.1f}x faster; first {sample} rows identical: {same}")
+    return same
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=20_000)
+    args = parser.parse_args()
+    sys.exit(0 if main(args.users, args.sample) else 1)
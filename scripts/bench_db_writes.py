@@ -0,0 +1,134 @@
+# scripts/bench_db_writes.py
+"""
+Write-heavy load test: --procs processes (gunicorn workers) x --threads
+threads each run an onboarding/push/feedback mix for --seconds against a
+fresh SQLite file, first with a plain create_engine (rollback journal,
+FULL sync, 5 s lock timeout — the old setup) then with the engine profile
+from app.models (WAL, NORMAL, busy_timeout, mmap, sized pool).
+
+    python scripts/bench_db_writes.py --procs 4 --threads 8 --seconds 10
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+import numpy as np
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from app.models import db, engine_options, tune_engine, NudgeLog, User
+from app.utils.context_codec import FEATURE_DIMS, FEATURE_VERSION, pack_context
+
+NUM_USERS = 5_000
+CONTEXT = pack_context(np.zeros(FEATURE_DIMS[FEATURE_VERSION]))
+
+
+def make_engine(uri, tuned):
+    if not tuned:
+        return create_engine(uri)
+    engine = create_engine(uri, **engine_options(uri))
+    tune_engine(engine)
+    return engine
+
+
+def one_op(conn, rng):
+    """One request's writes, in its own transaction (like a route's commit)."""
+    user_id = rng.randrange(1, NUM_USERS + 1)
+    roll = rng.random()
+    with conn.begin():
+        if roll < 0.2:    # onboarding: re-submit profile
+            conn.execute(update(User).where(User.id == user_id).values(age=rng.randrange(18, 80), static_context=CONTEXT))
+        elif roll < 0.6:  # push: log a decision
+            conn.execute(insert(NudgeLog).values(
+                user_id=user_id, nudge_id=rng.randrange(5), context_blob=CONTEXT, context_version=FEATURE_VERSION
+            ))
+        else:             # feedback: reward newest pending log
+            log_id = conn.execute(
+                select(NudgeLog.id).filter_by(user_id=user_id, reward=None).order_by(NudgeLog.timestamp.desc()).limit(1)
+            ).scalar()
+            if log_id is not None:
+                conn.execute(update(NudgeLog).where(NudgeLog.id == log_id).values(reward=rng.random()))
+
+
+def worker_process(uri, tuned, threads, seconds, seed, out):
+    engine = make_engine(uri, tuned)
+    counts = {"ok": 0, "locked": 0}
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        ok = locked = 0
+        samples = []
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    one_op(conn, rng)
+                ok += 1
+                samples.append(time.perf_counter() - start)
+            except OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                locked += 1
+        with lock:
+            counts["ok"] += ok
+            counts["locked"] += locked
+            latencies.extend(samples)
+
+    pool = [threading.Thread(target=run, args=(seed * 1000 + i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    engine.dispose()
+    out.put((counts["ok"], counts["locked"], latencies))
+
+
+def run_profile(tuned, procs, threads, seconds):
+    path = os.path.join(tempfile.mkdtemp(prefix="keyrd_bench_"), "keyrd.db")
+    uri = f"sqlite:///{path}"
+    setup = make_engine(uri, tuned)
+    db.metadata.create_all(setup, tables=[User.__table__, NudgeLog.__table__])
+    with setup.begin() as conn:
+        conn.execute(insert(User), [{"id": i, "email": f"user{i}@example.com"} for i in range(1, NUM_USERS + 1)])
+    setup.dispose()
+
+    out = mp.Queue()
+    workers = [
+        mp.Process(target=worker_process, args=(uri, tuned, threads, seconds, p, out)) for p in range(procs)
+    ]
+    for w in workers:
+        w.start()
+    results = [out.get() for _ in workers]
+    for w in workers:
+        w.join()
+
+    ok = sum(r[0] for r in results)
+    locked = sum(r[1] for r in results)
+    latencies = np.concatenate([np.asarray(r[2]) for r in results]) * 1000 if ok else np.zeros(1)
+    name = "tuned (WAL)" if tuned else "default"
+    print(
+        f"{name:>12}: {ok / seconds:>8.0f} writes/s  {locked:>6} locked errors  "
+        f"p50 {np.percentile(latencies, 50):6.1f} ms  p99 {np.percentile(latencies, 99):7.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procs", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    print(f"{args.procs} processes x {args.threads} threads, {args.seconds:.0f}s each")
+    run_profile(False, args.procs, args.threads, args.seconds)
+    run_profile(True, args.procs, args.threads, args.seconds)
@@ -0,0 +1,93 @@
+# scripts/bench_group_commit.py
+"""
+Onboarding upserts from --threads concurrent request threads: one commit per
+request (the old path) vs the GroupCommitter, against a fresh SQLite file.
+
+    python scripts/bench_group_commit.py --threads 32 --requests 4000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from flask import Flask
+
+from app.models import db, init_db
+from app.utils.group_commit import GroupCommitter, upsert_user
+
+
+def make_app():
+    app = Flask(__name__)
+    path = os.path.join(tempfile.mkdtemp(prefix="keyrd_bench_"), "keyrd.db")
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    init_db(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def fields(i):
+    return {"device_token": None, "age": 20 + i % 60, "sex": "female", "goal_type": "lower_bp", "chronic_conditions": ""}
+
+
+def per_request(app, i, synchronous):
+    with app.app_context(), db.engine.connect() as conn:
+        conn.exec_driver_sql(f"PRAGMA synchronous={synchronous}")
+        conn.commit()
+        with conn.begin():
+            upsert_user(conn, f"user{i}@example.com", fields(i), datetime.utcnow())
+
+
+def run(name, app, n_threads, n_requests, write):
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(n_requests))
+
+    def worker():
+        samples = []
+        for i in counter:
+            start = time.perf_counter()
+            write(i)
+            samples.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(samples)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000
+    print(f"{name:>26}: {n_requests / elapsed:>7.0f} req/s  p50 {np.percentile(ms, 50):6.1f} ms  p99 {np.percentile(ms, 99):6.1f} ms")
+
+
+def main(n_threads, n_requests):
+    print(f"{n_threads} threads, {n_requests} onboarding upserts")
+    for sync in ("NORMAL", "FULL"):
+        app = make_app()
+        run(f"commit per request ({sync})", app, n_threads, n_requests, lambda i: per_request(app, i, sync))
+
+    app = make_app()
+    committer = GroupCommitter()
+    committer.start(app)
+    run("group commit (FULL)", app, n_threads, n_requests,
+        lambda i: committer.write(upsert_user, f"user{i}@example.com", fields(i), datetime.utcnow()))
+    committer.stop()
+    print(f"{'':>26}  {committer.stats['commits']} commits for {committer.stats['writes']} writes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4000)
+    args = parser.parse_args()
+    main(args.threads, args.requests)
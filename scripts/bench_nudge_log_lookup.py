@@ -0,0 +1,107 @@
+# scripts/bench_nudge_log_lookup.py
+"""
+Feedback's pending-log lookup latency as nudge_logs grows to --rows rows,
+with the partial ix_nudge_logs_pending index and (up to --scan-max rows)
+without it.
+
+    python scripts/bench_nudge_log_lookup.py --rows 10000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from sqlalchemy import bindparam, create_engine, select
+
+from app.models import db, NudgeLog
+
+NUM_USERS = 100_000
+PENDING_FRACTION = 0.05
+
+
+def lookup_statement():
+    # Same query as /feedback
+    return (
+        select(NudgeLog.id)
+        .filter_by(user_id=bindparam("user_id"), nudge_id=bindparam("nudge_id"), reward=None)
+        .order_by(NudgeLog.timestamp.desc())
+        .limit(1)
+    )
+
+
+def populate(conn, start, stop, rng, t0):
+    ids = np.arange(start, stop)
+    users = rng.integers(0, NUM_USERS, ids.size)
+    arms = rng.integers(0, 5, ids.size)
+    rewards = np.where(rng.random(ids.size) < PENDING_FRACTION, np.nan, rng.random(ids.size))
+    rows = [
+        (int(i) + 1, int(u), int(a), None if np.isnan(r) else float(r), str(t0 + timedelta(seconds=int(i))))
+        for i, u, a, r in zip(ids, users, arms, rewards)
+    ]
+    conn.executemany(
+        "INSERT INTO nudge_logs (id, user_id, nudge_id, reward, timestamp) VALUES (?, ?, ?, ?, ?)", rows
+    )
+    conn.commit()
+
+
+def measure(engine, rng, n_lookups):
+    stmt = lookup_statement()
+    samples = []
+    with engine.connect() as conn:
+        for user, arm in zip(rng.integers(0, NUM_USERS, n_lookups), rng.integers(0, 5, n_lookups)):
+            start = time.perf_counter()
+            conn.execute(stmt, {"user_id": int(user), "nudge_id": int(arm)}).first()
+            samples.append(time.perf_counter() - start)
+    samples = np.array(samples) * 1e6
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def main(total_rows, scan_max, n_lookups):
+    path = os.path.join(tempfile.mkdtemp(prefix="keyrd_bench_"), "logs.db")
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine, tables=[NudgeLog.__table__])
+    rng = np.random.default_rng(0)
+    t0 = datetime(2025, 1, 1)
+
+    with engine.connect() as conn:
+        compiled = lookup_statement().compile(engine)
+        params = {**compiled.params, "user_id": 1, "nudge_id": 1}
+        plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), tuple(params[k] for k in compiled.positiontup)).fetchall()
+    print("query plan:", " | ".join(row[-1] for row in plan))
+    print(f"{'rows':>12} {'indexed p50':>12} {'p99':>10} {'no index p50':>14} {'p99':>10}")
+
+    raw = engine.raw_connection()
+    stages = [s for s in (10_000, 100_000, 1_000_000, 10_000_000, 100_000_000) if s < total_rows] + [total_rows]
+    loaded = 0
+    for stage in stages:
+        for start in range(loaded, stage, 1_000_000):
+            populate(raw, start, min(start + 1_000_000, stage), rng, t0)
+        loaded = stage
+
+        p50, p99 = measure(engine, rng, n_lookups)
+        line = f"{stage:>12,} {p50:>10.0f}µs {p99:>8.0f}µs"
+        if stage <= scan_max:
+            raw.execute("DROP INDEX ix_nudge_logs_pending")
+            s50, s99 = measure(engine, rng, max(5, n_lookups // 100))
+            raw.execute(
+                "CREATE INDEX ix_nudge_logs_pending ON nudge_logs (user_id, nudge_id, timestamp) WHERE reward IS NULL"
+            )
+            line += f" {s50:>12.0f}µs {s99:>8.0f}µs"
+        print(line, flush=True)
+    raw.close()
+    print(f"db size: {os.path.getsize(path) / 1e6:.0f} MB ({path})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--scan-max", type=int, default=1_000_000, help="largest size also timed without the index")
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.rows, args.scan_max, args.lookups)
@@ -0,0 +1,47 @@
+# scripts/bench_push_dispatcher.py
+import sys
+import os
+import time
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+from stub_expo_server import SEND_PATH, start_stub
+from app.utils.push_dispatcher import PushDispatcher
+from app.utils.push_providers import ExpoProvider
+
+
+def main(n_messages=2000, latency=0.02):
+    server, base_url = start_stub(latency=latency)
+    url = base_url + SEND_PATH
+    tokens = [f"ExponentPushToken[bench{i}]" for i in range(n_messages)]
+
+    # One blocking request per message (previous /push behaviour)
+    provider = ExpoProvider(url=url)
+    sample = tokens[:200]
+    start = time.perf_counter()
+    for token in sample:
+        provider.send_to_many([token], "Bench", "Per-message send")
+    per_message = (time.perf_counter() - start) / len(sample)
+
+    # Batched dispatcher
+    dispatcher = PushDispatcher(providers=[ExpoProvider(url=url)], max_concurrency=4)
+    start = time.perf_counter()
+    futures = [dispatcher.enqueue(token, "Bench", "Batched send") for token in tokens]
+    enqueue_time = time.perf_counter() - start
+    tickets = [f.result() for f in futures]
+    batched = time.perf_counter() - start
+    dispatcher.stop()
+    server.shutdown()
+
+    ok = sum(t.get("status") == "ok" for t in tickets)
+    print(f"stub latency={latency * 1000:.0f}ms messages={n_messages}")
+    print(f"per-message send : {1 / per_message:8.0f} msg/s (measured on {len(sample)})")
+    print(f"batched dispatch : {n_messages / batched:8.0f} msg/s, ok tickets={ok}, "
+          f"HTTP requests={server.RequestHandlerClass.stats['requests']}")
+    print(f"enqueue cost     : {enqueue_time / n_messages * 1e6:8.1f} µs/msg (what a request handler pays)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# scripts/bench_token_store.py
+"""
+keyrd_backend token registration: latency as the registry grows (indexed
+upsert vs the old rewrite-the-whole-JSON-file registry) and correctness of
+parallel registrations (no duplicates, none lost).
+
+    python scripts/bench_token_store.py --sizes 1000 10000 100000 --threads 16
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# keyrd_backend is deployed as its own root (its package is `utils`)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'keyrd_backend')))
+
+import numpy as np
+
+from utils.register import TokenStore
+
+
+def legacy_save(filepath, user_id, token):
+    # The old save_device_token: read everything, change one key, rewrite everything
+    if os.path.exists(filepath):
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+    else:
+        data = {}
+    data[str(user_id)] = token
+    with open(filepath, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def timed(fn, n):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return np.median(samples) * 1e6
+
+
+def main(sizes, n_threads, per_thread):
+    tmp = tempfile.mkdtemp(prefix="keyrd_bench_")
+    print(f"{'registry size':>14} {'upsert p50':>12} {'JSON rewrite p50':>18}")
+    for size in sizes:
+        store = TokenStore(os.path.join(tmp, f"tokens_{size}.db"))
+        conn = store._conn()
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO device_tokens VALUES (?, ?, 0, 0)",
+            ((str(i), f"ExponentPushToken[{i}]") for i in range(size)),
+        )
+        conn.execute("COMMIT")
+        json_path = os.path.join(tmp, f"tokens_{size}.json")
+        with open(json_path, 'w') as f:
+            json.dump({str(i): f"ExponentPushToken[{i}]" for i in range(size)}, f, indent=2)
+
+        upsert = timed(lambda i: store.save(size + i, f"ExponentPushToken[new-{i}]"), 200)
+        legacy = timed(lambda i: legacy_save(json_path, size + i, f"ExponentPushToken[new-{i}]"), 20)
+        print(f"{size:>14,} {upsert:>10.0f}µs {legacy:>16.0f}µs")
+
+    # Parallel registrations: every thread registers the same 500 users' tokens twice
+    store = TokenStore(os.path.join(tmp, "parallel.db"))
+    pairs = [(u, f"ExponentPushToken[{u}-{d}]") for u in range(per_thread // 2) for d in range(2)]
+
+    def worker():
+        for user_id, token in pairs * 2:
+            store.save(user_id, token)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    total = n_threads * len(pairs) * 2
+    rows = store.count()
+    print(f"parallel: {n_threads} threads, {total} registrations in {elapsed:.2f}s "
+          f"({total / elapsed:.0f}/s) → {rows} rows for {len(pairs)} unique (user, token) pairs")
+    assert rows == len(pairs), "duplicate or lost registrations"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--per-thread", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.sizes, args.threads, args.per_thread)
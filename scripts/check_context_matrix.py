@@ -0,0 +1,96 @@
+# scripts/check_context_matrix.py
+"""
+Checks that build_context_matrix (one column query per chunk, encoded by
+STATIC_LAYOUT's columnar writers) returns exactly encode_static_features for
+every user, on fuzzed onboarding values: NULLs, mixed case, unknown
+categories, non-ASCII text, odd work-hour strings and times with seconds.
+Covers the full-table scan and explicit id lists (caller order, duplicates,
+missing ids, more ids than one IN (...) chunk).
+
+    python scripts/check_context_matrix.py --users 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import time
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from flask import Flask
+
+from app.models import db, User, init_db
+from app.utils.context_matrix import IN_CLAUSE_CHUNK, build_context_matrix
+from app.utils.context_vector import STATIC_LAYOUT, encode_static_features
+
+VALUES = {
+    "age": [None, 0, 18, 25, 47, 90, 104],
+    "sex": [None, "", "male", "Female", "MALE", "nb", "männlich"],
+    "diet_type": [None, "", "omnivore", "Vegan", "DASH", "keto", "végétarien", " vegan"],
+    "goal_type": [None, "", "weight_loss", "Lower_BP", "more_energy", "x"],
+    "readiness_stage": [None, "", "precontemplation", "Action", "maintenance", "later"],
+    "chronic_conditions": [None, "", "t2d", "t2d,htn", "a,b,c,d,e,f", ",", "diabète"],
+    "nudge_style": [None, "", "gentle", "Humorous", "DIRECTIVE", "sarcastic"],
+    "wake_time": [None, time(6, 30), time(5, 0), time(7, 15, 30), time(23, 59, 59, 500000)],
+    "sleep_time": [None, time(22, 0), time(0, 30), time(5, 15), time(6, 30)],
+    "work_hours": [
+        None, "", "09:00-17:00", "22:00 - 06:00", "9:00-17:00", "09:00-17:00-18:00",
+        "bad", "24:00-08:00", "08:00-12:60", "０９:00-17:00",
+    ],
+}
+
+
+def random_users(n, rng):
+    return [
+        User(id=i, email=f"user{i}@example.com", **{field: rng.choice(values) for field, values in VALUES.items()})
+        for i in range(1, n + 1)
+    ]
+
+
+def compare(label, ids, matrix, expected):
+    same = all(np.array_equal(matrix[k], expected[int(i)]) for k, i in enumerate(ids))
+    print(f"{'✅' if same else '❌'} {label}: {len(ids)} rows == encode_static_features")
+    return same
+
+
+def main(n_users, seed):
+    rng = random.Random(seed)
+    tmp = tempfile.mkdtemp(prefix="keyrd_check_")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/users.db"
+    init_db(app)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(random_users(n_users, rng))
+        db.session.commit()
+        db.session.expire_all()
+        expected = {user.id: encode_static_features(user) for user in User.query.all()}
+
+        ok = True
+        ids, matrix = build_context_matrix(chunk_size=max(1, n_users // 7))
+        ok &= list(ids) == sorted(expected) and compare("full scan", ids, matrix, expected)
+
+        wanted = [rng.randint(1, n_users + 50) for _ in range(2 * IN_CLAUSE_CHUNK + 17)]
+        ids, matrix = build_context_matrix(wanted, chunk_size=500)
+        order = [i for i in dict.fromkeys(wanted) if i in expected]
+        ok &= list(ids) == order and compare("explicit ids (caller order, missing dropped)", ids, matrix, expected)
+
+        ids, matrix = build_context_matrix([n_users + 1])
+        empty = ids.size == 0 and matrix.shape == (0, STATIC_LAYOUT.dim)
+        print(f"{'✅' if empty else '❌'} unknown ids only → empty (0, {STATIC_LAYOUT.dim}) matrix")
+        ok &= empty
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    passed = main(args.users, args.seed)
+    print("✅ Context matrix checks passed." if passed else "❌ Context matrix checks failed.")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,210 @@
+# scripts/check_dynamic_context.py
+"""
+Checks the FEATURE_VERSION 2 dynamic context:
+
+- incrementally folded check-in trends (in and out of order) match a
+  brute-force decayed average over the full check-in history;
+- POST /checkin → checkin_state → build_context_vector gives the same
+  features from the cache and from a cold read, without touching checkins;
+- static + dynamic widths add up to FEATURE_DIMS[FEATURE_VERSION], and the
+  row and columnar encoders agree;
+- a snapshot saved under the old layout (plus its unfolded journal) warm-starts
+  the agent with unchanged scores on the old features, and is kept as
+  linucb_model.v1.bin instead of being overwritten.
+
+    python scripts/check_dynamic_context.py
+"""
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Every state path the app reads at import time points into a scratch
+# directory, so nothing is written to (or read from) instance/
+WORKDIR = tempfile.mkdtemp(prefix="keyrd_check_")
+os.environ["KEYRD_MODEL_PATH"] = os.path.join(WORKDIR, "linucb_model.bin")
+os.environ["KEYRD_JOURNAL_DIR"] = os.path.join(WORKDIR, "journal")
+os.environ["KEYRD_JOBS_DB"] = os.path.join(WORKDIR, "jobs.db")
+os.environ["KEYRD_AGENT_SEGMENT"] = os.path.join(WORKDIR, "keyrd_linucb.seg")
+
+import numpy as np
+from flask import Flask
+from sqlalchemy import event
+
+from app.agents.bandit_linucb import LinUCB
+from app.agents.linucb_persistence import retired_model_path, stored_context_dim
+from app.agents.reward_journal import RewardJournal
+from app.models import db, User, init_db
+from app.routes.checkin import checkin_bp
+from app.utils.checkins import (
+    CHECKIN_HALF_LIFE, PRIOR_WEIGHT, TREND_FIELDS, fold_checkin, normalize_checkin, trend_columns,
+)
+from app.utils.context_codec import FEATURE_DIMS, FEATURE_VERSION
+from app.utils.context_vector import (
+    DYNAMIC_DIM, DYNAMIC_LAYOUT, STATIC_DIM, build_context_vector, checkin_trend_cache, dynamic_feature_matrix,
+)
+from app.utils.group_commit import group_commit
+
+START = 1_718_000_000.0
+
+
+def brute_force(history, now):
+    """Decayed means/confidence recomputed from every (at, values) check-in."""
+    weights = np.array([0.5 ** ((now - at) / CHECKIN_HALF_LIFE) for at, _ in history])
+    x = np.array([normalize_checkin(values) for _, values in history])
+    total = weights.sum() + PRIOR_WEIGHT
+    return np.append((weights @ x + PRIOR_WEIGHT * 0.5) / total, weights.sum() / total)
+
+
+def features(trend, now):
+    columns = trend_columns([trend], now)
+    return np.array([columns[name][0] for name in TREND_FIELDS])
+
+
+def check_folding(rng, n=200):
+    times = START + np.sort(rng.uniform(0, 30 * 86400, n))
+    history = [(float(at), rng.integers(1, 6, 5).tolist()) for at in times]
+    shuffled = [history[i] for i in rng.permutation(n)]  # late/out-of-order check-ins too
+
+    worst = 0.0
+    for order in (history, shuffled):
+        trend = None
+        for k, (at, values) in enumerate(order, 1):
+            trend = fold_checkin(trend, values, at)
+            now = max(a for a, _ in order[:k]) + rng.uniform(0, 5 * 86400)
+            worst = max(worst, np.abs(features(trend, now) - brute_force(order[:k], now)).max())
+    ok = worst < 1e-9
+    print(f"{'✅' if ok else '❌'} incremental trend == brute force over {n} check-ins (max err {worst:.1e})")
+    return ok
+
+
+def check_layout():
+    ok = STATIC_DIM + DYNAMIC_DIM == FEATURE_DIMS[FEATURE_VERSION]
+    records = [
+        {"mood_trend": 0.75, "checkin_confidence": 0.4, "steps_today": 8000, "heart_rate": None},
+        {},
+        {"stress_level_trend": 0.1, "resting_hr": 61.5, "sleep_efficiency": 88},
+    ]
+    fields = sorted({field for record in records for field in record})
+    columns = {field: [record.get(field) for record in records] for field in fields}
+    same = np.array_equal(DYNAMIC_LAYOUT.encode_many(records), DYNAMIC_LAYOUT.encode_columns(columns))
+    print(f"{'✅' if ok and same else '❌'} layout: {STATIC_DIM} static + {DYNAMIC_DIM} dynamic = "
+          f"{FEATURE_DIMS[FEATURE_VERSION]} (v{FEATURE_VERSION}); rows == columns: {same}")
+    return ok and same
+
+
+def check_route(tmp):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/checkins.db"
+    init_db(app)
+    app.register_blueprint(checkin_bp)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, email="a@example.com", age=30), User(id=2, email="b@example.com")])
+        db.session.commit()
+    group_commit.start(app)
+    client = app.test_client()
+
+    history, ok = [], True
+    for day in range(5):
+        values = [1 + (day + k) % 5 for k in range(5)]
+        body = dict(zip(["mood", "stress_level", "hunger", "cravings", "energy_level"], values))
+        response = client.post("/checkin", json={"email": "a@example.com", **body})
+        ok &= response.status_code == 201
+        history.append((time.time(), values))
+    ok &= client.post("/checkin", json={"email": "a@example.com", "mood": 9}).status_code == 400
+    ok &= client.post("/checkin", json={"email": "x@example.com", **body}).status_code == 404
+
+    with app.app_context():
+        now = time.time() + 86400
+        queries = []
+        listener = lambda *args: queries.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", listener)
+        cached = dynamic_feature_matrix([1, 2], now)
+        checkin_trend_cache.clear()
+        cold = dynamic_feature_matrix([1, 2], now)
+        event.remove(db.engine, "before_cursor_execute", listener)
+        vector = build_context_vector(1)
+
+        expected = brute_force(history, now)
+        trend = DYNAMIC_LAYOUT.slices["checkin_trend"]
+        ok &= np.allclose(cached[0, trend], expected, atol=1e-6) and np.array_equal(cached, cold)
+        ok &= np.allclose(cold[1, trend], [0.5] * 5 + [0.0])  # no check-ins → neutral, zero confidence
+        ok &= vector.shape == (FEATURE_DIMS[FEATURE_VERSION],)
+        history_reads = [q for q in queries if "FROM checkins" in q]
+        ok &= not history_reads
+        db.engine.dispose()
+    group_commit.stop()
+    print(f"{'✅' if ok else '❌'} /checkin → cached/cold dynamic features match brute force; "
+          f"{len(queries)} queries for 2 users, {len(history_reads)} against the check-in history")
+    return ok
+
+
+def train_v1(model_path, journal_dir, seed):
+    """A v1 agent: 300 updates in the snapshot, 50 more only in the journal (run in a child process)."""
+    rng = np.random.default_rng(seed)
+    dim = FEATURE_DIMS[1]
+    agent = LinUCB(num_arms=5, context_dim=dim)
+    agent.update_batch(rng.integers(0, 5, 300), rng.random(300), rng.random((300, dim)))
+    agent.save(model_path)
+    journal = RewardJournal(journal_dir, dim)
+    journal.lock()
+    journal.apply_batch(agent, rng.integers(0, 5, 50), rng.random(50), rng.random((50, dim)))
+    journal.close()
+
+
+def check_old_snapshot(seed=0):
+    model_path = os.environ["KEYRD_MODEL_PATH"]
+    journal_dir = os.environ["KEYRD_JOURNAL_DIR"]
+    child = mp.get_context("fork").Process(target=train_v1, args=(model_path, journal_dir, seed))
+    child.start()
+    child.join()
+
+    # Reference: the v1 model with its journal folded in
+    old_dim, new_dim = FEATURE_DIMS[1], FEATURE_DIMS[FEATURE_VERSION]
+    expected = LinUCB(num_arms=5, context_dim=old_dim)
+    expected.load(model_path)
+    RewardJournal(journal_dir, old_dim).replay(expected)
+
+    from app import state
+    state.load_agent()
+    state.snapshot_writer.stop()
+
+    X = np.random.default_rng(seed + 1).random((200, old_dim))
+    padded = np.hstack([X, np.zeros((200, new_dim - old_dim))])  # new features at 0: only the old ones score
+    scores = np.array([state.agent.scores(x) for x in padded])
+    reference = np.array([expected.scores(x) for x in X])
+    retired = retired_model_path(model_path, 1)
+    kept = LinUCB(num_arms=5, context_dim=old_dim)
+    kept.load(retired)
+
+    ok = state.agent.context_dim == new_dim and np.allclose(scores, reference)
+    ok &= state.agent.export_state()["update_count"] == expected.update_count == 350
+    ok &= stored_context_dim(model_path) == new_dim
+    ok &= np.allclose(kept.A, expected.A) and kept.update_count == expected.update_count
+    print(f"{'✅' if ok else '❌'} v1 snapshot + journal ({expected.update_count} updates) warm-started into "
+          f"context_dim {state.agent.context_dim}, max score drift {np.abs(scores - reference).max():.1e}; "
+          f"v1 model kept as {os.path.basename(retired)}")
+    return ok
+
+
+def main(seed=0):
+    rng = np.random.default_rng(seed)
+    ok = check_folding(rng)
+    ok &= check_layout()
+    try:
+        ok &= check_route(WORKDIR)
+        ok &= check_old_snapshot()
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    print("✅ Dynamic context checks passed." if ok else "❌ Dynamic context checks failed.")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
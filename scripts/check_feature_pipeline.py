@@ -0,0 +1,86 @@
+# scripts/check_feature_pipeline.py
+import sys
+import os
+import random
+import types
+from datetime import time
+
+import numpy as np
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.encoders.profile import PROFILE_LAYOUT
+from app.utils.encoders.static_context import STATIC_LAYOUT
+from app.utils.encoders import (
+    encode_checkin, encode_demographics, encode_device_meta, encode_diet_prefs,
+    encode_goals, encode_schedule, encode_sensor_data,
+)
+
+PROFILE_VALUES = {
+    "mood": [1, 3, "5", None, "x"], "stress_level": [2, None], "hunger": [4, 5], "cravings": ["2.5"],
+    "energy_level": [None, 1], "age": [30, "45", 0, 99], "sex": ["Male", "female", "x", ""],
+    "device_type": ["iOS", "android", "web"], "os_version": ["17.2", "14", "a.b"],
+    "diet_type": ["vegan", "DASH", "keto", ""], "goal_type": ["weight_loss", "x"], "nudge_style": ["humorous", ""],
+    "wake_time": ["06:30", "bad", "23:59"], "sleep_time": ["22:00", "7:5"],
+    "work_hours": ["09:00-17:00", "22:00-06:00", "x"], "steps_today": [5000, None, "12"],
+    "heart_rate": [70, "fast"], "sleep_efficiency": [90],
+}
+
+USER_VALUES = {
+    "age": [None, 0, 25, 70], "sex": [None, "MALE", "female", "nb"], "diet_type": [None, "Vegan", "dash", "x"],
+    "goal_type": [None, "lower_bp"], "readiness_stage": [None, "Action", "x"],
+    "chronic_conditions": [None, "", "t2d", "a,b,c"], "nudge_style": [None, "gentle", "Humorous"],
+    "wake_time": [None, time(6, 30), time(23, 0)], "sleep_time": [None, time(22, 0), time(5, 15)],
+    "work_hours": [None, "09:00-17:00", "22:00 - 06:00", "bad"],
+}
+
+
+def random_profile(rng):
+    record = {k: rng.choice(v) for k, v in PROFILE_VALUES.items() if rng.random() < 0.8}
+    record.setdefault("age", 40)
+    return record
+
+
+def random_user(rng):
+    return types.SimpleNamespace(**{k: rng.choice(v) for k, v in USER_VALUES.items()})
+
+
+def main(n=2000, seed=0):
+    rng = random.Random(seed)
+    ok = True
+
+    # Profile pipeline: batch == single == the individual encoders, concatenated
+    profiles = [random_profile(rng) for _ in range(n)]
+    matrix = PROFILE_LAYOUT.encode_many(profiles)
+    row = np.empty(PROFILE_LAYOUT.dim, dtype=PROFILE_LAYOUT.dtype)
+    encoders = {
+        "demographics": encode_demographics.encode_demographics, "diet_prefs": encode_diet_prefs.encode_diet_prefs,
+        "goals": encode_goals.encode_goals, "schedule": encode_schedule.encode_schedule,
+        "device_meta": encode_device_meta.encode_device_meta, "checkin": encode_checkin.encode_checkin,
+        "sensor_data": encode_sensor_data.encode_sensor_data,
+    }
+    for i, record in enumerate(profiles):
+        if not np.array_equal(PROFILE_LAYOUT.encode(record, row), matrix[i]):
+            ok = False
+        for name, sl in PROFILE_LAYOUT.slices.items():
+            if not np.array_equal(matrix[i, sl], encoders[name](record).astype(PROFILE_LAYOUT.dtype)):
+                ok = False
+    print(f"profile: dim={PROFILE_LAYOUT.dim} records={n} single==batch==encoders: {ok}")
+
+    # Static context pipeline: batch == single == columns
+    users = [random_user(rng) for _ in range(n)]
+    static = STATIC_LAYOUT.encode_many(users)
+    same = all(np.array_equal(STATIC_LAYOUT.encode(u), static[i]) for i, u in enumerate(users))
+    columns = {field: [getattr(u, field) for u in users] for field in USER_VALUES}
+    same &= np.array_equal(STATIC_LAYOUT.encode_columns(columns), static)
+    print(f"static_context: dim={STATIC_LAYOUT.dim} records={n} single==batch==columns: {same}")
+    return ok and same
+
+
+if __name__ == "__main__":
+    if main():
+        print("✅ Feature pipelines encode identically one record at a time and in batches.")
+    else:
+        print("❌ Feature pipeline single/batch mismatch.")
+        sys.exit(1)
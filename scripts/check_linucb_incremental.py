@@ -0,0 +1,48 @@
+# scripts/check_linucb_incremental.py
+import sys
+import os
+import numpy as np
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.agents.bandit_linucb import LinUCB
+
+
+def reference_select(agent, context_vector):
+    """Arm choice as computed before the incremental engine: full inversion per arm."""
+    context = context_vector.reshape(-1, 1)
+    p_values = []
+    for a in range(agent.num_arms):
+        A_inv = np.linalg.inv(agent.A[a])
+        theta = A_inv @ agent.b[a].reshape(-1, 1)
+        p = (theta.T @ context)[0, 0] + agent.alpha * np.sqrt(context.T @ A_inv @ context)[0, 0]
+        p_values.append(p)
+    return int(np.argmax(p_values))
+
+
+def main(num_arms=5, context_dim=26, steps=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    agent = LinUCB(num_arms=num_arms, context_dim=context_dim, alpha=0.1, refresh_every=500)
+
+    mismatches = 0
+    for _ in range(steps):
+        x = rng.random(context_dim).astype(np.float32)
+        arm = agent.select_action(x)
+        if arm != reference_select(agent, x):
+            mismatches += 1
+        agent.update(arm, float(rng.random() < 0.3), x)
+
+    max_err = max(
+        np.abs(agent.A_inv[a] - np.linalg.inv(agent.A[a])).max() for a in range(num_arms)
+    )
+    print(f"steps={steps} mismatched selections={mismatches} max |A_inv error|={max_err:.2e}")
+    return mismatches == 0 and max_err < 1e-8
+
+
+if __name__ == "__main__":
+    if main():
+        print("✅ Incremental LinUCB matches full-inversion reference.")
+    else:
+        print("❌ Incremental LinUCB diverged from reference.")
+        sys.exit(1)
@@ -0,0 +1,139 @@
+# scripts/check_reward_journal.py
+"""
+Checks that rewards journaled by every worker process survive a restart.
+
+One process owns the journal and compacts it while three other workers
+append rewards (single and batched) and then exit without closing anything.
+The owner is also abandoned without a final compaction. A fresh process
+then loads the snapshot and replays the journal, and its model must equal
+the reference model built from every acknowledged reward. A final
+compaction by the owner must fold everything into the snapshot alone.
+This runs with per-process agents (local) and with one mmap'd agent (shared).
+
+    python scripts/check_reward_journal.py
+"""
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from app.agents.bandit_linucb import LinUCB
+from app.agents.linucb_snapshot import read_snapshot
+from app.agents.reward_journal import RewardJournal
+from app.agents.shared_linucb import SharedLinUCB
+from app.agents.threadsafe_linucb import ThreadSafeLinUCB
+
+NUM_ARMS = 5
+CONTEXT_DIM = 8
+WORKERS = 3
+BATCHES = 40
+BATCH = 16
+
+
+def rewards_of(writer):
+    """Deterministic (arms, rewards, contexts) batches for one writer."""
+    rng = np.random.default_rng(writer)
+    return [
+        (rng.integers(0, NUM_ARMS, BATCH), rng.random(BATCH), rng.random((BATCH, CONTEXT_DIM)))
+        for _ in range(BATCHES)
+    ]
+
+
+def make_agent(backend, segment):
+    if backend == "shared":
+        return SharedLinUCB(NUM_ARMS, CONTEXT_DIM, path=segment)
+    return ThreadSafeLinUCB(LinUCB(NUM_ARMS, CONTEXT_DIM))
+
+
+def worker(writer, backend, journal_dir, segment):
+    agent = make_agent(backend, segment)
+    journal = RewardJournal(journal_dir, CONTEXT_DIM, shared_agent=backend == "shared")
+    assert not journal.lock()
+    for k, (arms, rewards, contexts) in enumerate(rewards_of(writer)):
+        if k % 2:
+            journal.apply_batch(agent, arms, rewards, contexts)
+        else:
+            for arm, reward, x in zip(arms, rewards, contexts):
+                journal.apply(agent, arm, reward, x)
+        time.sleep(0.002)
+    os._exit(0)  # every apply has returned, so every reward was acknowledged as durable
+
+
+def restored(journal_dir, model_path, queue):
+    """A restarted process: snapshot + replay."""
+    agent = LinUCB(NUM_ARMS, CONTEXT_DIM)
+    agent.load(model_path)
+    RewardJournal(journal_dir, CONTEXT_DIM).replay(agent, from_generation=read_snapshot(model_path)["journal_generation"])
+    queue.put((agent.A, agent.b, agent.update_count))
+
+
+def reference():
+    agent = LinUCB(NUM_ARMS, CONTEXT_DIM)
+    for writer in range(WORKERS + 1):
+        for arms, rewards, contexts in rewards_of(writer):
+            agent.update_batch(arms, rewards, contexts)
+    return agent
+
+
+def run(backend, tmp):
+    ctx = mp.get_context("fork")
+    journal_dir = os.path.join(tmp, backend, "journal")
+    model_path = os.path.join(tmp, backend, "linucb_model.bin")
+    segment = os.path.join(tmp, backend, "agent.seg")
+    os.makedirs(journal_dir)
+
+    agent = make_agent(backend, segment)
+    journal = RewardJournal(journal_dir, CONTEXT_DIM, shared_agent=backend == "shared")
+    owner = journal.lock()
+    journal.compact(agent, model_path)
+
+    procs = [ctx.Process(target=worker, args=(w, backend, journal_dir, segment)) for w in range(1, WORKERS + 1)]
+    for p in procs:
+        p.start()
+    compactions = 0
+    for arms, rewards, contexts in rewards_of(0):
+        journal.apply_batch(agent, arms, rewards, contexts)
+        if any(p.is_alive() for p in procs):
+            journal.compact(agent, model_path)
+            compactions += 1
+        time.sleep(0.005)
+    for p in procs:
+        p.join()
+
+    # Owner "crashes": no final compaction; a restarted process must still see every reward
+    queue = ctx.Queue()
+    child = ctx.Process(target=restored, args=(journal_dir, model_path, queue))
+    child.start()
+    A, b, update_count = queue.get()
+    child.join()
+
+    expected = reference()
+    total = (WORKERS + 1) * BATCHES * BATCH
+    ok = owner and update_count == total and np.allclose(A, expected.A) and np.allclose(b, expected.b)
+    print(f"{'✅' if ok else '❌'} {backend:<6} restart after {compactions} compactions: "
+          f"{update_count}/{total} rewards recovered from {WORKERS + 1} writers")
+
+    journal.compact(agent, model_path)
+    snapshot = read_snapshot(model_path)
+    folded = np.allclose(snapshot["A"], expected.A) and np.allclose(snapshot["b"], expected.b)
+    folded &= not journal.has_records()
+    print(f"{'✅' if folded else '❌'} {backend:<6} final compaction folds every worker's rewards into the snapshot")
+    return ok and folded
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = run("local", tmp)
+        ok &= run("shared", tmp)
+    print("✅ Reward journal checks passed." if ok else "❌ Reward journal checks failed.")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,165 @@
+# scripts/check_sensor_stream.py
+"""
+Replays two days of simulated wearable uploads through SensorAggregator and
+compares its O(1) rolling aggregates with a brute-force recomputation over
+all raw samples at every batch, then checks that retried uploads aren't
+double-counted, the flush/stored-row fallback, that a restarted process
+resumes from the flushed row, and reports ingestion throughput.
+
+    python scripts/check_sensor_stream.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from flask import Flask
+
+from app.models import db, User, init_db
+from app.utils.sensor_stream import (
+    ACTIVE_STEPS_PER_MINUTE, AGGREGATE_FIELDS, HEART_RATE_MAX_AGE, RESTING_HR_HOURS,
+    RESTING_HR_MIN_SAMPLES, SEDENTARY_WINDOW, SensorAggregator,
+)
+
+START = 1_718_000_000  # epoch seconds
+UTC_OFFSET_MINUTES = -300
+
+
+def simulate(rng, days=2, batch_minutes=15):
+    """Yield (now, samples) upload batches: steps/HR every minute while awake, a nightly sleep summary."""
+    for start in range(START, START + int(days * 86400), batch_minutes * 60):
+        samples = []
+        for ts in range(start, start + batch_minutes * 60, 60):
+            hour = ((ts + UTC_OFFSET_MINUTES * 60) // 3600) % 24
+            awake = 7 <= hour < 23
+            if awake and rng.random() < 0.8:
+                samples.append({"type": "steps", "ts": ts + 59, "value": int(rng.choice([0, 5, 40, 120]))})
+            if rng.random() < (0.9 if awake else 0.3):
+                samples.append({"type": "heart_rate", "ts": ts + 30, "value": float(rng.normal(75 if awake else 55, 6))})
+            if hour == 7 and ts % 3600 == 0:
+                samples.append({"type": "sleep", "ts": ts, "value": int(rng.integers(300, 540)), "efficiency": 90.0})
+        samples.append({"type": "steps", "ts": "bad", "value": 1})  # rejected
+        rng.shuffle(samples)
+        yield start + batch_minutes * 60, samples
+
+
+def brute_force(samples, now):
+    """Aggregates recomputed from every raw sample (the scan the rolling state replaces)."""
+    offset = UTC_OFFSET_MINUTES * 60
+    minute, hour, day = int(now // 60), int(now // 3600), int((now + offset) // 86400)
+    steps = [(int(s["ts"]) // 60, s["value"], (int(s["ts"]) + offset) // 86400) for s in samples if s["type"] == "steps"]
+    hrs = [(s["ts"], s["value"]) for s in samples if s["type"] == "heart_rate"]
+    sleeps = [s for s in samples if s["type"] == "sleep"]
+
+    per_minute = {}
+    for m, count, _ in steps:
+        if m > minute - SEDENTARY_WINDOW:
+            per_minute[m] = per_minute.get(m, 0) + count
+    first = min((m for m, _, _ in steps), default=None)
+    active = sum(1 for total in per_minute.values() if total >= ACTIVE_STEPS_PER_MINUTE)
+
+    hourly = {}
+    for ts, bpm in hrs:
+        if int(ts) // 3600 > hour - RESTING_HR_HOURS:
+            hourly.setdefault(int(ts) // 3600, []).append(bpm)
+    means = [sum(v) / len(v) for v in hourly.values() if len(v) >= RESTING_HR_MIN_SAMPLES]
+    today_hr = [bpm for ts, bpm in hrs if (int(ts) + offset) // 86400 == day]
+    latest = max(hrs)
+    sleep = max(sleeps, key=lambda s: s["ts"]) if sleeps else None
+
+    return {
+        "steps_today": sum(count for _, count, d in steps if d == day) if steps else None,
+        "steps_last_hour": sum(count for m, count, _ in steps if m > minute - 60) if steps else None,
+        "sedentary_minutes": min(SEDENTARY_WINDOW, minute - first + 1) - active if steps else None,
+        "heart_rate": latest[1] if now - latest[0] <= HEART_RATE_MAX_AGE else None,
+        "resting_hr": min(means) if means else None,
+        "max_hr": max(today_hr) if today_hr else None,
+        "total_sleep_minutes": sleep["value"] if sleep else None,
+        "sleep_efficiency": sleep["efficiency"] if sleep else None,
+    }
+
+
+def same(a, b):
+    if a is None or b is None:
+        return a is b
+    return abs(a - b) <= 1e-9 * max(1.0, abs(b))
+
+
+def main(seed=0):
+    rng = np.random.default_rng(seed)
+    aggregator = SensorAggregator()
+    seen, batches, mismatches = [], 0, 0
+    for now, samples in simulate(rng, days=1.75):  # ends in the evening, with steps counted today
+        accepted, rejected = aggregator.ingest(1, samples, UTC_OFFSET_MINUTES, now=now)
+        if batches % 7 == 3:  # client retried the upload
+            aggregator.ingest(1, samples, UTC_OFFSET_MINUTES, now=now)
+        seen.extend(s for s in samples if s["ts"] != "bad")
+        batches += 1
+        live, expected = aggregator.current(1, now=now), brute_force(seen, now)
+        bad = [f for f in AGGREGATE_FIELDS if not same(live[f], expected[f])]
+        if bad:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"❌ batch {batches}: {[(f, live[f], expected[f]) for f in bad]}")
+    print(f"{batches} batches, {len(seen):,} samples: rolling == brute force in {batches - mismatches}/{batches}")
+    ok = mismatches == 0 and rejected == 1
+
+    # 🗄️ Flush, then read the stored row from a process with no live state
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/sensor.db"
+        init_db(app)
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id=1, email="sensor@example.com"))
+            db.session.commit()
+            aggregator.app = app
+            written = aggregator.flush(now=now)
+            stored = SensorAggregator().current(1, now=now)
+            live = aggregator.current(1, now=now)
+            flushed_ok = written == 1 and all(same(stored[f], live[f]) for f in AGGREGATE_FIELDS)
+            stale = SensorAggregator(max_age=60).current(1, now=now + 3600)
+
+            # 🔁 Restarted process: the client retries its last batch, then uploads new steps/HR
+            restarted = SensorAggregator()
+            restarted.app = app
+            later = now + 900
+            fresh = [{"type": "steps", "ts": now + 60 * k + 59, "value": 30} for k in range(15)]
+            fresh += [{"type": "heart_rate", "ts": now + 60 * k + 30, "value": 190.0 + k} for k in range(15)]
+            restarted.ingest(1, samples, UTC_OFFSET_MINUTES, now=later)
+            restarted.ingest(1, fresh, UTC_OFFSET_MINUTES, now=later)
+            resumed, expected = restarted.current(1, now=later), brute_force(seen + fresh, later)
+            resumed_ok = all(
+                same(resumed[f], expected[f])
+                for f in ("steps_today", "heart_rate", "max_hr", "total_sleep_minutes", "sleep_efficiency")
+            ) and resumed["resting_hr"] is not None
+            db.engine.dispose()
+    print(f"{'✅' if flushed_ok else '❌'} flushed row matches live aggregates; stale row ignored: {stale['heart_rate'] is None}")
+    print(f"{'✅' if resumed_ok else '❌'} restarted process resumes today's totals from the flushed row "
+          f"(steps_today {resumed['steps_today']} vs {expected['steps_today']})")
+    ok &= flushed_ok and resumed_ok and all(v is None for v in stale.values())
+
+    # ⏱️ Throughput: 1,000 users uploading 60-sample batches
+    bench = SensorAggregator()
+    users, batch = 1000, [{"type": "steps" if i % 2 else "heart_rate", "ts": START + i * 30, "value": 60 + i % 7}
+                          for i in range(60)]
+    start = time.perf_counter()
+    for user_id in range(users):
+        bench.ingest(user_id, batch, now=START + 1800)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    bench.current_many(list(range(users)), now=START + 1800)
+    read = time.perf_counter() - start
+    print(f"ingest: {users * len(batch) / elapsed:,.0f} samples/s ({users / elapsed:,.0f} batches/s); "
+          f"current_many for {users} users: {read * 1000:.1f} ms")
+
+    print("✅ Sensor aggregates match a full rescan." if ok else "❌ Sensor aggregates diverged.")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
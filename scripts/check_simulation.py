@@ -0,0 +1,62 @@
+# scripts/check_simulation.py
+"""
+Checks the Monte Carlo strategy evaluator: results are identical inline and
+on a process pool, for any chunking; trial i matches
+run_simulation(seed=seed, trial=i); and reports trial throughput.
+
+    python scripts/check_simulation.py [n_trials]
+"""
+import os
+import sys
+import time
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from simulation import PROFILES, STRATEGIES, evaluate_strategies, run_simulation
+
+MAX_STEPS = 200
+
+
+def same(a, b):
+    return all(
+        np.array_equal(a[s][key], b[s][key]) for s in a for key in ("engagement", "reward", "dropouts")
+    )
+
+
+def main(n_trials=200, seed=7):
+    strategies = list(STRATEGIES)
+    ok = True
+    for profile in PROFILES:
+        start = time.perf_counter()
+        inline = evaluate_strategies(profile, strategies, MAX_STEPS, n_trials, seed=seed, workers=1)
+        serial = time.perf_counter() - start
+        start = time.perf_counter()
+        pooled = evaluate_strategies(profile, strategies, MAX_STEPS, n_trials, seed=seed, workers=4, chunk_size=7)
+        parallel = time.perf_counter() - start
+
+        trial = n_trials // 2
+        single = run_simulation(profile, "linucb", MAX_STEPS, seed=seed, trial=trial)
+        row = inline["linucb"]
+        single_ok = (single["dropout_step"] == row["dropouts"][trial]
+                     and np.array_equal(single["engagement"], row["engagement"][trial, :single["dropout_step"]]))
+        reseeded = evaluate_strategies(profile, ["random"], MAX_STEPS, n_trials, seed=seed + 1, workers=1)
+        differs = not np.array_equal(reseeded["random"]["dropouts"], inline["random"]["dropouts"])
+
+        passed = same(inline, pooled) and single_ok and differs
+        ok &= passed
+        summary = ", ".join(
+            f"{s} {inline[s]['reward'].sum(axis=1).mean():.1f}" for s in strategies
+        )
+        print(f"{'✅' if passed else '❌'} {profile:<17} mean reward: {summary}")
+        print(f"   {len(strategies) * n_trials} trials: inline {serial:.2f}s, pool {parallel:.2f}s "
+              f"({os.cpu_count()} cores)")
+
+    print("✅ Evaluator is deterministic across workers and chunking." if ok else "❌ Evaluator results diverged.")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(arg) for arg in sys.argv[1:])) else 1)
@@ -0,0 +1,24 @@
+# scripts/migrate_context_blobs.py
+"""
+Convert logged JSON context vectors (nudge_logs and monthly archives) into
+packed float32 blobs. Idempotent; readers accept both forms meanwhile.
+
+    python scripts/migrate_context_blobs.py
+"""
+import os
+import sys
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("KEYRD_JOB_WORKERS", "0")
+os.environ.setdefault("KEYRD_RECEIPTS", "0")
+
+from app import create_app
+from app.utils.log_contexts import migrate_json_contexts
+
+if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        migrated = migrate_json_contexts()
+    print(f"✅ Migrated {migrated} logged contexts to float32 blobs")
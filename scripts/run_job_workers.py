@@ -0,0 +1,44 @@
+# scripts/run_job_workers.py
+"""
+Run job workers outside the web processes (set KEYRD_JOB_WORKERS=0 for the
+web app). Each process runs its own threads against the shared queue file.
+
+    python scripts/run_job_workers.py --processes 2 --threads 8
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+
+# Add the root directory (keyrd_mvp) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def work(threads):
+    os.environ["KEYRD_JOB_WORKERS"] = "0"  # this process runs its own pool below
+    from app import create_app
+    from app.utils.job_queue import WorkerPool, job_queue
+
+    app = create_app()
+    pool = WorkerPool(job_queue, app, workers=threads)
+    pool.start()
+    print(f"✅ Job worker pid={os.getpid()} running {threads} threads on {job_queue.path}")
+    signal.sigwait({signal.SIGINT, signal.SIGTERM})
+    pool.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT, signal.SIGTERM})
+    procs = [multiprocessing.Process(target=work, args=(args.threads,)) for _ in range(args.processes)]
+    for proc in procs:
+        proc.start()
+    signal.sigwait({signal.SIGINT, signal.SIGTERM})
+    for proc in procs:
+        proc.terminate()
+        proc.join()
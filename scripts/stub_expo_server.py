@@ -0,0 +1,120 @@
+# scripts/stub_expo_server.py
+"""
+Local stand-in for Expo's push API, for tests and benchmarks.
+
+    python scripts/stub_expo_server.py --port 8765 --latency 0.05
+    EXPO_PUSH_URL=http://127.0.0.1:8765/--/api/v2/push/send python run.py
+
+Tokens containing "Unregistered" get a DeviceNotRegistered error ticket;
+tokens containing "Uninstalled" get an ok ticket whose receipt
+(RECEIPTS_PATH) reports DeviceNotRegistered, like a real uninstall.
+With --throttle N the first N requests are answered 429 with Retry-After.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEND_PATH = "/--/api/v2/push/send"
+RECEIPTS_PATH = "/--/api/v2/push/getReceipts"
+
+
+class StubExpoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    latency = 0.0
+    throttle = 0
+    stats = {"requests": 0, "messages": 0, "throttled": 0}
+    stats_lock = threading.Lock()
+    receipts = {}
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"null")
+
+        if self.path == RECEIPTS_PATH:
+            with self.stats_lock:
+                found = {i: self.receipts[i] for i in payload.get("ids", []) if i in self.receipts}
+            self._reply(200, {"data": found})
+            return
+        if self.path != SEND_PATH:
+            self._reply(404, {"errors": [{"code": "NOT_FOUND", "message": self.path}]})
+            return
+
+        messages = payload if isinstance(payload, list) else [payload]
+        if len(messages) > 100:
+            self._reply(400, {"errors": [{"code": "PUSH_TOO_MANY_NOTIFICATIONS"}]})
+            return
+
+        with self.stats_lock:
+            throttled = self.stats["throttled"] < self.throttle
+            if throttled:
+                self.stats["throttled"] += 1
+            else:
+                self.stats["requests"] += 1
+                self.stats["messages"] += len(messages)
+        if throttled:
+            self._reply(429, {"errors": [{"code": "TOO_MANY_REQUESTS"}]}, {"Retry-After": "0.1"})
+            return
+
+        time.sleep(self.latency)
+        tickets = []
+        for message in messages:
+            if "Unregistered" in message.get("to", ""):
+                tickets.append({
+                    "status": "error",
+                    "message": f"\"{message['to']}\" is not a registered push notification recipient",
+                    "details": {"error": "DeviceNotRegistered"},
+                })
+            else:
+                ticket_id = str(uuid.uuid4())
+                tickets.append({"status": "ok", "id": ticket_id})
+                receipt = {"status": "ok"}
+                if "Uninstalled" in message.get("to", ""):
+                    receipt = {"status": "error", "details": {"error": "DeviceNotRegistered"}}
+                with self.stats_lock:
+                    self.receipts[ticket_id] = receipt
+        self._reply(200, {"data": tickets if isinstance(payload, list) else tickets[0]})
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(port=0, latency=0.0, throttle=0):
+    """Start the stub in a background thread; returns (server, base_url)."""
+    handler = type("Handler", (StubExpoHandler,), {
+        "latency": latency,
+        "throttle": throttle,
+        "stats": {"requests": 0, "messages": 0, "throttled": 0},
+        "receipts": {},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--throttle", type=int, default=0, help="answer the first N requests with 429")
+    args = parser.parse_args()
+
+    server, url = start_stub(args.port, args.latency, args.throttle)
+    print(f"✅ Stub Expo push API listening on {url}{SEND_PATH}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,6 @@
+# simulation/__init__.py
+
+from simulation.evaluate import evaluate_strategies
+from simulation.profiles import NUDGE_TYPES, PROFILES
+from simulation.simulate import run_simulation, simulate_trial
+from simulation.strategies import STRATEGIES
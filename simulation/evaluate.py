@@ -0,0 +1,77 @@
+# simulation/evaluate.py
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulation.profiles import PROFILES
+from simulation.simulate import simulate_trial
+from simulation.strategies import STRATEGIES
+
+
+def _run_chunk(profile_type, strategy, max_steps, seed, start, stop):
+    """Trials [start, stop) of one strategy, stacked (runs in a pool worker)."""
+    engagement = np.zeros((stop - start, max_steps))
+    reward = np.zeros((stop - start, max_steps))
+    dropouts = np.empty(stop - start, dtype=np.int64)
+    for row, trial in enumerate(range(start, stop)):
+        engagement[row], reward[row], dropouts[row] = simulate_trial(profile_type, strategy, max_steps, seed, trial)
+    return strategy, start, engagement, reward, dropouts
+
+
+def evaluate_strategies(profile_type, strategies, max_steps, n_trials, seed=0, workers=None, chunk_size=None):
+    """
+    Monte Carlo comparison of strategies on one profile, trials spread over a
+    process pool. Trial i of every strategy simulates the same user (seeded
+    by (seed, i)), so results are identical for any worker count or chunking.
+
+    Args:
+        profile_type (str): Key of PROFILES.
+        strategies (sequence[str]): Keys of STRATEGIES.
+        max_steps (int): Steps per trial.
+        n_trials (int): Trials (simulated users) per strategy.
+        seed (int): Experiment seed.
+        workers (int | None): Processes (default: all cores; 1 → run inline).
+        chunk_size (int | None): Trials per task (default: ~4 tasks per worker).
+
+    Returns:
+        dict: strategy → {"engagement": (n_trials, max_steps), "reward":
+        (n_trials, max_steps), "dropouts": (n_trials,)} arrays, rows in trial order.
+    """
+    if profile_type not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile_type}'; expected one of {list(PROFILES)}")
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown strategies {unknown}; expected some of {list(STRATEGIES)}")
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, math.ceil(n_trials * len(strategies) / (workers * 4)))
+    results = {
+        strategy: {
+            "engagement": np.zeros((n_trials, max_steps)),
+            "reward": np.zeros((n_trials, max_steps)),
+            "dropouts": np.zeros(n_trials, dtype=np.int64),
+        }
+        for strategy in strategies
+    }
+    tasks = [
+        (profile_type, strategy, max_steps, seed, start, min(start + chunk_size, n_trials))
+        for strategy in strategies
+        for start in range(0, n_trials, chunk_size)
+    ]
+
+    def collect(outputs):
+        for strategy, start, engagement, reward, dropouts in outputs:
+            stop = start + len(dropouts)
+            results[strategy]["engagement"][start:stop] = engagement
+            results[strategy]["reward"][start:stop] = reward
+            results[strategy]["dropouts"][start:stop] = dropouts
+
+    if workers == 1:
+        collect(_run_chunk(*task) for task in tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            collect(pool.map(_run_chunk, *zip(*tasks)))
+    return results
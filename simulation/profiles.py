@@ -0,0 +1,84 @@
+# simulation/profiles.py
+#
+# Simulated user archetypes. Each day a user has a latent check-in state
+# (mood, stress, hunger, cravings, energy on the app's 1–5 scale) that drifts
+# around the profile's baseline; how likely they are to act on a nudge depends
+# on the nudge type, that state, how often they've seen the same nudge lately
+# (habituation) and how engaged they still are.
+from collections import namedtuple
+
+import numpy as np
+
+from app.utils.encoders.encode_checkin import CHECKIN_FIELDS
+
+NUDGE_TYPES = ["drink_water", "go_walk", "call_friend", "healthy_snack", "breathing"]
+
+# Per-profile parameters (arrays indexed [nudge] or [nudge, state field]):
+#   baseline     mean daily state, 1–5 per CHECKIN_FIELDS
+#   volatility   day-to-day noise of each state field
+#   affinity     base response logit per nudge type
+#   sensitivity  logit change per unit of centered state ((x - 0.5) * 2, x in [0, 1])
+#   habituation  logit penalty per recent repeat of the same nudge
+#   recovery     per-step decay of the repeat counters
+#   gain / loss  engagement moves gain·(1 − e) on a response, −loss·e when ignored
+#   hazard       per-step dropout probability at zero engagement (scaled by (1 − e)²)
+UserProfile = namedtuple("UserProfile", [
+    "baseline", "volatility", "affinity", "sensitivity", "habituation", "recovery", "gain", "loss", "hazard",
+])
+
+# State persistence: tomorrow keeps this share of today's deviation from baseline
+STATE_PERSISTENCE = 0.6
+
+
+def _sensitivity(**by_nudge):
+    """(nudge, field) matrix from {nudge: {field: weight}}; unspecified weights are 0."""
+    weights = np.zeros((len(NUDGE_TYPES), len(CHECKIN_FIELDS)))
+    for nudge, fields in by_nudge.items():
+        for field, weight in fields.items():
+            weights[NUDGE_TYPES.index(nudge), CHECKIN_FIELDS.index(field)] = weight
+    return weights
+
+
+PROFILES = {
+    # 🏃 Acts on activity nudges, especially when energetic; little else lands
+    "fitness_junkie": UserProfile(
+        baseline=np.array([4.0, 2.0, 3.0, 2.0, 4.0]),
+        volatility=np.array([0.5, 0.5, 0.7, 0.5, 0.6]),
+        affinity=np.array([0.3, 1.2, -0.6, -0.2, -0.8]),
+        sensitivity=_sensitivity(go_walk={"energy_level": 1.5}, healthy_snack={"hunger": 1.0}),
+        habituation=0.25, recovery=0.7, gain=0.25, loss=0.15, hazard=0.15,
+    ),
+    # 🧘 Mildly receptive to everything, slow to tire of repeats or disengage
+    "resilient": UserProfile(
+        baseline=np.array([3.5, 2.5, 3.0, 2.5, 3.5]),
+        volatility=np.array([0.4, 0.4, 0.6, 0.4, 0.4]),
+        affinity=np.array([0.3, 0.2, 0.3, 0.1, 0.2]),
+        sensitivity=_sensitivity(breathing={"stress_level": 0.5}, go_walk={"energy_level": 0.5}),
+        habituation=0.15, recovery=0.6, gain=0.2, loss=0.08, hazard=0.05,
+    ),
+    # 🍫 High stress and cravings: breathing/call a friend when stressed, snack swaps when craving
+    "stress_eater": UserProfile(
+        baseline=np.array([2.5, 4.0, 3.5, 4.0, 3.0]),
+        volatility=np.array([0.7, 0.8, 0.6, 0.8, 0.5]),
+        affinity=np.array([-0.3, -0.5, 0.0, 0.0, 0.2]),
+        sensitivity=_sensitivity(
+            breathing={"stress_level": 2.0},
+            call_friend={"stress_level": 1.0, "mood": -1.0},
+            healthy_snack={"cravings": 1.5},
+            go_walk={"stress_level": -1.0},
+        ),
+        habituation=0.5, recovery=0.75, gain=0.2, loss=0.2, hazard=0.2,
+    ),
+    # 😴 Low, volatile energy: fuel/hydration nudges work when tired, activity nudges backfire
+    "fatigue_sensitive": UserProfile(
+        baseline=np.array([3.0, 3.0, 3.0, 3.0, 2.0]),
+        volatility=np.array([0.5, 0.5, 0.5, 0.5, 1.0]),
+        affinity=np.array([0.4, -0.4, 0.0, 0.3, 0.0]),
+        sensitivity=_sensitivity(
+            drink_water={"energy_level": -1.0},
+            healthy_snack={"energy_level": -1.5, "hunger": 0.5},
+            go_walk={"energy_level": 2.0},
+        ),
+        habituation=0.35, recovery=0.7, gain=0.2, loss=0.25, hazard=0.25,
+    ),
+}
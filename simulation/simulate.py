@@ -0,0 +1,116 @@
+# simulation/simulate.py
+
+import zlib
+
+import numpy as np
+
+from app.utils.encoders.encode_checkin import CHECKIN_FIELDS
+from simulation.profiles import NUDGE_TYPES, PROFILES, STATE_PERSISTENCE
+from simulation.strategies import make_strategy
+
+# What a strategy sees each step: centered check-in state, engagement, the
+# decayed count of recent sends per nudge type (what habituation penalizes;
+# the served context doesn't carry it yet, though NudgeLog has it), bias
+CONTEXT_DIM = len(CHECKIN_FIELDS) + 1 + len(NUDGE_TYPES) + 1
+REPEATS = slice(len(CHECKIN_FIELDS) + 1, len(CHECKIN_FIELDS) + 1 + len(NUDGE_TYPES))
+
+INITIAL_ENGAGEMENT = 0.9
+# Response logit bonus per unit of engagement above 0.5 (engaged users act more)
+ENGAGEMENT_WEIGHT = 1.5
+
+
+def trial_seeds(seed: int, trial: int, strategy: str):
+    """
+    Independent, reproducible streams for one trial: the simulated user's
+    (shared by every strategy, so strategies face the same users) and the
+    strategy's own exploration randomness.
+
+    Returns:
+        tuple[np.random.Generator, np.random.Generator]: (user rng, strategy rng)
+    """
+    user = np.random.default_rng(np.random.SeedSequence([seed, trial]))
+    policy = np.random.default_rng(np.random.SeedSequence([seed, trial, zlib.crc32(strategy.encode())]))
+    return user, policy
+
+
+def simulate_trial(profile_type: str, strategy: str, max_steps: int, seed: int, trial: int):
+    """
+    One simulated user, nudged once per step by `strategy` until they drop out
+    or max_steps is reached.
+
+    Args:
+        profile_type (str): Key of PROFILES.
+        strategy (str): Key of simulation.strategies.STRATEGIES.
+        max_steps (int): Steps to simulate at most.
+        seed (int): Experiment seed.
+        trial (int): Trial index; (seed, trial) fixes the simulated user.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, int]: (engagement, reward) per step as
+        (max_steps,) float64 arrays, zero after dropout, and the dropout step
+        (max_steps if the user never dropped out).
+    """
+    profile = PROFILES.get(profile_type)
+    if profile is None:
+        raise ValueError(f"Unknown profile '{profile_type}'; expected one of {list(PROFILES)}")
+    user_rng, policy_rng = trial_seeds(seed, trial, strategy)
+    policy = make_strategy(strategy, len(NUDGE_TYPES), CONTEXT_DIM)
+
+    # 🎲 All of the user's randomness is drawn up front, independent of the nudges chosen
+    noise = user_rng.normal(size=(max_steps, len(CHECKIN_FIELDS))) * profile.volatility
+    response_draws = user_rng.random(max_steps)
+    dropout_draws = user_rng.random(max_steps)
+
+    engagement = np.zeros(max_steps)
+    reward = np.zeros(max_steps)
+    repeats = np.zeros(len(NUDGE_TYPES))
+    context = np.ones(CONTEXT_DIM)
+    state = profile.baseline.copy()
+    e = INITIAL_ENGAGEMENT
+
+    for step in range(max_steps):
+        state = profile.baseline + STATE_PERSISTENCE * (state - profile.baseline) + noise[step]
+        np.clip(state, 1.0, 5.0, out=state)
+        centered = (state - 3.0) / 2.0  # 1–5 → [-1, 1]
+        context[:len(CHECKIN_FIELDS)] = centered
+        context[len(CHECKIN_FIELDS)] = e
+        context[REPEATS] = repeats
+
+        arm = policy.select(context, policy_rng)
+        logit = (profile.affinity[arm] + profile.sensitivity[arm] @ centered
+                 - profile.habituation * repeats[arm] + ENGAGEMENT_WEIGHT * (e - 0.5))
+        responded = response_draws[step] * (1.0 + np.exp(-logit)) < 1.0  # draw < sigmoid(logit)
+        r = 1.0 if responded else 0.0
+        policy.update(arm, r, context)
+
+        e = e + profile.gain * (1.0 - e) if responded else e - profile.loss * e
+        repeats *= profile.recovery
+        repeats[arm] += 1.0
+        engagement[step], reward[step] = e, r
+
+        if dropout_draws[step] < profile.hazard * (1.0 - e) ** 2:
+            return engagement, reward, step + 1
+
+    return engagement, reward, max_steps
+
+
+def run_simulation(profile_type: str = "fitness_junkie", strategy: str = "linucb", max_steps: int = 200,
+                   seed: int = None, trial: int = 0) -> dict:
+    """
+    Simulate one user (see simulate_trial).
+
+    Args:
+        seed (int | None): Experiment seed; None draws a fresh one.
+        trial (int): Trial index under that seed.
+
+    Returns:
+        dict: engagement and reward lists (one entry per active step) and dropout_step.
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    engagement, reward, dropout_step = simulate_trial(profile_type, strategy, max_steps, seed, trial)
+    return {
+        "engagement": engagement[:dropout_step].tolist(),
+        "reward": reward[:dropout_step].tolist(),
+        "dropout_step": dropout_step,
+    }
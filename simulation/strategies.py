@@ -0,0 +1,91 @@
+# simulation/strategies.py
+#
+# Nudge-selection strategies compared by the dashboard. Each exposes
+# select(context, rng) → nudge index and update(nudge, reward, context);
+# only linucb uses the context. The context-free learners can't see recent
+# repeats, so they keep re-sending their favourite and habituate the user;
+# on high-habituation profiles random's rotation can out-score them.
+import copy
+
+import numpy as np
+
+from app.agents.bandit_linucb import LinUCB
+
+# Same exploration weight as the served agent (app/state.py ALPHA)
+LINUCB_ALPHA = 0.1
+
+
+class RandomStrategy:
+    def __init__(self, num_arms):
+        self.num_arms = num_arms
+
+    def select(self, context, rng):
+        return int(rng.integers(self.num_arms))
+
+    def update(self, arm, reward, context):
+        pass
+
+
+class EpsilonGreedyStrategy:
+    """Best sample-mean arm, a uniformly random one with probability epsilon."""
+
+    def __init__(self, num_arms, epsilon=0.1):
+        self.epsilon = epsilon
+        self.counts = np.zeros(num_arms)
+        self.values = np.zeros(num_arms)
+
+    def select(self, context, rng):
+        if rng.random() < self.epsilon:
+            return int(rng.integers(len(self.values)))
+        return int(np.argmax(self.values))
+
+    def update(self, arm, reward, context):
+        self.counts[arm] += 1
+        self.values[arm] += (reward - self.values[arm]) / self.counts[arm]
+
+
+class SoftmaxStrategy(EpsilonGreedyStrategy):
+    """Arms sampled in proportion to exp(sample mean / temperature)."""
+
+    def __init__(self, num_arms, temperature=0.1):
+        super().__init__(num_arms)
+        self.temperature = temperature
+
+    def select(self, context, rng):
+        logits = self.values / self.temperature
+        weights = np.exp(logits - logits.max())
+        return int(rng.choice(len(weights), p=weights / weights.sum()))
+
+
+class LinUCBStrategy:
+    """The production LinUCB agent, one fresh model per simulated user."""
+
+    _templates = {}
+
+    def __init__(self, num_arms, context_dim, alpha=LINUCB_ALPHA):
+        key = (num_arms, context_dim, alpha)
+        if key not in self._templates:
+            self._templates[key] = LinUCB(num_arms, context_dim, alpha)  # logs its init once per process
+        self.agent = copy.deepcopy(self._templates[key])
+
+    def select(self, context, rng):
+        return self.agent.select_action(context)
+
+    def update(self, arm, reward, context):
+        self.agent.update(arm, reward, context)
+
+
+STRATEGIES = {
+    "random": lambda num_arms, context_dim: RandomStrategy(num_arms),
+    "epsilon_greedy": lambda num_arms, context_dim: EpsilonGreedyStrategy(num_arms),
+    "softmax": lambda num_arms, context_dim: SoftmaxStrategy(num_arms),
+    "linucb": lambda num_arms, context_dim: LinUCBStrategy(num_arms, context_dim),
+}
+
+
+def make_strategy(name, num_arms, context_dim):
+    """Fresh strategy state for one simulated user."""
+    try:
+        return STRATEGIES[name](num_arms, context_dim)
+    except KeyError:
+        raise ValueError(f"Unknown strategy '{name}'; expected one of {list(STRATEGIES)}") from None
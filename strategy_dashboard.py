@@ -2,48 +2,30 @@ import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from simulation.simulate import run_simulation
+from simulation.evaluate import evaluate_strategies
 
 strategies = ["random", "epsilon_greedy", "softmax", "linucb"]
 n_trials = 20
 max_steps = 200
 profile = "fitness_junkie"
+seed = 0
 output_dir = "output"
 os.makedirs(output_dir, exist_ok=True)
 
-def evaluate_all_strategies(profile, strategies, max_steps, n_trials):
-    results = {}
+def evaluate_all_strategies(profile, strategies, max_steps, n_trials, seed=seed, workers=None):
+    # Trials run on a process pool (all cores by default); per-trial seeds make
+    # results reproducible for a given seed whatever the worker count
+    results = evaluate_strategies(profile, strategies, max_steps, n_trials, seed=seed, workers=workers)
 
     for strat in strategies:
-        engagement_trials = []
-        reward_trials = []
-        dropout_steps = []
-
-        for i in range(n_trials):
-            sim = run_simulation(profile_type=profile, strategy=strat, max_steps=max_steps)
-            e = sim["engagement"] + [0.0] * (max_steps - len(sim["engagement"]))
-            r = sim["reward"] + [0.0] * (max_steps - len(sim["reward"]))
-            engagement_trials.append(e)
-            reward_trials.append(r)
-            dropout_steps.append(sim["dropout_step"])
-
-        engagement_arr = np.array(engagement_trials)
-        reward_arr = np.array(reward_trials)
+        engagement_arr = results[strat]["engagement"]
 
         # Save to CSV
-        df = pd.DataFrame({
-            f"engagement_step_{i}": engagement_arr[:, i] for i in range(max_steps)
-        })
+        df = pd.DataFrame(engagement_arr, columns=[f"engagement_step_{i}" for i in range(max_steps)])
         df["strategy"] = strat
-        df["dropout_step"] = dropout_steps
+        df["dropout_step"] = results[strat]["dropouts"]
         df.to_csv(f"{output_dir}/{profile}_{strat}_raw.csv", index=False)
 
-        results[strat] = {
-            "engagement": engagement_arr,
-            "reward": reward_arr,
-            "dropouts": np.array(dropout_steps)
-        }
-
     return results
 
 def ci95(data):